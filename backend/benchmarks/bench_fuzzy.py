@@ -0,0 +1,75 @@
+"""Fuzzy brand matching benchmark.
+
+Checks that common typos (including adjacent swaps) of short real brands are found, then
+builds BrandFuzzyMatcher over synthetic catalogs and times typo queries against the
+per-query time budget.
+
+    cd backend && python benchmarks/bench_fuzzy.py [--sizes 10000 100000] [--queries 2000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from catalog import BrandIndex, BrandFuzzyMatcher, make_brand_records  # noqa: E402
+from synthetic_catalog import make_catalog, make_typo  # noqa: E402
+
+# Typo -> brand, one edit each; swaps break four padded trigrams, so they are the tightest case
+TYPO_CASES = {
+    "nkie": "Nike",
+    "pespi": "Pepsi",
+    "addias": "Adidas",
+    "starbuks": "Starbucks",
+    "nestel": "Nestle",
+    "cocacloa": "Coca Cola",
+    "mcdonlads": "McDonalds",
+}
+
+def check_typos():
+    catalog = make_catalog(10000)
+    catalog += [{**catalog[0], "brand": brand} for brand in set(TYPO_CASES.values())]
+    matcher = BrandFuzzyMatcher(BrandIndex(make_brand_records(catalog)))
+    for typo, brand in TYPO_CASES.items():
+        match = matcher.find(typo)
+        assert match is not None and match.brand == brand, f"{typo!r} -> {match.brand if match else None}, expected {brand}"
+    print(f"typo cases       | all {len(TYPO_CASES)} found ({', '.join(TYPO_CASES)})")
+
+def run(size: int, queries: int, seed: int = 7):
+    brands = make_brand_records(make_catalog(size))
+    started = time.perf_counter()
+    matcher = BrandFuzzyMatcher(BrandIndex(brands))
+    build_seconds = time.perf_counter() - started
+
+    rng = random.Random(seed)
+    samples = [rng.choice(brands).brand for _ in range(queries)]
+    typos = [make_typo(name, rng) for name in samples]
+
+    latencies = []
+    hits = 0
+    for name, typo in zip(samples, typos):
+        started = time.perf_counter()
+        match = matcher.find(typo)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if match is not None and match.brand == name:
+            hits += 1
+
+    latencies.sort()
+    budget_ms = matcher.time_budget * 1000
+    over_budget = sum(latency > budget_ms for latency in latencies)
+    print(f"{size:>8} brands | build {build_seconds:6.2f}s | "
+          f"mean {statistics.mean(latencies):6.3f} ms | p50 {latencies[len(latencies) // 2]:6.3f} ms | "
+          f"p99 {latencies[int(len(latencies) * 0.99)]:6.3f} ms | max {latencies[-1]:6.3f} ms | "
+          f"over {budget_ms:g} ms budget {over_budget} | found original {hits / queries:.1%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+    check_typos()
+    for size in args.sizes:
+        run(size, args.queries)
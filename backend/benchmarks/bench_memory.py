@@ -0,0 +1,56 @@
+"""Catalog memory benchmark.
+
+Reports bytes per brand for parsed JSON dicts vs compact BrandRecords (slots plus shared
+categories, reasons and alternative lists), and optionally for the full in-memory snapshot
+with its indexes.
+
+    cd backend && python benchmarks/bench_memory.py [--sizes 1000 100000 1000000] [--indexes]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from catalog import BrandAutocomplete, BrandFuzzyMatcher, BrandIndex, make_brand_records  # noqa: E402
+from synthetic_catalog import make_catalog  # noqa: E402
+
+def traced_bytes() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+def run(size: int, indexes: bool):
+    # Serialize first so every string is a fresh object, exactly like parsing the catalog file
+    raw = json.dumps(make_catalog(size))
+
+    tracemalloc.start()
+    baseline = traced_bytes()
+    parsed = json.loads(raw)
+    dict_bytes = traced_bytes() - baseline
+
+    records = make_brand_records(parsed)
+    del parsed
+    record_bytes = traced_bytes() - baseline
+
+    line = (f"{size:>8} brands | dicts {dict_bytes / size:7.1f} B/brand | "
+            f"records {record_bytes / size:7.1f} B/brand | saved {1 - record_bytes / dict_bytes:6.1%}")
+    if indexes:
+        index = BrandIndex(records)
+        autocomplete = BrandAutocomplete(index)
+        fuzzy = BrandFuzzyMatcher(index)
+        snapshot_bytes = traced_bytes() - baseline
+        line += f" | records + indexes {snapshot_bytes / size:8.1f} B/brand"
+        del index, autocomplete, fuzzy
+    tracemalloc.stop()
+    print(line)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--indexes", action="store_true", help="also measure the derived indexes (slow at 1M)")
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.indexes)
@@ -0,0 +1,71 @@
+"""Poster render benchmark.
+
+Compares the previous per-request pipeline (a draw.line per gradient row, theme image and
+footer redrawn every time) with the NumPy gradient and the cached poster templates.
+
+    cd backend && python benchmarks/bench_poster.py [--renders 50] [--image-type hunger]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+# Theme images are looked up relative to the backend directory
+os.chdir(BACKEND_DIR)
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+import poster_render  # noqa: E402
+
+POSTER = ("Boycott for Gaza", "Every purchase is a choice",
+          "Choose local alternatives and make your money stand with the people of Palestine. " * 3)
+
+def line_gradient(width: int, height: int) -> Image.Image:
+    img = Image.new('RGB', (width, height), color='white')
+    draw = ImageDraw.Draw(img)
+    for y in range(height):
+        r = int(255 - (y / height) * 50)
+        g = int(255 - (y / height) * 30)
+        b = int(255 - (y / height) * 20)
+        draw.line([(0, y), (width, y)], fill=(r, g, b))
+    return img
+
+def timed(func, renders: int) -> float:
+    started = time.perf_counter()
+    for _ in range(renders):
+        func()
+    return (time.perf_counter() - started) / renders * 1000
+
+def render_uncached(image_type: str):
+    poster_render.poster_template.cache_clear()
+    return poster_render.render_poster(*POSTER, image_type)
+
+def run(renders: int, image_type: str):
+    assert line_gradient(800, 1200).tobytes() == poster_render.poster_gradient(800, 1200).tobytes()
+    print(f"gradient 800x1200   | per-row lines {timed(lambda: line_gradient(800, 1200), renders):7.2f} ms | "
+          f"numpy {timed(lambda: poster_render.poster_gradient(800, 1200), renders):7.2f} ms")
+
+    # Silence the theme image lookup logging while timing
+    with contextlib.redirect_stdout(io.StringIO()):
+        vectorized = poster_render.poster_gradient
+        poster_render.poster_gradient = line_gradient
+        try:
+            before = timed(lambda: render_uncached(image_type), renders)
+        finally:
+            poster_render.poster_gradient = vectorized
+        uncached = timed(lambda: render_uncached(image_type), renders)
+        poster_render.render_poster(*POSTER, image_type)
+        cached = timed(lambda: poster_render.render_poster(*POSTER, image_type), renders)
+    print(f"render {image_type:<12} | before {before:7.2f} ms | numpy gradient {uncached:7.2f} ms | "
+          f"cached template {cached:7.2f} ms | {before / cached:4.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--renders", type=int, default=50)
+    parser.add_argument("--image-type", default="hunger")
+    args = parser.parse_args()
+    run(args.renders, args.image_type)
@@ -0,0 +1,77 @@
+"""Question cache benchmark.
+
+Checks that questions differing in their question word, a place name or a negation never
+share an answer, then times lookups and reports hit rates for reworded, misspelled questions.
+
+    cd backend && python benchmarks/bench_question_cache.py [--entries 10000] [--lookups 5000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from main import QuestionCache  # noqa: E402
+
+# Pairs that must not answer each other
+DISTINCT_QUESTIONS = [
+    ("Where is Al-Aqsa?", "What is Al-Aqsa?"),
+    ("Who should I donate to?", "When should I donate?"),
+    ("Who should I donate to for Gaza relief?", "When should I donate for Gaza relief?"),
+    ("Why boycott Starbucks products?", "How to boycott Starbucks products?"),
+    ("Which organizations provide medical aid in Gaza?", "Which organizations provide medical aid in Yemen?"),
+    ("Is it permissible to boycott Israeli products?", "Is it not permissible to boycott Israeli products?"),
+]
+# Pairs that should share an answer
+SAME_QUESTIONS = [
+    ("How can I donate?", "how do i donate"),
+    ("What is the ruling on boycotting products?", "what's the ruling on boycotting these products"),
+]
+TOPICS = ["zakat", "sadaqah", "fasting", "hajj", "umrah", "boycott", "charity", "prayer", "wudu", "quran"]
+QUESTION_FORMS = ["what is {}", "how do i perform {} {}", "why is {} important for {}", "when should i give {} {}"]
+
+def check_question_words():
+    cache = QuestionCache(100, 3600, 0.85)
+    for first, second in DISTINCT_QUESTIONS:
+        cache.set(first, f"answer: {first}")
+        assert cache.get(second) is None, f"{second!r} got the answer to {first!r}"
+    for first, second in SAME_QUESTIONS:
+        cache.set(first, f"answer: {first}")
+        assert cache.get(second) == f"answer: {first}", f"{second!r} missed {first!r}"
+    print(f"question words   | {len(DISTINCT_QUESTIONS)} distinct pairs kept apart, {len(SAME_QUESTIONS)} rewordings matched")
+
+def make_question(rng: random.Random) -> str:
+    return rng.choice(QUESTION_FORMS).format(rng.choice(TOPICS), f"topic{rng.randrange(100000)}")
+
+def run(entries: int, lookups: int, seed: int = 7):
+    rng = random.Random(seed)
+    cache = QuestionCache(entries, 3600, 0.85)
+    questions = [make_question(rng) for _ in range(entries)]
+    started = time.perf_counter()
+    for question in questions:
+        cache.set(question, question)
+    build_seconds = time.perf_counter() - started
+
+    latencies = []
+    for _ in range(lookups):
+        question = rng.choice(questions)
+        # A contraction plus a one-letter typo, so lookups go through the near-match path
+        reworded = "Please tell me, " + question.replace("what is", "what's").replace("topic", "topik") + "?"
+        started = time.perf_counter()
+        cache.get(reworded)
+        latencies.append((time.perf_counter() - started) * 1000)
+    stats = cache.stats()
+    print(f"{entries:>8} entries | build {build_seconds:6.2f}s | mean {statistics.mean(latencies):6.3f} ms | "
+          f"hit rate {stats['hit_rate']:.1%} ({stats['exact_hits']} exact, {stats['near_hits']} near)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--lookups", type=int, default=5000)
+    args = parser.parse_args()
+    check_question_words()
+    for size in args.entries:
+        run(size, args.lookups)
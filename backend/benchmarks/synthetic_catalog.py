@@ -0,0 +1,49 @@
+"""Synthetic boycott catalogs for benchmarks (the real catalog only has ~100 brands)"""
+import random
+from typing import Any, Dict, List
+
+SYLLABLES = ["ka", "lo", "mi", "tra", "zen", "bo", "qu", "ex", "ar", "ni", "vel", "sto",
+             "pro", "max", "dor", "fi", "ga", "lux", "mar", "ton", "ri", "sa", "ve", "co"]
+CATEGORIES = ["Beverages", "Food & Beverages", "Fast Food", "Technology", "Apparel & Footwear",
+              "Consumer Goods", "Personal Care", "Automotive", "Entertainment", "Snacks"]
+ALTERNATIVES = ["Pakola", "Shezan", "Soda Club", "National Foods", "Shan Foods", "Hico",
+                "Engro Foods", "Nurpur", "Servis Shoes", "Bata Pakistan", "Stylo Shoes"]
+
+def make_brand_name(rng: random.Random) -> str:
+    words = []
+    for _ in range(rng.choice([1, 1, 2, 2, 3])):
+        words.append("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title())
+    return " ".join(words)
+
+def make_catalog(size: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Catalog entries shaped like data/boycott_brands.json, with unique brand names"""
+    rng = random.Random(seed)
+    names = set()
+    brands = []
+    while len(brands) < size:
+        name = make_brand_name(rng)
+        if name in names:
+            continue
+        names.add(name)
+        brands.append({
+            "brand": name,
+            "category": rng.choice(CATEGORIES),
+            "boycott_reason": "Reported support for Israeli military.",
+            "pakistani_alternatives": rng.sample(ALTERNATIVES, 3),
+            "popularity": rng.randint(0, 1000)
+        })
+    return brands
+
+def make_typo(name: str, rng: random.Random) -> str:
+    """Apply one random edit (drop, swap, replace or insert a letter)"""
+    text = name.lower()
+    position = rng.randrange(len(text))
+    edit = rng.choice(["drop", "swap", "replace", "insert"])
+    letter = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    if edit == "drop":
+        return text[:position] + text[position + 1:]
+    if edit == "swap" and position < len(text) - 1:
+        return text[:position] + text[position + 1] + text[position] + text[position + 2:]
+    if edit == "replace":
+        return text[:position] + letter + text[position + 1:]
+    return text[:position] + letter + text[position:]
@@ -0,0 +1,796 @@
+"""Boycott catalog: brand records, name normalization and the lookup indexes built on them.
+
+Both backends live here: CatalogSnapshot keeps the catalog in memory, SQLiteCatalog reads a
+database written by import_catalog.py (SQLITE_SCHEMA). Importing this module has no side
+effects beyond reading the fuzzy matching settings from the environment, so the importer
+and benchmarks can use it without starting the API.
+"""
+import bisect
+import collections
+import heapq
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from typing import Any, Dict, List, Optional, Sequence
+
+def read_catalog_file(path: str):
+    """Read and parse the catalog file, returning (brands, raw bytes); raises on any error"""
+    with open(path, "rb") as f:
+        raw = f.read()
+    brands = json.loads(raw.decode("utf-8"))
+    if not isinstance(brands, list):
+        raise ValueError("catalog must be a JSON list of brands")
+    for brand in brands:
+        missing = {"brand", "category", "boycott_reason", "pakistani_alternatives"} - set(brand)
+        if missing:
+            raise ValueError(f"brand entry {brand.get('brand', '?')!r} is missing {sorted(missing)}")
+    return brands, raw
+
+
+class CatalogInterner:
+    """Pool of shared strings and alternative lists for one catalog build.
+
+    Categories, boycott reasons and alternative lists repeat across many brands; pooling
+    them stores each distinct value once. A pool per build lets a reload free old values.
+    """
+
+    def __init__(self):
+        self.strings: Dict[str, str] = {}
+        self.tuples: Dict[tuple, tuple] = {}
+
+    def string(self, value: str) -> str:
+        return self.strings.setdefault(value, value)
+
+    def strings_tuple(self, values) -> tuple:
+        shared = tuple(self.string(str(value)) for value in values)
+        return self.tuples.setdefault(shared, shared)
+
+class BrandRecord:
+    """One read-only catalog entry, stored in slots instead of a per-brand dict"""
+
+    __slots__ = ("brand", "category", "boycott_reason", "pakistani_alternatives", "popularity")
+
+    def __init__(self, brand: str, category: str, boycott_reason: str, pakistani_alternatives: tuple,
+                 popularity: float = 0):
+        set_slot = object.__setattr__
+        set_slot(self, "brand", brand)
+        set_slot(self, "category", category)
+        set_slot(self, "boycott_reason", boycott_reason)
+        set_slot(self, "pakistani_alternatives", pakistani_alternatives)
+        set_slot(self, "popularity", popularity)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("BrandRecord is read-only")
+
+    def __repr__(self) -> str:
+        return f"BrandRecord({self.brand!r}, {self.category!r})"
+
+    @classmethod
+    def from_dict(cls, brand: Dict[str, Any], interner: Optional[CatalogInterner] = None) -> "BrandRecord":
+        interner = interner or CatalogInterner()
+        return cls(
+            str(brand["brand"]),
+            interner.string(str(brand["category"])),
+            interner.string(str(brand["boycott_reason"])),
+            interner.strings_tuple(brand["pakistani_alternatives"]),
+            brand.get("popularity", 0) or 0
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "brand": self.brand,
+            "category": self.category,
+            "boycott_reason": self.boycott_reason,
+            "pakistani_alternatives": list(self.pakistani_alternatives),
+            "popularity": self.popularity
+        }
+
+def make_brand_records(brands: List[Dict[str, Any]]) -> tuple:
+    """Compact records for a parsed catalog, with repeated strings shared"""
+    interner = CatalogInterner()
+    return tuple(BrandRecord.from_dict(brand, interner) for brand in brands)
+
+def normalize_brand_name(name: str) -> str:
+    """Normalize a brand name or query the same way search_product always has"""
+    return str(name).lower().strip()
+
+def fold_brand_name(name: str) -> str:
+    """Fold accents, apostrophes and punctuation so 'nestle' finds Nestlé and 'coca cola' finds Coca-Cola"""
+    text = unicodedata.normalize("NFKD", normalize_brand_name(name))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = text.replace("'", "").replace("\u2019", "")
+    return re.sub(r"[\W_]+", " ", text).strip()
+
+def brand_name_aliases(name: str) -> List[str]:
+    """Alternative lookup keys for a brand name (folded, compact and '&' spelled out)"""
+    folded = fold_brand_name(name)
+    spelled = fold_brand_name(normalize_brand_name(name).replace("&", " and "))
+    aliases = []
+    for alias in (folded, folded.replace(" ", ""), spelled):
+        if alias and alias not in aliases:
+            aliases.append(alias)
+    return aliases
+
+class BrandIndex:
+    """Lookup tables over the boycott catalog, built once when the catalog loads.
+
+    - names: normalized brand name -> brand id (exact match)
+    - aliases: folded / compact brand name -> brand id (exact match on spelling variants)
+    - words: brand name word -> brand ids (brand word contained in the query)
+    - grams: 1-, 2- and 3-character substrings -> brand ids (query contained in the brand name)
+
+    Brand ids are positions in the catalog list, so ties still go to the brand listed first.
+    Gram postings list the most popular brands first (then shorter names, then catalog order),
+    so a bounded scan sees the brands autocomplete ranks highest. Posting lists are packed into
+    unsigned int arrays once the index is built.
+    """
+
+    GRAM_SIZE = 3
+
+    def __init__(self, brands: Sequence[BrandRecord]):
+        self.brands = brands
+        self.names: Dict[str, int] = {}
+        self.aliases: Dict[str, int] = {}
+        self.words: Dict[str, Any] = {}
+        self.grams: Dict[str, Any] = {}
+        self.lengths = array("H")
+        self.max_name_length = 0
+        self.max_word_length = 0
+
+        for brand_id, brand in enumerate(brands):
+            brand_name = brand.brand.lower()
+            self.lengths.append(min(len(brand_name), 0xFFFF))
+            self.max_name_length = max(self.max_name_length, len(brand_name))
+            self.names.setdefault(brand_name, brand_id)
+
+            for alias in brand_name_aliases(brand_name):
+                self.aliases.setdefault(alias, brand_id)
+
+            for word in set(brand_name.split()):
+                self.words.setdefault(word, []).append(brand_id)
+                self.max_word_length = max(self.max_word_length, len(word))
+
+        by_popularity = sorted(range(len(brands)), key=lambda brand_id: (
+            -float(brands[brand_id].popularity), self.lengths[brand_id], brand_id))
+        for brand_id in by_popularity:
+            brand_name = brands[brand_id].brand.lower()
+            grams = set()
+            for size in range(1, self.GRAM_SIZE + 1):
+                for start in range(len(brand_name) - size + 1):
+                    grams.add(brand_name[start:start + size])
+            for gram in grams:
+                self.grams.setdefault(gram, []).append(brand_id)
+
+        # Longest name first, catalog order on ties - the order partial matches are ranked in
+        self.by_length = array("I", sorted(range(len(brands)), key=lambda brand_id: (-self.lengths[brand_id], brand_id)))
+        self.words = {word: array("I", brand_ids) for word, brand_ids in self.words.items()}
+        self.grams = {gram: array("I", brand_ids) for gram, brand_ids in self.grams.items()}
+
+    def __len__(self) -> int:
+        return len(self.brands)
+
+    def _brand_name(self, brand_id: int) -> str:
+        return self.brands[brand_id].brand.lower()
+
+    def find_exact(self, query: str) -> Optional[BrandRecord]:
+        """Exact brand name match, falling back to the alias table"""
+        query = normalize_brand_name(query)
+        brand_id = self.names.get(query)
+        if brand_id is None:
+            for alias in brand_name_aliases(query):
+                brand_id = self.aliases.get(alias)
+                if brand_id is not None:
+                    break
+        return self.brands[brand_id] if brand_id is not None else None
+
+    def brands_containing(self, text: str, scan_limit: Optional[int] = None) -> List[int]:
+        """Ids of brands whose normalized name contains text, stopping after scan_limit matches"""
+        if not text:
+            return self.by_length[:scan_limit]
+        if len(text) <= self.GRAM_SIZE:
+            return self.grams.get(text, array("I"))[:scan_limit]
+        # Scan the rarest trigram's postings and verify the full substring
+        postings = None
+        for start in range(len(text) - self.GRAM_SIZE + 1):
+            candidates = self.grams.get(text[start:start + self.GRAM_SIZE])
+            if not candidates:
+                return []
+            if postings is None or len(candidates) < len(postings):
+                postings = candidates
+        matches = []
+        for brand_id in postings:
+            if text in self._brand_name(brand_id):
+                matches.append(brand_id)
+                if len(matches) == scan_limit:
+                    break
+        return matches
+
+    def _substrings(self, text: str, max_length: int):
+        for start in range(len(text)):
+            for end in range(start + 1, min(len(text), start + max_length) + 1):
+                yield text[start:end]
+
+    def find_partial(self, query: str) -> Optional[BrandRecord]:
+        """Best partial match: longest brand name among contains and word-overlap matches"""
+        query = normalize_brand_name(query)
+        candidates = set(self.brands_containing(query))
+
+        for substring in self._substrings(query, self.max_name_length):
+            brand_id = self.names.get(substring)
+            if brand_id is not None:
+                candidates.add(brand_id)
+
+        for word in query.split():
+            candidates.update(self.brands_containing(word))
+
+        for substring in self._substrings(query, self.max_word_length):
+            candidates.update(self.words.get(substring, ()))
+
+        if not candidates:
+            return None
+        best_id = min(candidates, key=lambda brand_id: (-self.lengths[brand_id], brand_id))
+        return self.brands[best_id]
+
+    def find_best_match(self, query: str) -> Optional[BrandRecord]:
+        """Exact > contains > word-overlap, the ranking search_product has always used"""
+        query = normalize_brand_name(query)
+        brand_id = self.names.get(query)
+        if brand_id is not None:
+            return self.brands[brand_id]
+        return self.find_exact(query) or self.find_partial(query)
+
+class BrandAutocomplete:
+    """Ranked autocomplete over brand names, built once when the catalog loads.
+
+    Every brand contributes sorted keys for its full name (and folded spelling) plus one key
+    per later word, so a keystroke is a bisect over the sorted keys. Prefixes shared by more
+    than HEAVY_PREFIX_SIZE keys get their top results precomputed, so short queries never
+    walk a large range. Results rank full-name prefix matches over word-start matches over
+    mid-word matches, then by popularity, then shorter names first.
+
+    Mid-word matches only fill a list that prefix and word-start matches leave short. Gram
+    postings are already in ranking order, so the scan stops after INFIX_SCAN_LIMIT verified
+    mid-word matches. "total" counts every prefix and word-start match plus at most
+    INFIX_SCAN_LIMIT mid-word matches, the same way in both catalog backends.
+    """
+
+    MAX_LIMIT = 50
+    HEAVY_PREFIX_SIZE = 64
+    INFIX_SCAN_LIMIT = 256
+    PREFIX, WORD, INFIX = 0, 1, 2
+
+    def __init__(self, index: BrandIndex):
+        self.index = index
+        self.popularity = array("d", (float(brand.popularity) for brand in index.brands))
+
+        entries = []
+        for brand_id, brand in enumerate(index.brands):
+            brand_name = normalize_brand_name(brand.brand)
+            entries.append((brand_name, brand_id, self.PREFIX))
+            folded = fold_brand_name(brand_name)
+            if folded and folded != brand_name:
+                entries.append((folded, brand_id, self.PREFIX))
+            words = brand_name.split()
+            for position in range(1, len(words)):
+                entries.append((" ".join(words[position:]), brand_id, self.WORD))
+        entries.sort()
+
+        self.keys = [entry[0] for entry in entries]
+        self.entry_brands = [entry[1] for entry in entries]
+        self.entry_tiers = [entry[2] for entry in entries]
+        self.heavy: Dict[str, Any] = {}
+        self._precompute_heavy_prefixes()
+
+    def _rank(self, brand_id: int, tier: int):
+        return (tier, -self.popularity[brand_id], self.index.lengths[brand_id], brand_id)
+
+    def _prefix_range(self, prefix: str, lo: int = 0, hi: Optional[int] = None):
+        hi = len(self.keys) if hi is None else hi
+        start = bisect.bisect_left(self.keys, prefix, lo, hi)
+        end = bisect.bisect_left(self.keys, prefix + "\U0010ffff", start, hi)
+        return start, end
+
+    def _rank_range(self, start: int, end: int):
+        best: Dict[int, Any] = {}
+        for position in range(start, end):
+            brand_id = self.entry_brands[position]
+            rank = self._rank(brand_id, self.entry_tiers[position])
+            if brand_id not in best or rank < best[brand_id]:
+                best[brand_id] = rank
+        top = heapq.nsmallest(self.MAX_LIMIT, best.values())
+        return [rank[-1] for rank in top], [rank[0] for rank in top], len(best)
+
+    def _precompute_heavy_prefixes(self):
+        stack = [("", 0, len(self.keys))]
+        while stack:
+            prefix, start, end = stack.pop()
+            if end - start <= self.HEAVY_PREFIX_SIZE:
+                continue
+            if prefix:
+                self.heavy[prefix] = self._rank_range(start, end)
+            depth = len(prefix) + 1
+            position = start
+            while position < end:
+                key = self.keys[position]
+                if len(key) < depth:
+                    position += 1
+                    continue
+                child = key[:depth]
+                child_start, child_end = self._prefix_range(child, position, end)
+                stack.append((child, child_start, child_end))
+                position = child_end
+
+    def search(self, query: str, limit: int = 10) -> Dict[str, Any]:
+        """Top `limit` brands for the query, with the number that matched (mid-word matches capped)"""
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        query = normalize_brand_name(query)
+        limit = min(int(limit), self.MAX_LIMIT)
+        if not query:
+            return {"brands": [], "total": 0}
+
+        if query in self.heavy:
+            brand_ids, tiers, total = self.heavy[query]
+        else:
+            brand_ids, tiers, total = self._rank_range(*self._prefix_range(query))
+        brand_ids = list(brand_ids[:limit])
+        tiers = list(tiers[:limit])
+
+        # Mid-word matches ("bucks" -> Starbucks) only fill the list, best-ranked first. Every
+        # prefix and word-start match is listed here, so skipping them leaves only mid-word ones
+        if len(brand_ids) < limit:
+            seen = set(brand_ids)
+            candidates = self.index.brands_containing(query, self.INFIX_SCAN_LIMIT + len(seen))
+            infix = [brand_id for brand_id in candidates if brand_id not in seen][:self.INFIX_SCAN_LIMIT]
+            total += len(infix)
+            for brand_id in infix[:limit - len(brand_ids)]:
+                brand_ids.append(brand_id)
+                tiers.append(self.INFIX)
+
+        match_types = {self.PREFIX: "prefix", self.WORD: "word", self.INFIX: "infix"}
+        return {
+            "brands": [self.index.brands[brand_id].brand for brand_id in brand_ids],
+            "match_types": [match_types[tier] for tier in tiers],
+            "total": total
+        }
+
+# Fuzzy matching settings (edit distance cap and per-query time budget)
+FUZZY_MAX_EDIT_DISTANCE = int(os.getenv("FUZZY_MAX_EDIT_DISTANCE", "2"))
+FUZZY_TIME_BUDGET_MS = float(os.getenv("FUZZY_TIME_BUDGET_MS", "10"))
+
+def bounded_edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Edit distance counting adjacent swaps as one edit; stops early past max_distance"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1] if previous[-1] <= max_distance else max_distance + 1
+
+class BrandFuzzyMatcher:
+    """Typo-tolerant brand lookup ("starbuks" -> Starbucks) over compact folded brand names.
+
+    Candidates come from a padded-trigram index bucketed by name length, so a query only
+    touches names within the allowed edit distance in length and sharing enough trigrams
+    (an insertion, deletion or substitution breaks at most three, an adjacent swap up to
+    four). Survivors are verified with a bounded edit distance that counts a swap as one
+    edit. A short name can lose every trigram to one swap ("nkie" vs "nike"), so single
+    swaps are also looked up directly.
+
+    The time budget is checked while postings are counted (every POSTING_CHUNK postings), before
+    the candidates are sorted and before every edit distance; a step that would likely finish
+    past it is not started, and the best match so far (or None) is returned. Only a garbage
+    collection or scheduling pause can push a query past the budget.
+    """
+
+    # Padded trigrams one edit can break; an adjacent swap ("nkie") breaks four
+    GRAMS_PER_EDIT = 4
+    POSTING_CHUNK = 1024
+    # Seconds of the budget kept back for freeing the candidate tables after the search stops
+    CLEANUP_RESERVE = 0.0003
+
+    def __init__(self, index: BrandIndex, max_distance: int = FUZZY_MAX_EDIT_DISTANCE,
+                 time_budget_ms: float = FUZZY_TIME_BUDGET_MS):
+        self.index = index
+        self.max_distance = max_distance
+        self.time_budget = time_budget_ms / 1000
+        self.keys: List[str] = []
+        self.key_brands: List[int] = []
+        self.grams: Dict[str, Dict[int, List[int]]] = {}
+
+        key_ids = self.key_ids = {}
+        for brand_id, brand in enumerate(index.brands):
+            key = self.compact(brand.brand)
+            if not key or key in key_ids:
+                continue
+            key_id = key_ids[key] = len(self.keys)
+            self.keys.append(key)
+            self.key_brands.append(brand_id)
+            for gram in set(self.trigrams(key)):
+                self.grams.setdefault(gram, {}).setdefault(len(key), []).append(key_id)
+
+    @staticmethod
+    def compact(name: str) -> str:
+        return fold_brand_name(name).replace(" ", "")
+
+    @staticmethod
+    def trigrams(key: str) -> List[str]:
+        padded = f"${key}$"
+        return [padded[start:start + 3] for start in range(len(padded) - 2)]
+
+    @staticmethod
+    def adjacent_swaps(key: str) -> List[str]:
+        return [key[:i] + key[i + 1] + key[i] + key[i + 2:] for i in range(len(key) - 1) if key[i] != key[i + 1]]
+
+    def allowed_distance(self, key: str) -> int:
+        """Short queries get fewer edits; below four characters only exact matches count"""
+        return min(self.max_distance, (len(key) - 1) // 3)
+
+    def find(self, query: str) -> Optional[BrandRecord]:
+        """Closest brand within the edit distance threshold, or None"""
+        match = self.find_with_distance(query)
+        return match[0] if match else None
+
+    def find_with_distance(self, query: str):
+        deadline = time.perf_counter() + self.time_budget - self.CLEANUP_RESERVE
+        key = self.compact(query)
+        max_distance = self.allowed_distance(key)
+        if max_distance <= 0:
+            return None
+        if key in self.key_ids:
+            return self.index.brands[self.key_brands[self.key_ids[key]]], 0
+        for swapped in self.adjacent_swaps(key):
+            if swapped in self.key_ids:
+                return self.index.brands[self.key_brands[self.key_ids[swapped]]], 1
+
+        query_grams = set(self.trigrams(key))
+        min_shared = len(query_grams) - self.GRAMS_PER_EDIT * max_distance
+        lengths = range(len(key) - max_distance, len(key) + max_distance + 1)
+        shared = collections.Counter()
+        chunk = self.POSTING_CHUNK
+        # Each step stops early when one more step as long as the previous one would overrun
+        previous = time.perf_counter()
+        for gram in query_grams:
+            buckets = self.grams.get(gram) or {}
+            for length in lengths:
+                postings = buckets.get(length, ())
+                for start in range(0, len(postings), chunk):
+                    now = time.perf_counter()
+                    if 2 * now - previous > deadline:
+                        return None
+                    previous = now
+                    shared.update(postings[start:start + chunk])
+
+        if time.perf_counter() > deadline:
+            return None
+        # Most shared trigrams first, catalog order on ties (the sort is stable)
+        candidates = sorted(key_id for key_id, count in shared.items() if count >= min_shared)
+        candidates.sort(key=shared.__getitem__, reverse=True)
+        best = None
+        previous = time.perf_counter()
+        for key_id in candidates:
+            now = time.perf_counter()
+            if 2 * now - previous > deadline:
+                break
+            previous = now
+            # Only strictly closer names replace the best so far; ties go to more shared trigrams
+            limit = best[0] - 1 if best else max_distance
+            distance = bounded_edit_distance(key, self.keys[key_id], limit)
+            if distance <= limit:
+                best = (distance, self.key_brands[key_id])
+                if distance == 0:
+                    break
+        if best is None:
+            return None
+        return self.index.brands[best[1]], best[0]
+
+class CatalogSnapshot:
+    """Immutable catalog plus every index derived from it.
+
+    Snapshots are built completely (off the event loop) before being published, and request
+    handlers grab one snapshot up front, so a reload never exposes a half-built state.
+    """
+
+    def __init__(self, brands: List[Dict[str, Any]], version: int = 1, checksum: str = "",
+                 source_mtime: Optional[float] = None):
+        started = time.perf_counter()
+        self.brands = make_brand_records(brands)
+        self.index = BrandIndex(self.brands)
+        self.autocomplete = BrandAutocomplete(self.index)
+        self.fuzzy = BrandFuzzyMatcher(self.index)
+        self.version = version
+        self.checksum = checksum
+        self.source_mtime = source_mtime
+        self.loaded_at = time.time()
+        self.build_seconds = time.perf_counter() - started
+
+    def brand_names(self) -> List[str]:
+        return [brand.brand for brand in self.brands]
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "version": self.version,
+            "checksum": self.checksum,
+            "total_brands": len(self.brands),
+            "loaded_at": self.loaded_at,
+            "build_seconds": round(self.build_seconds, 4)
+        }
+
+# Tables written by import_catalog.py and read by SQLiteCatalog
+SQLITE_SCHEMA = """
+CREATE TABLE catalog_meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+CREATE TABLE brands (
+    id INTEGER PRIMARY KEY,
+    brand TEXT NOT NULL,
+    name TEXT NOT NULL,
+    compact TEXT NOT NULL,
+    category TEXT NOT NULL,
+    boycott_reason TEXT NOT NULL,
+    alternatives TEXT NOT NULL,
+    popularity REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX brands_name ON brands (name);
+CREATE INDEX brands_compact ON brands (compact);
+-- kind 0 = normalized brand name, kind 1 = alias (folded / compact spelling)
+CREATE TABLE brand_keys (
+    key TEXT NOT NULL,
+    kind INTEGER NOT NULL,
+    brand_id INTEGER NOT NULL,
+    PRIMARY KEY (key, kind)
+) WITHOUT ROWID;
+CREATE TABLE brand_words (
+    word TEXT NOT NULL,
+    brand_id INTEGER NOT NULL,
+    PRIMARY KEY (word, brand_id)
+) WITHOUT ROWID;
+-- BrandAutocomplete keys (tier 0 = full name, 1 = later word) and precomputed heavy prefixes
+CREATE TABLE autocomplete_keys (
+    key TEXT NOT NULL,
+    brand_id INTEGER NOT NULL,
+    tier INTEGER NOT NULL,
+    PRIMARY KEY (key, brand_id, tier)
+) WITHOUT ROWID;
+CREATE TABLE autocomplete_heavy (
+    prefix TEXT PRIMARY KEY,
+    brand_ids TEXT NOT NULL,
+    tiers TEXT NOT NULL,
+    total INTEGER NOT NULL
+) WITHOUT ROWID;
+-- BrandFuzzyMatcher padded trigrams, bucketed by compact name length
+CREATE TABLE brand_grams (
+    gram TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    brand_id INTEGER NOT NULL,
+    PRIMARY KEY (gram, length, brand_id)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE brand_fts USING fts5(name, content='brands', content_rowid='id', tokenize='trigram');
+"""
+
+class SQLiteCatalog:
+    """Read-only catalog backed by a SQLite database from import_catalog.py.
+
+    Offers the same lookups as CatalogSnapshot (index, autocomplete and fuzzy all point back
+    here) without holding the catalog in Python memory: every worker opens the file
+    read-only and shares its pages through the OS page cache. Substring matching uses the
+    FTS5 trigram index; autocomplete keys and fuzzy trigrams are tables precomputed by the
+    importer from the in-memory index structures.
+    """
+
+    MMAP_SIZE = 256 * 1024 * 1024
+    FUZZY_CANDIDATES = 200
+
+    def __init__(self, path: str, version: int = 1):
+        started = time.perf_counter()
+        self.path = path
+        self.source_mtime = os.path.getmtime(path)
+        self._local = threading.local()
+        meta = dict(self._execute("SELECT key, value FROM catalog_meta").fetchall())
+        self.checksum = meta.get("checksum", "")
+        self.total_brands = int(meta.get("total_brands", 0))
+        self.max_name_length = int(meta.get("max_name_length", 0))
+        self.max_word_length = int(meta.get("max_word_length", 0))
+        self.version = version
+        self.index = self.autocomplete = self.fuzzy = self
+        self.loaded_at = time.time()
+        self.build_seconds = time.perf_counter() - started
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            connection.execute(f"PRAGMA mmap_size = {self.MMAP_SIZE}")
+            connection.execute("PRAGMA query_only = 1")
+            self._local.connection = connection
+        return connection
+
+    def _execute(self, sql: str, parameters=()):
+        return self._connection().execute(sql, parameters)
+
+    def _brands_by_id(self, brand_ids: List[int]) -> List[BrandRecord]:
+        if not brand_ids:
+            return []
+        rows = self._execute(
+            "SELECT id, brand, category, boycott_reason, alternatives FROM brands "
+            "WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(brand_ids),)
+        ).fetchall()
+        by_id = {
+            row[0]: BrandRecord(row[1], row[2], row[3], tuple(json.loads(row[4])))
+            for row in rows
+        }
+        return [by_id[brand_id] for brand_id in brand_ids if brand_id in by_id]
+
+    def _brand(self, brand_id: Optional[int]):
+        brands = self._brands_by_id([brand_id]) if brand_id is not None else []
+        return brands[0] if brands else None
+
+    @staticmethod
+    def _fts_phrase(text: str) -> str:
+        return '"' + text.replace('"', '""') + '"'
+
+    def _containing_clause(self, text: str):
+        """SQL selecting ids of brands whose name contains text"""
+        if len(text) >= 3:
+            return "SELECT rowid FROM brand_fts WHERE brand_fts MATCH ?", self._fts_phrase(text)
+        return "SELECT id FROM brands WHERE instr(name, ?) > 0", text
+
+    def _substrings(self, text: str, max_length: int) -> List[str]:
+        return sorted({
+            text[start:end]
+            for start in range(len(text))
+            for end in range(start + 1, min(len(text), start + max_length) + 1)
+        })
+
+    def find_exact(self, query: str):
+        query = normalize_brand_name(query)
+        row = self._execute("SELECT brand_id FROM brand_keys WHERE key = ? AND kind = 0", (query,)).fetchone()
+        if row is None:
+            for alias in brand_name_aliases(query):
+                row = self._execute("SELECT brand_id FROM brand_keys WHERE key = ? AND kind = 1", (alias,)).fetchone()
+                if row is not None:
+                    break
+        return self._brand(row[0]) if row else None
+
+    def find_partial(self, query: str):
+        query = normalize_brand_name(query)
+        clauses, parameters = [], []
+        for text in [query] + query.split():
+            clause, parameter = self._containing_clause(text)
+            clauses.append(clause)
+            parameters.append(parameter)
+        clauses.append("SELECT brand_id FROM brand_keys WHERE kind = 0 AND key IN (SELECT value FROM json_each(?))")
+        parameters.append(json.dumps(self._substrings(query, self.max_name_length)))
+        clauses.append("SELECT brand_id FROM brand_words WHERE word IN (SELECT value FROM json_each(?))")
+        parameters.append(json.dumps(self._substrings(query, self.max_word_length)))
+        row = self._execute(
+            f"SELECT id FROM brands WHERE id IN ({' UNION '.join(clauses)}) ORDER BY length(name) DESC, id LIMIT 1",
+            parameters
+        ).fetchone()
+        return self._brand(row[0]) if row else None
+
+    def find_best_match(self, query: str):
+        """Exact > contains > word-overlap, same ranking as the in-memory BrandIndex"""
+        return self.find_exact(query) or self.find_partial(query)
+
+    def search(self, query: str, limit: int = 10) -> Dict[str, Any]:
+        """Autocomplete with the same keys, heavy prefixes, ranking and total as BrandAutocomplete"""
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        query = normalize_brand_name(query)
+        limit = min(int(limit), BrandAutocomplete.MAX_LIMIT)
+        if not query:
+            return {"brands": [], "total": 0}
+
+        row = self._execute(
+            "SELECT brand_ids, tiers, total FROM autocomplete_heavy WHERE prefix = ?", (query,)
+        ).fetchone()
+        if row is not None:
+            ranked = list(zip(json.loads(row[0]), json.loads(row[1])))[:limit]
+            total = row[2]
+        else:
+            ranked = self._execute(
+                "SELECT k.brand_id, min(k.tier) AS tier FROM autocomplete_keys k JOIN brands b ON b.id = k.brand_id "
+                "WHERE k.key >= ? AND k.key < ? GROUP BY k.brand_id "
+                "ORDER BY tier, b.popularity DESC, length(b.name), k.brand_id",
+                (query, query + "\U0010ffff")
+            ).fetchall()
+            total = len(ranked)
+            ranked = ranked[:limit]
+
+        # Mid-word matches only fill the list; all of them are ranked before the scan limit applies
+        if len(ranked) < limit:
+            seen = [brand_id for brand_id, _ in ranked]
+            clause, parameter = self._containing_clause(query)
+            infix = self._execute(
+                f"SELECT id FROM brands WHERE id IN ({clause}) "
+                "AND id NOT IN (SELECT value FROM json_each(?)) "
+                "ORDER BY popularity DESC, length(name), id LIMIT ?",
+                (parameter, json.dumps(seen), BrandAutocomplete.INFIX_SCAN_LIMIT)
+            ).fetchall()
+            total += len(infix)
+            ranked += [(brand_id, BrandAutocomplete.INFIX) for (brand_id,) in infix[:limit - len(ranked)]]
+
+        names = dict(self._execute(
+            "SELECT id, brand FROM brands WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps([brand_id for brand_id, _ in ranked]),)
+        ).fetchall())
+        match_types = ["prefix", "word", "infix"]
+        return {
+            "brands": [names[brand_id] for brand_id, _ in ranked],
+            "match_types": [match_types[tier] for _, tier in ranked],
+            "total": total
+        }
+
+    def find(self, query: str):
+        """Fuzzy match with the same trigram filter, edit distance check and budget as BrandFuzzyMatcher"""
+        deadline = time.perf_counter() + FUZZY_TIME_BUDGET_MS / 1000 - BrandFuzzyMatcher.CLEANUP_RESERVE
+        key = BrandFuzzyMatcher.compact(query)
+        max_distance = min(FUZZY_MAX_EDIT_DISTANCE, (len(key) - 1) // 3)
+        if max_distance <= 0:
+            return None
+        # Exact compact name first, then single adjacent swaps, which can share no trigram at all
+        for candidate in [key] + BrandFuzzyMatcher.adjacent_swaps(key):
+            row = self._execute("SELECT id FROM brands WHERE compact = ? ORDER BY id LIMIT 1", (candidate,)).fetchone()
+            if row:
+                return self._brand(row[0])
+        query_grams = sorted(set(BrandFuzzyMatcher.trigrams(key)))
+        connection = self._connection()
+        # Abort the candidate query once the per-query time budget is spent
+        connection.set_progress_handler(lambda: time.perf_counter() > deadline, 1000)
+        try:
+            rows = connection.execute(
+                "SELECT g.brand_id, b.compact, count(*) AS shared FROM brand_grams g JOIN brands b ON b.id = g.brand_id "
+                "WHERE g.gram IN (SELECT value FROM json_each(?)) AND g.length BETWEEN ? AND ? "
+                "GROUP BY g.brand_id HAVING shared >= ? ORDER BY shared DESC, g.brand_id LIMIT ?",
+                (json.dumps(query_grams), len(key) - max_distance, len(key) + max_distance,
+                 len(query_grams) - BrandFuzzyMatcher.GRAMS_PER_EDIT * max_distance, self.FUZZY_CANDIDATES)
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ Fuzzy lookup for '{query}' stopped: {e}")
+            return None
+        finally:
+            connection.set_progress_handler(None, 0)
+        best = None
+        previous = time.perf_counter()
+        for brand_id, compact, _ in rows:
+            now = time.perf_counter()
+            if 2 * now - previous > deadline:
+                break
+            previous = now
+            limit = best[0] - 1 if best else max_distance
+            distance = bounded_edit_distance(key, compact, limit)
+            if distance <= limit:
+                best = (distance, brand_id)
+                if distance == 0:
+                    break
+        return self._brand(best[1]) if best else None
+
+    def brand_names(self) -> List[str]:
+        return [row[0] for row in self._execute("SELECT brand FROM brands ORDER BY id")]
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "backend": "sqlite",
+            "version": self.version,
+            "checksum": self.checksum,
+            "total_brands": self.total_brands,
+            "loaded_at": self.loaded_at,
+            "build_seconds": round(self.build_seconds, 4)
+        }
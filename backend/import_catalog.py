@@ -0,0 +1,98 @@
+"""One-shot importer: boycott_brands.json -> SQLite catalog database.
+
+    cd backend && python import_catalog.py --input data/boycott_brands.json --output data/boycott_brands.db
+
+Then start the API with CATALOG_DB_PATH=data/boycott_brands.db. The database is written to a
+temporary file and moved into place, so running workers can pick it up with a catalog reload.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from catalog import (
+    SQLITE_SCHEMA,
+    BrandAutocomplete,
+    BrandFuzzyMatcher,
+    BrandIndex,
+    brand_name_aliases,
+    make_brand_records,
+    normalize_brand_name,
+    read_catalog_file,
+)
+
+def import_catalog(input_path: str, output_path: str) -> int:
+    raw_brands, raw = read_catalog_file(input_path)
+    brands = make_brand_records(raw_brands)
+    temporary_path = output_path + ".tmp"
+    if os.path.exists(temporary_path):
+        os.remove(temporary_path)
+
+    connection = sqlite3.connect(temporary_path)
+    connection.executescript(SQLITE_SCHEMA)
+    max_name_length = max_word_length = 0
+    with connection:
+        for brand_id, brand in enumerate(brands):
+            name = normalize_brand_name(brand.brand)
+            max_name_length = max(max_name_length, len(name))
+            connection.execute(
+                "INSERT INTO brands (id, brand, name, compact, category, boycott_reason, alternatives, popularity) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (brand_id, brand.brand, name, BrandFuzzyMatcher.compact(name), brand.category,
+                 brand.boycott_reason, json.dumps(list(brand.pakistani_alternatives), ensure_ascii=False),
+                 float(brand.popularity))
+            )
+            # First brand listed wins a shared name or alias, like the in-memory index
+            connection.execute("INSERT OR IGNORE INTO brand_keys VALUES (?, 0, ?)", (name, brand_id))
+            connection.executemany(
+                "INSERT OR IGNORE INTO brand_keys VALUES (?, 1, ?)",
+                [(alias, brand_id) for alias in brand_name_aliases(name)]
+            )
+            for word in set(name.split()):
+                max_word_length = max(max_word_length, len(word))
+                connection.execute("INSERT OR IGNORE INTO brand_words VALUES (?, ?)", (word, brand_id))
+
+        index = BrandIndex(brands)
+        autocomplete = BrandAutocomplete(index)
+        connection.executemany(
+            "INSERT OR IGNORE INTO autocomplete_keys VALUES (?, ?, ?)",
+            zip(autocomplete.keys, autocomplete.entry_brands, autocomplete.entry_tiers)
+        )
+        connection.executemany(
+            "INSERT INTO autocomplete_heavy VALUES (?, ?, ?, ?)",
+            [(prefix, json.dumps(brand_ids), json.dumps(tiers), total)
+             for prefix, (brand_ids, tiers, total) in autocomplete.heavy.items()]
+        )
+        fuzzy = BrandFuzzyMatcher(index)
+        connection.executemany(
+            "INSERT INTO brand_grams VALUES (?, ?, ?)",
+            ((gram, length, fuzzy.key_brands[key_id])
+             for gram, buckets in fuzzy.grams.items()
+             for length, key_ids in buckets.items()
+             for key_id in key_ids)
+        )
+        connection.execute("INSERT INTO brand_fts (brand_fts) VALUES ('rebuild')")
+        connection.executemany("INSERT INTO catalog_meta VALUES (?, ?)", [
+            ("checksum", hashlib.sha256(raw).hexdigest()[:16]),
+            ("total_brands", str(len(brands))),
+            ("max_name_length", str(max_name_length)),
+            ("max_word_length", str(max_word_length)),
+            ("source", os.path.abspath(input_path)),
+            ("imported_at", str(time.time())),
+        ])
+    connection.execute("PRAGMA optimize")
+    connection.execute("VACUUM")
+    connection.close()
+    os.replace(temporary_path, output_path)
+    return len(brands)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import boycott_brands.json into a SQLite catalog")
+    parser.add_argument("--input", default="data/boycott_brands.json")
+    parser.add_argument("--output", default="data/boycott_brands.db")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    total = import_catalog(args.input, args.output)
+    print(f"✅ Imported {total} brands into {args.output} in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,95 @@
+"""One-shot importer: Open Food Facts export -> memory-mapped product database.
+
+    cd backend && python import_products.py --input en.openfoodfacts.org.products.csv --output data/products.db
+
+Then start the API with PRODUCT_DB_PATH=data/products.db. Any CSV/TSV with `code` and `brands`
+columns works; `--prefixes` adds a CSV of GS1 company prefixes (`prefix`, `brand` columns) used
+when the exact product is unknown. The file is written to a temporary path and moved into place.
+"""
+import argparse
+import csv
+import os
+import struct
+import sys
+import time
+
+from main import InvalidBarcodeError, ProductDatabase, normalize_gtin
+
+def open_table(path: str, delimiter: str = None):
+    f = open(path, "r", encoding="utf-8", errors="replace", newline="")
+    if delimiter is None:
+        # Open Food Facts ships tab-separated exports with a .csv name
+        delimiter = "\t" if "\t" in f.readline() else ","
+        f.seek(0)
+    return f, csv.DictReader(f, delimiter=delimiter)
+
+def clean_brand(value: str) -> str:
+    return " ".join((value or "").split())
+
+def import_products(input_path: str, output_path: str, prefixes_path: str = None, delimiter: str = None) -> dict:
+    csv.field_size_limit(sys.maxsize)
+    brand_ids = {}
+    products = {}
+    prefixes = {}
+    skipped = 0
+
+    def brand_id(name: str) -> int:
+        return brand_ids.setdefault(name, len(brand_ids))
+
+    f, reader = open_table(input_path, delimiter)
+    with f:
+        for row in reader:
+            brand = clean_brand(row.get("brands"))
+            if not brand:
+                continue
+            try:
+                gtin = normalize_gtin(row.get("code") or "")
+            except InvalidBarcodeError:
+                skipped += 1
+                continue
+            # First row for a code wins
+            products.setdefault(ProductDatabase.gtin_key(gtin), brand_id(brand))
+
+    if prefixes_path:
+        f, reader = open_table(prefixes_path)
+        with f:
+            for row in reader:
+                prefix = (row.get("prefix") or "").strip()
+                brand = clean_brand(row.get("brand"))
+                if brand and prefix.isdigit() and 1 <= len(prefix) <= 12:
+                    prefixes.setdefault(ProductDatabase.prefix_key(prefix), brand_id(brand))
+
+    names = [name.encode("utf-8") for name in sorted(brand_ids, key=brand_ids.get)]
+    length_mask = 0
+    for key in prefixes:
+        length_mask |= 1 << (key >> 48)
+
+    temporary_path = output_path + ".tmp"
+    with open(temporary_path, "wb") as out:
+        out.write(ProductDatabase.HEADER.pack(ProductDatabase.MAGIC, len(products), len(prefixes), len(names), length_mask))
+        for table in (products, prefixes):
+            for key in sorted(table):
+                out.write(ProductDatabase.RECORD.pack(key, table[key]))
+        offset = 0
+        offsets = [0]
+        for name in names:
+            offset += len(name)
+            offsets.append(offset)
+        out.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        for name in names:
+            out.write(name)
+    os.replace(temporary_path, output_path)
+    return {"products": len(products), "company_prefixes": len(prefixes), "brands": len(names), "skipped": skipped}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import an Open Food Facts export into a product database")
+    parser.add_argument("--input", required=True)
+    parser.add_argument("--output", default="data/products.db")
+    parser.add_argument("--prefixes", help="CSV with prefix,brand columns")
+    parser.add_argument("--delimiter", help="Field separator (detected from the header by default)")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    stats = import_products(args.input, args.output, args.prefixes, args.delimiter)
+    print(f"✅ Imported {stats['products']} products, {stats['company_prefixes']} company prefixes and "
+          f"{stats['brands']} brands into {args.output} in {time.perf_counter() - started:.2f}s "
+          f"({stats['skipped']} invalid codes skipped)")
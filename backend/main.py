@@ -1,28 +1,117 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 import json
 import os
 from pathlib import Path
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from dotenv import load_dotenv
 import asyncio
 import time
 import requests
 import base64
-from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
-import textwrap
+import re
+import unicodedata
+import hashlib
+import codecs
+import collections
+import concurrent.futures
+import contextlib
+import contextvars
+import csv
+import functools
+import mmap
+import multiprocessing
+import random
+import tempfile
+import zipfile
+import zlib
+import struct
+
+from catalog import (
+    CatalogSnapshot,
+    SQLiteCatalog,
+    bounded_edit_distance,
+    normalize_brand_name,
+    read_catalog_file
+)
+from poster_render import (
+    POSTER_IMAGE_FORMATS,
+    POSTER_IMAGE_QUALITY,
+    POSTER_LAYOUT_VERSION,
+    POSTER_SIZES,
+    poster_assets,
+    poster_layout,
+    poster_template,
+    prepare_render_worker,
+    rasterize_poster,
+    render_fallback_poster,
+    render_poster
+)
 
 # Load environment variables
 load_dotenv()
 
+CATALOG_PATH = os.getenv("CATALOG_PATH", "data/boycott_brands.json")
+# Seconds between catalog file checks for hot reload (0 disables the watcher)
+CATALOG_WATCH_INTERVAL = float(os.getenv("CATALOG_WATCH_INTERVAL", "0"))
+# Optional SQLite catalog built by import_catalog.py (replaces the in-memory catalog when set)
+CATALOG_DB_PATH = os.getenv("CATALOG_DB_PATH")
+# Batch product search limits
+BATCH_SEARCH_MAX_QUERIES = int(os.getenv("BATCH_SEARCH_MAX_QUERIES", "100"))
+BATCH_ENRICHMENT_CONCURRENCY = int(os.getenv("BATCH_ENRICHMENT_CONCURRENCY", "8"))
+# Bulk barcode upload settings
+BULK_SCAN_CHUNK_SIZE = 64 * 1024
+BULK_SCAN_CONCURRENCY = int(os.getenv("BULK_SCAN_CONCURRENCY", "8"))
+# Longest accepted upload line in characters; longer lines are reported and skipped, not buffered
+BULK_SCAN_MAX_LINE_LENGTH = int(os.getenv("BULK_SCAN_MAX_LINE_LENGTH", "1024"))
+# GS1 prefix allocation table used for barcode country lookups
+GS1_PREFIXES_PATH = os.getenv("GS1_PREFIXES_PATH", "data/gs1_prefixes.json")
+# Optional GTIN -> brand database built by import_products.py
+PRODUCT_DB_PATH = os.getenv("PRODUCT_DB_PATH")
+# Cache for Gemini product descriptions (path enables persistence across restarts)
+DESCRIPTION_CACHE_SIZE = int(os.getenv("DESCRIPTION_CACHE_SIZE", "1000"))
+DESCRIPTION_CACHE_TTL = float(os.getenv("DESCRIPTION_CACHE_TTL", str(24 * 60 * 60)))
+DESCRIPTION_CACHE_PATH = os.getenv("DESCRIPTION_CACHE_PATH")
+# Fused product enrichments share the description cache's size and TTL
+ENRICHMENT_CACHE_PATH = os.getenv("ENRICHMENT_CACHE_PATH")
+# Near-duplicate question cache for the Sophia FAQ and Quran chat
+QUESTION_CACHE_SIZE = int(os.getenv("QUESTION_CACHE_SIZE", "500"))
+QUESTION_CACHE_TTL = float(os.getenv("QUESTION_CACHE_TTL", str(24 * 60 * 60)))
+QUESTION_CACHE_THRESHOLD = float(os.getenv("QUESTION_CACHE_THRESHOLD", "0.85"))
+# Gemini concurrency: global limit plus per-endpoint budgets, e.g. "barcode=16,poster=4"
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-2.5-flash")
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "32"))
+GEMINI_ENDPOINT_CONCURRENCY = os.getenv("GEMINI_ENDPOINT_CONCURRENCY", "")
+# Client-side Gemini quota (0 = unlimited) and circuit breaker settings
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "0"))
+GEMINI_BURST = int(os.getenv("GEMINI_BURST", "10"))
+GEMINI_BREAKER_THRESHOLD = int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5"))
+GEMINI_BREAKER_RESET_SECONDS = float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "30"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "2"))
+# Seconds each endpoint may spend waiting on Gemini before answering with fallback content,
+# e.g. "search_product=6,scan_barcode=4" (0 disables the deadline)
+REQUEST_DEADLINES = os.getenv("REQUEST_DEADLINES", "")
+# "fused" asks for a known product's analysis and description in one structured call,
+# "separate" keeps the two-call path
+PRODUCT_ENRICHMENT_MODE = os.getenv("PRODUCT_ENRICHMENT_MODE", "fused")
+# Poster rendering worker processes (0 renders in a thread) and max renders queued or running
+POSTER_RENDER_WORKERS = int(os.getenv("POSTER_RENDER_WORKERS", "2"))
+POSTER_RENDER_QUEUE_SIZE = int(os.getenv("POSTER_RENDER_QUEUE_SIZE", "16"))
+# Rendered poster cache: bytes kept in memory, plus an optional directory evicted posters spill to
+POSTER_CACHE_BYTES = int(os.getenv("POSTER_CACHE_BYTES", str(64 * 1024 * 1024)))
+POSTER_CACHE_DIR = os.getenv("POSTER_CACHE_DIR")
+POSTER_CACHE_DISK_BYTES = int(os.getenv("POSTER_CACHE_DISK_BYTES", str(512 * 1024 * 1024)))
+# Token required by the /api/admin endpoints (they are disabled when unset)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
 # Load boycott brands data
 def load_boycott_brands():
     try:
-        with open("data/boycott_brands.json", "r", encoding="utf-8") as f:
-            return json.load(f)
+        return read_catalog_file(CATALOG_PATH)[0]
     except FileNotFoundError:
         print("⚠️ boycott_brands.json not found, using empty list")
         return []
@@ -30,7 +119,88 @@ def load_boycott_brands():
         print(f"❌ Error loading boycott_brands.json: {e}")
         return []
 
-BOYCOTT_BRANDS = load_boycott_brands()
+
+def open_sqlite_catalog(path: str, previous=None, force: bool = False) -> Optional[SQLiteCatalog]:
+    """Open the SQLite catalog; None when it holds the same data as the current one"""
+    catalog = SQLiteCatalog(path, version=previous.version + 1 if previous is not None else 1)
+    if previous is not None and not force and catalog.checksum == previous.checksum:
+        return None
+    return catalog
+
+def build_catalog_snapshot(path: str = CATALOG_PATH, previous: Optional[CatalogSnapshot] = None,
+                           force: bool = False) -> Optional[CatalogSnapshot]:
+    """Parse the catalog file and build a new snapshot; None when the file content is unchanged"""
+    if CATALOG_DB_PATH:
+        return open_sqlite_catalog(CATALOG_DB_PATH, previous, force)
+    source_mtime = os.path.getmtime(path)
+    brands, raw = read_catalog_file(path)
+    checksum = hashlib.sha256(raw).hexdigest()[:16]
+    if previous is not None and not force and checksum == previous.checksum:
+        return None
+    version = previous.version + 1 if previous is not None else 1
+    return CatalogSnapshot(brands, version=version, checksum=checksum, source_mtime=source_mtime)
+
+def initial_catalog_snapshot() -> CatalogSnapshot:
+    try:
+        return build_catalog_snapshot()
+    except Exception as e:
+        if CATALOG_DB_PATH:
+            print(f"❌ Error opening catalog database {CATALOG_DB_PATH}: {e}")
+        # load_boycott_brands reports the problem and falls back to an empty catalog
+        return CatalogSnapshot(load_boycott_brands())
+
+_catalog = initial_catalog_snapshot()
+_catalog_reload_lock = asyncio.Lock()
+_catalog_reload_stats: Dict[str, Any] = {
+    "last_reload_at": None,
+    "last_reload_seconds": None,
+    "last_reload_error": None,
+    "reload_count": 0
+}
+
+def get_catalog() -> CatalogSnapshot:
+    """Current catalog snapshot (grab it once per request and use it throughout)"""
+    return _catalog
+
+async def reload_catalog(force: bool = False) -> Dict[str, Any]:
+    """Rebuild the catalog in a worker thread and atomically publish the new snapshot"""
+    global _catalog
+    async with _catalog_reload_lock:
+        started = time.perf_counter()
+        try:
+            snapshot = await asyncio.to_thread(build_catalog_snapshot, CATALOG_PATH, _catalog, force)
+        except Exception as e:
+            print(f"❌ Catalog reload failed, keeping version {_catalog.version}: {e}")
+            _catalog_reload_stats["last_reload_error"] = str(e)
+            raise
+        elapsed = time.perf_counter() - started
+        _catalog_reload_stats["last_reload_at"] = time.time()
+        _catalog_reload_stats["last_reload_seconds"] = round(elapsed, 4)
+        _catalog_reload_stats["last_reload_error"] = None
+        if snapshot is None:
+            return {"reloaded": False, **_catalog.info()}
+        _catalog = snapshot
+        _catalog_reload_stats["reload_count"] += 1
+        print(f"✅ Catalog reloaded: version {snapshot.version}, {snapshot.info()['total_brands']} brands in {elapsed:.2f}s")
+        return {"reloaded": True, **snapshot.info()}
+
+async def watch_catalog_file(interval: float):
+    """Poll the catalog file's mtime and hot-reload it when it changes"""
+    # The last mtime handled is kept here rather than on the published snapshot, so a touched
+    # but unchanged file is checked once instead of on every poll
+    seen_mtime = _catalog.source_mtime
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            mtime = os.path.getmtime(CATALOG_DB_PATH or CATALOG_PATH)
+            if mtime != seen_mtime:
+                await reload_catalog()
+                seen_mtime = mtime
+        except Exception as e:
+            print(f"⚠️ Catalog watcher error: {e}")
+
+def catalog_status() -> Dict[str, Any]:
+    return {**get_catalog().info(), **_catalog_reload_stats}
 
 # Configure Gemini API
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -43,6 +213,458 @@ else:
     print("   GEMINI_API_KEY=your_actual_api_key_here")
     print("📖 See GEMINI_SETUP.md for detailed instructions")
 
+# Per-endpoint share of GEMINI_MAX_CONCURRENCY, so slow poster designs can't starve barcode scans
+DEFAULT_GEMINI_BUDGETS = {
+    "product_description": 12,
+    "product_analysis": 12,
+    "barcode": 12,
+    "faq": 8,
+    "quran": 8,
+    "poster": 4,
+}
+
+def parse_endpoint_settings(value: str, defaults: Dict[str, Any], convert=int) -> Dict[str, Any]:
+    """Apply "endpoint=value,..." overrides to a dict of per-endpoint defaults"""
+    settings = dict(defaults)
+    for item in value.split(","):
+        if "=" in item:
+            endpoint, setting = item.split("=", 1)
+            settings[endpoint.strip()] = convert(setting)
+    return settings
+
+# Default per-request deadlines in seconds (streaming endpoints show progress and have none)
+DEFAULT_REQUEST_DEADLINES = {
+    "search_product": 8.0,
+    "scan_barcode": 5.0,
+    "faq": 20.0,
+    "quran": 20.0,
+    "poster": 30.0,
+}
+request_deadlines = parse_endpoint_settings(REQUEST_DEADLINES, DEFAULT_REQUEST_DEADLINES, float)
+
+class ResponseSource:
+    """Records whether the Gemini content of one response came from the model or a fallback"""
+
+    __slots__ = ("model", "fallback")
+
+    def __init__(self):
+        self.model = 0
+        self.fallback = 0
+
+    def merge(self, other: "ResponseSource"):
+        self.model += other.model
+        self.fallback += other.fallback
+
+    def label(self) -> str:
+        # "local" answers (catalog hits, unknown products) needed no model content at all
+        if self.fallback:
+            return "fallback"
+        return "model" if self.model else "local"
+
+# Absolute event-loop deadline and source tracker of the request being served
+request_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+response_source: contextvars.ContextVar[Optional[ResponseSource]] = contextvars.ContextVar("response_source", default=None)
+
+@contextlib.contextmanager
+def request_scope(endpoint: str):
+    """Start the endpoint's deadline and a fresh ResponseSource for the code inside the block"""
+    timeout = request_deadlines.get(endpoint, 0)
+    deadline = asyncio.get_running_loop().time() + timeout if timeout > 0 else None
+    source = ResponseSource()
+    deadline_token = request_deadline.set(deadline)
+    source_token = response_source.set(source)
+    try:
+        yield source
+    finally:
+        response_source.reset(source_token)
+        request_deadline.reset(deadline_token)
+
+@contextlib.contextmanager
+def separate_response_source():
+    """Track Gemini calls inside the block on their own; the caller decides whether to merge"""
+    source = ResponseSource()
+    token = response_source.set(source)
+    try:
+        yield source
+    finally:
+        response_source.reset(token)
+
+def deadline_remaining() -> Optional[float]:
+    deadline = request_deadline.get()
+    return None if deadline is None else deadline - asyncio.get_running_loop().time()
+
+def record_response_source(fallback: bool):
+    source = response_source.get()
+    if source is not None:
+        if fallback:
+            source.fallback += 1
+        else:
+            source.model += 1
+
+def gemini_enabled() -> bool:
+    """Whether a real API key is configured; otherwise the caller's fallback content is used"""
+    if not GEMINI_API_KEY or GEMINI_API_KEY == "your_gemini_api_key_here":
+        record_response_source(fallback=True)
+        return False
+    return True
+
+class GeminiUnavailableError(Exception):
+    """Raised instead of calling Gemini; callers answer with their fallback content"""
+
+class CircuitOpenError(GeminiUnavailableError):
+    pass
+
+class QuotaExhaustedError(GeminiUnavailableError):
+    pass
+
+# Errors that mean Gemini is overloaded or down: retried, and counted by the circuit breaker.
+# Anything else (bad request, safety block, ...) is the caller's problem and fails at once.
+TRANSIENT_GEMINI_ERRORS = (
+    google_exceptions.TooManyRequests,  # includes ResourceExhausted (429 quota)
+    google_exceptions.InternalServerError,
+    google_exceptions.BadGateway,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.GatewayTimeout,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.RetryError,
+    ConnectionError,
+)
+# The key itself is unusable (unauthenticated, revoked, not allowed for the project)
+CREDENTIAL_GEMINI_ERRORS = (google_exceptions.Unauthorized, google_exceptions.Forbidden)
+# One request rejected (bad input, safety block): Gemini answered, so it is available
+REJECTED_GEMINI_ERRORS = (
+    google_exceptions.InvalidArgument,
+    genai.types.BlockedPromptException,
+    genai.types.StopCandidateException,
+)
+
+def is_credential_error(error: BaseException) -> bool:
+    # An invalid or revoked API key comes back as InvalidArgument "API key not valid"
+    return isinstance(error, CREDENTIAL_GEMINI_ERRORS) or (
+        isinstance(error, google_exceptions.InvalidArgument) and "api key" in str(error).lower())
+
+class TokenBucket:
+    """Client-side request quota: rate tokens per second, bursts up to capacity"""
+
+    def __init__(self, requests_per_minute: float, capacity: int):
+        self.rate = requests_per_minute / 60
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.rejected = 0
+
+    def reserve(self, max_wait: Optional[float]) -> float:
+        """Take a token, returning how long to wait for it; raise if that exceeds max_wait"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = max(0.0, (1 - self.tokens) / self.rate)
+        if max_wait is not None and wait > max_wait:
+            self.rejected += 1
+            raise QuotaExhaustedError(f"Gemini quota exhausted, next slot in {wait:.1f}s")
+        self.tokens -= 1
+        return wait
+
+    async def acquire(self, max_wait: Optional[float] = None):
+        wait = self.reserve(max_wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests_per_minute": self.rate * 60,
+            "capacity": self.capacity,
+            "tokens": round(min(self.capacity, self.tokens + (time.monotonic() - self.updated) * self.rate), 2),
+            "rejected": self.rejected
+        }
+
+class CircuitBreaker:
+    """Stops calling Gemini after consecutive failures, or at once when the API key is rejected.
+
+    closed: calls go through. open: calls fail fast with CircuitOpenError for reset_timeout
+    seconds. half_open: one probe call is let through; success closes the breaker, failure
+    opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    def before_call(self):
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                raise CircuitOpenError("Gemini circuit breaker is open")
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self.probing:
+                self.rejected += 1
+                raise CircuitOpenError("Gemini circuit breaker is probing")
+            self.probing = True
+
+    def record_success(self):
+        if self.state != "closed":
+            print("✅ Gemini circuit breaker closed")
+        self.state = "closed"
+        self.failures = 0
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self._open(f"after {self.failures} failures")
+
+    def trip(self, reason: str):
+        """Open now: a failure that will repeat on every call, like a revoked API key"""
+        self.failures += 1
+        self.probing = False
+        self._open(reason)
+
+    def _open(self, reason: str):
+        if self.state != "open":
+            self.times_opened += 1
+            print(f"⚠️ Gemini circuit breaker opened {reason}")
+        self.state = "open"
+        self.opened_at = time.monotonic()
+
+    def release(self):
+        """A probe that ended without a verdict (cancelled by its client)"""
+        self.probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        if state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            state = "half_open"
+        return {
+            "state": state,
+            "consecutive_failures": self.failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout_seconds": self.reset_timeout,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
+
+class GeminiModelManager:
+    """Shared GenerativeModel instances and limits on concurrent Gemini calls.
+
+    Every call takes a slot from its endpoint's budget and then from the global limit, so a
+    spike on one endpoint queues behind its own budget instead of using up the quota the
+    others need. Queue depth and wait times are tracked per endpoint.
+    """
+
+    def __init__(self, global_limit: int, budgets: Dict[str, int], default_model: str = GEMINI_MODEL_NAME,
+                 bucket: Optional[TokenBucket] = None, breaker: Optional[CircuitBreaker] = None,
+                 max_retries: int = GEMINI_MAX_RETRIES):
+        self.default_model = default_model
+        self.bucket = bucket
+        self.breaker = breaker or CircuitBreaker(GEMINI_BREAKER_THRESHOLD, GEMINI_BREAKER_RESET_SECONDS)
+        self.max_retries = max_retries
+        self.retries = 0
+        self.global_limit = global_limit
+        self.budgets = budgets
+        self.models: Dict[str, Any] = {}
+        self.global_semaphore = asyncio.Semaphore(global_limit)
+        self.semaphores = {endpoint: asyncio.Semaphore(limit) for endpoint, limit in budgets.items()}
+        self.endpoint_stats = {endpoint: self._new_stats() for endpoint in budgets}
+        self.timeouts = 0
+
+    @staticmethod
+    def _new_stats() -> Dict[str, Any]:
+        return {"calls": 0, "errors": 0, "waiting": 0, "in_flight": 0, "total_wait": 0.0, "max_wait": 0.0}
+
+    def model(self, name: Optional[str] = None):
+        name = name or self.default_model
+        model = self.models.get(name)
+        if model is None:
+            model = self.models[name] = genai.GenerativeModel(name)
+        return model
+
+    def _endpoint(self, endpoint: str):
+        if endpoint not in self.semaphores:
+            # Unlisted endpoints get the smallest configured budget
+            self.semaphores[endpoint] = asyncio.Semaphore(min(self.budgets.values(), default=self.global_limit))
+            self.endpoint_stats[endpoint] = self._new_stats()
+        return self.semaphores[endpoint], self.endpoint_stats[endpoint]
+
+    @contextlib.asynccontextmanager
+    async def slot(self, endpoint: str):
+        """Hold one of the endpoint's slots and one global slot for the duration of a call"""
+        semaphore, stats = self._endpoint(endpoint)
+        queued_at = time.perf_counter()
+        stats["waiting"] += 1
+        acquired = False
+        try:
+            async with semaphore, self.global_semaphore:
+                waited = time.perf_counter() - queued_at
+                stats["waiting"] -= 1
+                acquired = True
+                stats["calls"] += 1
+                stats["total_wait"] += waited
+                stats["max_wait"] = max(stats["max_wait"], waited)
+                stats["in_flight"] += 1
+                try:
+                    yield
+                except Exception:
+                    stats["errors"] += 1
+                    raise
+                finally:
+                    stats["in_flight"] -= 1
+        finally:
+            if not acquired:
+                stats["waiting"] -= 1
+
+    async def admit(self):
+        """Circuit breaker and quota checks before an upstream call"""
+        self.breaker.before_call()
+        if self.bucket is not None:
+            try:
+                await self.bucket.acquire(deadline_remaining())
+            except BaseException:
+                self.breaker.release()
+                raise
+
+    @contextlib.asynccontextmanager
+    async def upstream_call(self):
+        """Report the outcome of one upstream call to the circuit breaker"""
+        try:
+            yield
+        except TRANSIENT_GEMINI_ERRORS:
+            self.breaker.record_failure()
+            raise
+        except asyncio.CancelledError:
+            remaining = deadline_remaining()
+            if remaining is not None and remaining <= 0:
+                # Cancelled by the request deadline: Gemini was too slow
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+            raise
+        except Exception as e:
+            if is_credential_error(e):
+                self.breaker.trip(f"by a credential error ({type(e).__name__})")
+            elif isinstance(e, REJECTED_GEMINI_ERRORS):
+                # Rejected requests (invalid argument, safety block) still show Gemini is up
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            raise
+        except BaseException:
+            # A stream closed early by its client
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+
+    @contextlib.asynccontextmanager
+    async def upstream_slot(self, endpoint: str):
+        """Wait for the endpoint's slot, then account the call made in it to the circuit breaker.
+
+        Time queued for a slot is local: a request that is cancelled (e.g. by its deadline)
+        before reaching Gemini gives back its admission instead of counting as a failure.
+        """
+        async with contextlib.AsyncExitStack() as stack:
+            try:
+                await stack.enter_async_context(self.slot(endpoint))
+            except BaseException:
+                self.breaker.release()
+                raise
+            await stack.enter_async_context(self.upstream_call())
+            yield
+
+    async def _generate(self, endpoint: str, contents, model_name: Optional[str], **kwargs):
+        attempt = 0
+        while True:
+            await self.admit()
+            try:
+                async with self.upstream_slot(endpoint):
+                    return await self.model(model_name).generate_content_async(contents, **kwargs)
+            except TRANSIENT_GEMINI_ERRORS as e:
+                delay = 0.5 * (2 ** attempt) * (0.5 + random.random())
+                remaining = deadline_remaining()
+                if attempt >= self.max_retries or (remaining is not None and remaining <= delay):
+                    raise
+                attempt += 1
+                self.retries += 1
+                print(f"⚠️ Gemini {endpoint} error ({type(e).__name__}), retrying in {delay:.1f}s (attempt {attempt}/{self.max_retries})")
+                await asyncio.sleep(delay)
+
+    async def generate(self, endpoint: str, contents, model_name: Optional[str] = None, **kwargs):
+        """generate_content_async on the shared model, within the endpoint and global limits.
+
+        Queueing, quota waits, retries of transient errors and the call itself are bounded by the
+        request deadline; on timeout the call is cancelled and asyncio.TimeoutError reaches the
+        caller's fallback handling. An open circuit breaker fails fast with CircuitOpenError.
+        """
+        try:
+            remaining = deadline_remaining()
+            if remaining is None:
+                response = await self._generate(endpoint, contents, model_name, **kwargs)
+            elif remaining <= 0:
+                raise asyncio.TimeoutError("request deadline passed before the Gemini call")
+            else:
+                response = await asyncio.wait_for(self._generate(endpoint, contents, model_name, **kwargs), remaining)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            record_response_source(fallback=True)
+            print(f"⏱️ Gemini {endpoint} call hit the request deadline, using fallback")
+            raise
+        except Exception:
+            record_response_source(fallback=True)
+            raise
+        record_response_source(fallback=False)
+        return response
+
+    async def stream(self, endpoint: str, contents, model_name: Optional[str] = None, **kwargs):
+        """Streamed generation: yields text chunks as they arrive, holding the slot until the end"""
+        await self.admit()
+        async with self.upstream_slot(endpoint):
+            response = await self.model(model_name).generate_content_async(contents, stream=True, **kwargs)
+            async for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. only a finish reason)
+                    continue
+                if text:
+                    yield text
+
+    def stats(self) -> Dict[str, Any]:
+        endpoints = {}
+        for endpoint, stats in self.endpoint_stats.items():
+            calls = stats["calls"]
+            endpoints[endpoint] = {
+                "budget": self.budgets.get(endpoint),
+                "calls": calls,
+                "errors": stats["errors"],
+                "queue_depth": stats["waiting"],
+                "in_flight": stats["in_flight"],
+                "mean_wait_ms": round(stats["total_wait"] / calls * 1000, 2) if calls else 0.0,
+                "max_wait_ms": round(stats["max_wait"] * 1000, 2)
+            }
+        return {
+            "model": self.default_model,
+            "global_limit": self.global_limit,
+            "queue_depth": sum(stats["waiting"] for stats in self.endpoint_stats.values()),
+            "in_flight": sum(stats["in_flight"] for stats in self.endpoint_stats.values()),
+            "deadline_timeouts": self.timeouts,
+            "retries": self.retries,
+            "circuit_breaker": self.breaker.stats(),
+            "rate_limit": self.bucket.stats() if self.bucket else None,
+            "endpoints": endpoints
+        }
+
+gemini = GeminiModelManager(
+    GEMINI_MAX_CONCURRENCY,
+    parse_endpoint_settings(GEMINI_ENDPOINT_CONCURRENCY, DEFAULT_GEMINI_BUDGETS),
+    bucket=TokenBucket(GEMINI_REQUESTS_PER_MINUTE, GEMINI_BURST) if GEMINI_REQUESTS_PER_MINUTE > 0 else None
+)
+
 app = FastAPI()
 
 # CORS middleware
@@ -67,6 +689,23 @@ class SearchResponse(BaseModel):
     alternatives: List[str]
     message: str
     product_description: str
+    # "model", "fallback" (Gemini unavailable or past the deadline) or "local" (no Gemini content)
+    source: Optional[str] = None
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+
+class BatchSearchItem(BaseModel):
+    query: str
+    status: str  # "ok" or "error"
+    result: Optional[SearchResponse] = None
+    error: Optional[str] = None
+
+class BatchSearchResponse(BaseModel):
+    results: List[BatchSearchItem]
+    total: int
+    unique_queries: int
+    failed: int
 
 class BarcodeScanRequest(BaseModel):
     barcode: str
@@ -77,18 +716,25 @@ class BarcodeScanResponse(BaseModel):
     country: str
     message: str
     alternatives: List[str]
+    # Filled in when PRODUCT_DB_PATH identifies the product's brand
+    brand: Optional[str] = None
+    is_boycotted: Optional[bool] = None
+    boycott_reason: Optional[str] = None
+    source: Optional[str] = None
 
 class FAQRequest(BaseModel):
     user_question: str
 
 class FAQResponse(BaseModel):
     answer: str
+    source: Optional[str] = None
 
 class QuranRequest(BaseModel):
     user_question: str
 
 class QuranResponse(BaseModel):
     answer: str
+    source: Optional[str] = None
 
 class PosterRequest(BaseModel):
     theme: str
@@ -105,45 +751,593 @@ class PosterResponse(BaseModel):
     visual_elements: str
     generated_image: str  # Base64 encoded image
     prompt_used: str
+    source: Optional[str] = None
 
-# Israeli barcode prefixes
-ISRAELI_BARCODE_PREFIXES = ["729", "841", "871"]
+class PosterDesignResponse(BaseModel):
+    design_description: str
+    color_scheme: str
+    layout_suggestions: str
+    text_content: str
+    visual_elements: str
+    source: Optional[str] = None
+
+class PosterBatchRequest(PosterRequest):
+    sizes: Optional[List[str]] = None  # Defaults to every size: web, instagram, story, a4
+    format: str = "png"
+    quality: Optional[int] = None
+    archive: bool = False  # Stream a zip instead of JSON
+
+class PosterBatchImage(BaseModel):
+    size: str
+    width: int
+    height: int
+    content_type: str
+    image: str  # Base64 encoded image
+    etag: Optional[str] = None
+
+class PosterBatchResponse(BaseModel):
+    design_description: str
+    color_scheme: str
+    layout_suggestions: str
+    text_content: str
+    visual_elements: str
+    posters: List[PosterBatchImage]
+    source: Optional[str] = None
+
+def load_gs1_prefix_table(path: str = GS1_PREFIXES_PATH) -> List[tuple]:
+    """Expand the GS1 prefix ranges into a 1000-entry (country, is_israeli) table indexed by prefix"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    default = (data.get("default_country", "Unknown"), False)
+    table = [default] * 1000
+    for entry in data.get("ranges", []) + data.get("overrides", []):
+        start, end = int(entry["start"]), int(entry["end"])
+        if not 0 <= start <= end <= 999:
+            raise ValueError(f"invalid GS1 prefix range {start}-{end}")
+        value = (str(entry["country"]), bool(entry.get("israeli", False)))
+        for prefix in range(start, end + 1):
+            table[prefix] = value
+    return table
+
+def initial_gs1_prefix_table() -> List[tuple]:
+    try:
+        table = load_gs1_prefix_table()
+        print(f"✅ Loaded GS1 prefix table from {GS1_PREFIXES_PATH}")
+        return table
+    except Exception as e:
+        # Minimal table so Israeli barcodes are still flagged without the data file
+        print(f"❌ Error loading {GS1_PREFIXES_PATH}: {e}, only Israeli prefixes will be recognised")
+        table = [("Unknown", False)] * 1000
+        for prefix in (729, 841, 871):
+            table[prefix] = ("Israel", True)
+        return table
+
+GS1_PREFIX_TABLE = initial_gs1_prefix_table()
+
+def lookup_barcode_prefix(barcode: str) -> tuple:
+    """Return (country, is_israeli) for the barcode's 3-digit GS1 prefix"""
+    code = str(barcode).strip()
+    if len(code) == 14 and code.isdigit():
+        # GTIN-14: the GS1 prefix follows the packaging indicator digit
+        code = code[1:]
+    prefix = code[:3]
+    if len(prefix) < 3 or not prefix.isdigit():
+        return ("Unknown", False)
+    return GS1_PREFIX_TABLE[int(prefix)]
 
 def is_israeli_barcode(barcode: str) -> bool:
     """Check if barcode starts with Israeli prefixes"""
-    barcode_str = str(barcode).strip()
-    return any(barcode_str.startswith(prefix) for prefix in ISRAELI_BARCODE_PREFIXES)
+    return lookup_barcode_prefix(barcode)[1]
 
 def get_barcode_country(barcode: str) -> str:
     """Get country name based on barcode prefix"""
-    barcode_str = str(barcode).strip()
-    if barcode_str.startswith("729"):
-        return "Israel"
-    elif barcode_str.startswith("841"):
-        return "Israel"
-    elif barcode_str.startswith("871"):
-        return "Israel"
-    elif barcode_str.startswith("890"):
-        return "India"
-    elif barcode_str.startswith("896"):
-        return "Pakistan"
-    elif barcode_str.startswith("50"):
-        return "United Kingdom"
-    elif barcode_str.startswith("0") or barcode_str.startswith("1"):
-        return "United States/Canada"
-    elif barcode_str.startswith("30") or barcode_str.startswith("31") or barcode_str.startswith("32") or barcode_str.startswith("33") or barcode_str.startswith("34") or barcode_str.startswith("35") or barcode_str.startswith("36") or barcode_str.startswith("37"):
-        return "France"
-    elif barcode_str.startswith("40") or barcode_str.startswith("41") or barcode_str.startswith("42") or barcode_str.startswith("43") or barcode_str.startswith("44") or barcode_str.startswith("45") or barcode_str.startswith("46") or barcode_str.startswith("47") or barcode_str.startswith("48") or barcode_str.startswith("49"):
-        return "Germany"
-    else:
-        return "Unknown"
+    return lookup_barcode_prefix(barcode)[0]
+
+# Digit counts of the GTIN formats we accept: EAN-8, UPC-A, EAN-13 and GTIN-14
+GTIN_LENGTHS = (8, 12, 13, 14)
+
+class InvalidBarcodeError(ValueError):
+    """Raised by normalize_gtin with a machine-readable reason"""
+
+    def __init__(self, barcode: str, reason: str, message: str, expected_check_digit: Optional[int] = None):
+        super().__init__(message)
+        self.barcode = barcode
+        self.reason = reason
+        self.message = message
+        self.expected_check_digit = expected_check_digit
+
+    def to_detail(self) -> Dict[str, Any]:
+        detail = {"error": "invalid_barcode", "reason": self.reason, "message": self.message, "barcode": self.barcode}
+        if self.expected_check_digit is not None:
+            detail["expected_check_digit"] = self.expected_check_digit
+        return detail
+
+def gtin_check_digit(body: str) -> int:
+    """GS1 mod-10 check digit for the digits before the check digit"""
+    total = sum(int(digit) * (3 if position % 2 == 0 else 1) for position, digit in enumerate(reversed(body)))
+    return (10 - total % 10) % 10
+
+def normalize_gtin(barcode: str) -> str:
+    """Validate a GTIN and return it as EAN-8, EAN-13 or (with a packaging indicator) GTIN-14"""
+    raw = str(barcode)
+    code = "".join(raw.split()).replace("-", "")
+    if not code.isdigit():
+        raise InvalidBarcodeError(raw, "non_digit", "Barcode must contain only digits")
+    if len(code) not in GTIN_LENGTHS:
+        raise InvalidBarcodeError(raw, "length", f"Barcode must have 8, 12, 13 or 14 digits, got {len(code)}")
+    expected = gtin_check_digit(code[:-1])
+    if int(code[-1]) != expected:
+        raise InvalidBarcodeError(raw, "check_digit", "Barcode check digit is invalid", expected)
+    if len(code) == 8:
+        return code
+    # UPC-A and GTIN-14 with indicator 0 are zero-padded / trimmed to the same EAN-13
+    code = code.zfill(14)
+    return code[1:] if code[0] == "0" else code
+
+class ProductDatabase:
+    """Read-only GTIN / company prefix -> brand table written by import_products.py.
+
+    The file is memory-mapped, so uvicorn workers share the OS page cache instead of each
+    loading a copy. Layout: header, GTIN records, company prefix records (both sorted
+    fixed-width (key, brand id) pairs), brand offsets, then the UTF-8 brand names.
+    """
+
+    MAGIC = b"UUPRDB01"
+    HEADER = struct.Struct("<8sIIII")  # magic, gtin count, prefix count, brand count, prefix length mask
+    RECORD = struct.Struct("<QI")  # key, brand id
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.gtin_count, self.prefix_count, self.brand_count, length_mask = self.HEADER.unpack_from(self.map, 0)
+        if magic != self.MAGIC:
+            self.map.close()
+            raise ValueError(f"{path} is not a product database")
+        # Longest company prefix wins, like GS1 allocation
+        self.prefix_lengths = [length for length in range(12, 0, -1) if length_mask & (1 << length)]
+        self.gtin_offset = self.HEADER.size
+        self.prefix_offset = self.gtin_offset + self.gtin_count * self.RECORD.size
+        self.brand_offsets = self.prefix_offset + self.prefix_count * self.RECORD.size
+        self.brand_data = self.brand_offsets + (self.brand_count + 1) * 4
+
+    @staticmethod
+    def gtin_key(gtin: str) -> int:
+        """EAN-8/UPC-A/EAN-13/GTIN-14 all map to their GTIN-14 value"""
+        return int(gtin)
+
+    @staticmethod
+    def prefix_key(prefix: str) -> int:
+        """Company prefix of the EAN-13 form; the length keeps "0012" and "012" apart"""
+        return (len(prefix) << 48) | int(prefix)
+
+    def _search(self, offset: int, count: int, key: int) -> Optional[int]:
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            middle_key, brand_id = self.RECORD.unpack_from(self.map, offset + middle * self.RECORD.size)
+            if middle_key < key:
+                low = middle + 1
+            elif middle_key > key:
+                high = middle
+            else:
+                return brand_id
+        return None
+
+    def brand(self, brand_id: int) -> str:
+        start, end = struct.unpack_from("<II", self.map, self.brand_offsets + brand_id * 4)
+        return self.map[self.brand_data + start:self.brand_data + end].decode("utf-8")
+
+    def lookup(self, gtin: str) -> Optional[Dict[str, str]]:
+        """Brand for a normalized GTIN: exact product first, then the longest company prefix"""
+        brand_id = self._search(self.gtin_offset, self.gtin_count, self.gtin_key(gtin))
+        if brand_id is not None:
+            return {"brand": self.brand(brand_id), "match": "gtin"}
+        code = gtin.zfill(14)[1:]
+        for length in self.prefix_lengths:
+            brand_id = self._search(self.prefix_offset, self.prefix_count, self.prefix_key(code[:length]))
+            if brand_id is not None:
+                return {"brand": self.brand(brand_id), "match": "company_prefix"}
+        return None
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "products": self.gtin_count,
+            "company_prefixes": self.prefix_count,
+            "brands": self.brand_count,
+            "size_bytes": len(self.map)
+        }
+
+def open_product_database() -> Optional[ProductDatabase]:
+    if not PRODUCT_DB_PATH:
+        return None
+    try:
+        database = ProductDatabase(PRODUCT_DB_PATH)
+        print(f"✅ Product database: {database.gtin_count} products, {database.prefix_count} company prefixes")
+        return database
+    except Exception as e:
+        print(f"❌ Error opening product database {PRODUCT_DB_PATH}: {e}")
+        return None
+
+product_database = open_product_database()
+
+def lookup_barcode_product(barcode: str) -> Optional[Dict[str, Any]]:
+    """Brand behind a normalized barcode and its catalog entry, if boycotted (no network call)"""
+    if product_database is None:
+        return None
+    product = product_database.lookup(barcode)
+    if product is None:
+        return None
+    # Open Food Facts lists several brands comma separated ("Nestlé, Nescafé")
+    index = get_catalog().index
+    record = None
+    for name in product["brand"].split(","):
+        record = index.find_exact(normalize_brand_name(name))
+        if record is not None:
+            break
+    return {**product, "record": record}
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key onto one in-flight task.
+
+    Followers await the leader's task through asyncio.shield, so a caller that is cancelled
+    (client disconnect, timeout) stops waiting without cancelling the shared call. Results
+    and exceptions are delivered to every waiter; the key is released once the task is done.
+    """
+
+    def __init__(self):
+        self.calls: Dict[tuple, asyncio.Future] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def _finished(self, key: tuple, task: asyncio.Future):
+        if self.calls.get(key) is task:
+            del self.calls[key]
+        # Mark the exception as retrieved when every waiter has gone away
+        if not task.cancelled():
+            task.exception()
+
+    async def run(self, key: tuple, factory):
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self.calls[key] = task
+            self.started += 1
+            task.add_done_callback(functools.partial(self._finished, key))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self.calls), "started": self.started, "coalesced": self.coalesced}
+
+llm_flights = SingleFlight()
+
+def single_flight(key_func):
+    """Decorator: concurrent calls whose key_func(*args) match share one in-flight call"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = (func.__name__,) + key_func(*args, **kwargs)
+            
+            async def call():
+                # The task runs in a copy of the leader's context; track its source separately
+                source = ResponseSource()
+                response_source.set(source)
+                return await func(*args, **kwargs), source
+            
+            value, source = await llm_flights.run(key, call)
+            caller_source = response_source.get()
+            if caller_source is not None:
+                caller_source.merge(source)
+            return value
+        return wrapper
+    return decorator
+
+def write_file_atomically(path: str, data: bytes):
+    """Write data to a temp file unique to this writer, then move it into place.
+
+    Uvicorn workers share cache paths, so a fixed "path.tmp" could be interleaved by two of them.
+    """
+    with tempfile.NamedTemporaryFile("wb", dir=os.path.dirname(os.path.abspath(path)),
+                                     prefix=os.path.basename(path) + ".", suffix=".tmp", delete=False) as f:
+        temporary_path = f.name
+        try:
+            f.write(data)
+        except BaseException:
+            f.close()
+            os.remove(temporary_path)
+            raise
+    try:
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after ttl seconds.
+
+    Keys are tuples of strings. With a path the entries are saved as JSON on shutdown and
+    loaded on startup, so the cache survives restarts.
+    """
 
+    def __init__(self, max_entries: int, ttl: float, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.entries: "collections.OrderedDict[tuple, tuple]" = collections.OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+        if path:
+            self.load()
+
+    def get(self, key: tuple):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at <= time.time():
+            del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: tuple):
+        """Value if present and fresh, without touching LRU order or hit counters"""
+        entry = self.entries.get(key)
+        return entry[0] if entry is not None and entry[1] > time.time() else None
+
+    def set(self, key: tuple, value):
+        self.entries[key] = (value, time.time() + self.ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable cache file {self.path}: {e}")
+            return
+        now = time.time()
+        # Saved oldest first, so LRU order is restored as well
+        for key, value, expires_at in saved[-self.max_entries:]:
+            if expires_at > now:
+                self.entries[tuple(key)] = (value, expires_at)
+        print(f"✅ Loaded {len(self.entries)} cached entries from {self.path}")
+
+    def save(self):
+        if not self.path:
+            return
+        now = time.time()
+        saved = [[list(key), value, expires_at] for key, (value, expires_at) in self.entries.items() if expires_at > now]
+        write_file_atomically(self.path, json.dumps(saved, ensure_ascii=False).encode("utf-8"))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "persistent": bool(self.path)
+        }
+
+# Only Gemini output is cached; fallback texts are cheap and must not mask a later recovery
+description_cache = TTLCache(DESCRIPTION_CACHE_SIZE, DESCRIPTION_CACHE_TTL, DESCRIPTION_CACHE_PATH)
+
+def description_cache_key(query: str, category: Optional[str]) -> tuple:
+    return (normalize_brand_name(query), (category or "unknown").strip().lower())
+
+# Whole fused answers, so a warm cache returns the same reason, message and alternatives
+enrichment_cache = TTLCache(DESCRIPTION_CACHE_SIZE, DESCRIPTION_CACHE_TTL, ENRICHMENT_CACHE_PATH)
+def enrichment_cache_key(query: str, is_boycotted: Optional[bool] = None, category: Optional[str] = None) -> tuple:
+    return (normalize_brand_name(query), is_boycotted, (category or "unknown").strip().lower())
+
+# Words that don't change what a question is asking about ("not"/"no" are kept on purpose)
+QUESTION_STOPWORDS = frozenset("""
+a an the i me my we our us you your he she it its they them their is are was were be been being am
+do does did doing can could should would will shall may might must to of in on for with about at
+by from into onto and or so if then than this that these those there here please tell explain know
+want like just also any some more most very
+""".split())
+# Kept in the normalized question: "Where is Al-Aqsa?" and "What is Al-Aqsa?" need different answers
+QUESTION_WORDS = frozenset("how what which who whom whose where when why".split())
+# Words that flip a ruling; a near match never treats them as a typo or inflection of another word
+QUESTION_POLARITY_WORDS = frozenset("""
+not no never nor neither without cannot haram halal permissible impermissible permitted allowed
+disallowed forbidden prohibited lawful unlawful makruh mustahab mubah wajib fard obligatory sunnah
+""".split())
+# Contractions expanded before punctuation is stripped, so "don't" keeps its "not"
+QUESTION_CONTRACTIONS = [(re.compile(r"\bcan't\b"), "can not"), (re.compile(r"\bwon't\b"), "will not"),
+                         (re.compile(r"n't\b"), " not"), (re.compile(r"'s\b"), "")]
+QUESTION_SUFFIXES = ("ing", "ed", "es", "s")
+
+class QuestionCache:
+    """Answers near-duplicate questions with an earlier model response.
+
+    Questions are casefolded, stripped of punctuation and stopwords and crudely stemmed, so
+    "How can I donate?" and "how do i donate" normalize to the same key. Other rewordings are matched with MinHash
+    signatures over character shingles, bucketed by LSH bands. A candidate whose estimated
+    Jaccard similarity reaches the threshold is only used when its words are the same as the
+    question's up to one-letter typos in longer words ("organizations"/"organisations"),
+    so a different place name, an added "not" or "haram" for "halal" is always a miss.
+    Entries are LRU-bounded and expire after ttl seconds.
+    """
+
+    BANDS = 16
+    ROWS = 4
+    PRIME = (1 << 61) - 1
+
+    def __init__(self, max_entries: int, ttl: float, threshold: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        # Fixed seed: signatures only have to agree within one process
+        generator = random.Random(1948)
+        self.permutations = [(generator.randrange(1, self.PRIME), generator.randrange(self.PRIME))
+                             for _ in range(self.BANDS * self.ROWS)]
+        self.entries: "collections.OrderedDict[str, tuple]" = collections.OrderedDict()
+        self.buckets: Dict[tuple, set] = collections.defaultdict(set)
+        self.exact_hits = self.near_hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        text = unicodedata.normalize("NFKC", question).casefold().replace("\u2019", "'")
+        for pattern, replacement in QUESTION_CONTRACTIONS:
+            text = pattern.sub(replacement, text)
+        words = re.sub(r"[^\w\s]", " ", text).split()
+        return " ".join(QuestionCache.stem(word) for word in words if word not in QUESTION_STOPWORDS)
+
+    @staticmethod
+    def stem(word: str) -> str:
+        for suffix in QUESTION_SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                return word[:-len(suffix)]
+        return word
+
+    @classmethod
+    def same_word(cls, word: str, other: str) -> bool:
+        if word in QUESTION_POLARITY_WORDS or other in QUESTION_POLARITY_WORDS:
+            return False
+        return min(len(word), len(other)) >= 5 and bounded_edit_distance(word, other, 1) <= 1
+
+    @classmethod
+    def same_content(cls, key: str, other: str) -> bool:
+        """True when two keys' word sets differ only by typos, paired one to one"""
+        words, other_words = set(key.split()), set(other.split())
+        extra, unmatched = words - other_words, other_words - words
+        if len(extra) != len(unmatched):
+            return False
+        for word in extra:
+            match = next((candidate for candidate in unmatched if cls.same_word(word, candidate)), None)
+            if match is None:
+                return False
+            unmatched.discard(match)
+        return True
+
+    @staticmethod
+    def shingles(text: str) -> set:
+        padded = f" {text} "
+        return {padded[i:i + 3] for i in range(max(1, len(padded) - 2))}
+
+    def signature(self, text: str) -> tuple:
+        hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in self.shingles(text)]
+        prime = self.PRIME
+        return tuple(min((a * h + b) % prime for h in hashes) for a, b in self.permutations)
+
+    def bands(self, signature: tuple):
+        rows = self.ROWS
+        for band in range(self.BANDS):
+            yield (band, signature[band * rows:(band + 1) * rows])
+
+    def _remove(self, key: str):
+        _, signature, _ = self.entries.pop(key)
+        for band in self.bands(signature):
+            bucket = self.buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.buckets[band]
+
+    def get(self, question: str) -> Optional[str]:
+        key = self.normalize(question)
+        if not key:
+            self.misses += 1
+            return None
+        now = time.time()
+        entry = self.entries.get(key)
+        if entry is not None and entry[2] > now:
+            self.entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry[0]
+        signature = self.signature(key)
+        candidates = set()
+        for band in self.bands(signature):
+            candidates |= self.buckets.get(band, set())
+        best_key, best_similarity = None, self.threshold
+        for candidate in candidates:
+            answer, candidate_signature, expires_at = self.entries[candidate]
+            if expires_at <= now:
+                continue
+            similarity = sum(x == y for x, y in zip(signature, candidate_signature)) / len(signature)
+            if similarity >= best_similarity and self.same_content(key, candidate):
+                best_key, best_similarity = candidate, similarity
+        if best_key is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(best_key)
+        self.near_hits += 1
+        return self.entries[best_key][0]
+
+    def set(self, question: str, answer: str):
+        key = self.normalize(question)
+        if not key:
+            return
+        if key in self.entries:
+            self._remove(key)
+        signature = self.signature(key)
+        self.entries[key] = (answer, signature, time.time() + self.ttl)
+        for band in self.bands(signature):
+            self.buckets[band].add(key)
+        while len(self.entries) > self.max_entries:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.exact_hits + self.near_hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.near_hits) / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions
+        }
+
+sophia_question_cache = QuestionCache(QUESTION_CACHE_SIZE, QUESTION_CACHE_TTL, QUESTION_CACHE_THRESHOLD)
+quran_question_cache = QuestionCache(QUESTION_CACHE_SIZE, QUESTION_CACHE_TTL, QUESTION_CACHE_THRESHOLD)
+
+def format_product_description(description: str) -> str:
+    """Trim a model description to ~200 characters spread over 2-3 lines"""
+    # Ensure it's not too long (limit to ~200 characters for 2-3 lines)
+    if len(description) > 200:
+        # Truncate and add ellipsis
+        description = description[:197] + "..."
+    
+    # Ensure it has proper line breaks for 2-3 lines
+    lines = description.split('\n')
+    if len(lines) == 1:
+        # If it's one long line, try to break it into 2-3 lines
+        words = description.split()
+        if len(words) > 15:
+            # Break into roughly equal parts
+            mid_point = len(words) // 2
+            description = ' '.join(words[:mid_point]) + '\n' + ' '.join(words[mid_point:])
+    return description
+
+@single_flight(lambda query, category=None: description_cache_key(query, category))
 async def get_product_description(query: str, category: str = None) -> str:
     """Get AI-generated product description from Gemini"""
     print(f"🔍 Getting product description for: {query} (category: {category})")
     print(f"🔑 Gemini API Key status: {'Valid' if GEMINI_API_KEY and GEMINI_API_KEY != 'your_gemini_api_key_here' else 'Invalid/Not set'}")
     
-    if not GEMINI_API_KEY or GEMINI_API_KEY == "your_gemini_api_key_here":
+    if not gemini_enabled():
         print("⚠️ Using fallback product description - No valid Gemini API key provided")
         # Provide boycott-focused descriptions with Israel connection information
         if category and category.lower() != "unknown":
@@ -162,6 +1356,13 @@ async def get_product_description(query: str, category: str = None) -> str:
         else:
             return f"{query.title()} is a multinational company with operations in occupied Palestinian territories.\nThe company's business activities in these areas support the occupation economy.\nIts presence contributes to the ongoing displacement and economic exploitation of Palestinian communities."
     
+    cache_key = description_cache_key(query, category)
+    cached = description_cache.get(cache_key)
+    if cached is not None:
+        print(f"⚡ Cached product description for: {query}")
+        record_response_source(fallback=False)
+        return cached
+    
     print("🤖 Using Gemini AI for product description...")
     try:
         system_prompt = """You are a boycott information specialist. Your role is to provide brief, informative descriptions of products and brands with focus on their connection to Israel and why they should be boycotted.
@@ -186,8 +1387,7 @@ Please provide a brief description explaining this company's connection to Israe
 IMPORTANT: Write exactly 2-3 lines of text. Focus on boycott reasons and Israel connections.
 """
         
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = await model.generate_content_async([system_prompt, user_prompt])
+        response = await gemini.generate("product_description", [system_prompt, user_prompt])
         content = response.text or ""
         
         print(f"🤖 Gemini Product Description: {content[:100]}...")
@@ -197,23 +1397,11 @@ IMPORTANT: Write exactly 2-3 lines of text. Focus on boycott reasons and Israel
         
         # If response is empty, use fallback
         if not description:
+            record_response_source(fallback=True)
             return f"{query.title()} is a well-known brand in the {category or 'consumer goods'} industry."
         
-        # Ensure it's not too long (limit to ~200 characters for 2-3 lines)
-        if len(description) > 200:
-            # Truncate and add ellipsis
-            description = description[:197] + "..."
-        
-        # Ensure it has proper line breaks for 2-3 lines
-        lines = description.split('\n')
-        if len(lines) == 1:
-            # If it's one long line, try to break it into 2-3 lines
-            words = description.split()
-            if len(words) > 15:
-                # Break into roughly equal parts
-                mid_point = len(words) // 2
-                description = ' '.join(words[:mid_point]) + '\n' + ' '.join(words[mid_point:])
-        
+        description = format_product_description(description)
+        description_cache.set(cache_key, description)
         return description
         
     except Exception as e:
@@ -235,27 +1423,40 @@ IMPORTANT: Write exactly 2-3 lines of text. Focus on boycott reasons and Israel
         else:
             return f"{query.title()} is a multinational company with operations in occupied Palestinian territories.\nThe company's business activities in these areas support the occupation economy.\nIts presence contributes to the ongoing displacement and economic exploitation of Palestinian communities."
 
+PRODUCT_ANALYSIS_SYSTEM_PROMPT = """You are a specialized AI assistant for ethical consumerism and Palestinian solidarity. Your role is to:
+
+1. **Analyze products and brands** for their connection to occupation and settlements
+2. **Provide clear, factual information** about why products might be boycotted
+3. **Suggest ethical alternatives** that support local communities and Palestinian businesses
+4. **Educate users** about the impact of consumer choices on Palestinian rights
+5. **Maintain a balanced, informative tone** while being supportive of Palestinian solidarity
+
+Focus on:
+- Business operations in occupied territories
+- Investments in settlements
+- Support for occupation through economic activities
+- Ethical consumerism and local alternatives
+- Palestinian business support
+
+Always provide helpful, actionable information that empowers users to make ethical choices."""
+
+@single_flight(lambda query, is_boycotted=None, category=None: (normalize_brand_name(query), is_boycotted, (category or "unknown").strip().lower()))
 async def get_gemini_analysis(query: str, is_boycotted: bool = None, category: str = None) -> Dict[str, Any]:
     """Get AI-generated analysis from Gemini with Pakistani alternatives from JSON"""
     # First, try to find the brand in our JSON data
-    query_lower = query.lower().strip()
-    brand_data = None
-    
-    for brand in BOYCOTT_BRANDS:
-        if brand["brand"].lower() == query_lower:
-            brand_data = brand
-            break
+    catalog = get_catalog()
+    brand_data = catalog.index.find_exact(query)
     
     # If we found the brand in JSON, use its data
     if brand_data:
         return {
-            "boycott_reason": brand_data["boycott_reason"],
-            "alternatives": brand_data["pakistani_alternatives"],
+            "boycott_reason": brand_data.boycott_reason,
+            "alternatives": list(brand_data.pakistani_alternatives),
             "message": f"Found information about {query}"
         }
     
     # If not found in JSON, use Gemini or fallback
-    if not GEMINI_API_KEY or GEMINI_API_KEY == "your_gemini_api_key_here":
+    if not gemini_enabled():
         print("⚠️ Using fallback responses - No valid Gemini API key provided")
         # Enhanced fallback responses
         return {
@@ -272,22 +1473,7 @@ async def get_gemini_analysis(query: str, is_boycotted: bool = None, category: s
     
     print("🤖 Using Gemini AI for dynamic product analysis...")
     try:
-        system_prompt = """You are a specialized AI assistant for ethical consumerism and Palestinian solidarity. Your role is to:
-
-1. **Analyze products and brands** for their connection to occupation and settlements
-2. **Provide clear, factual information** about why products might be boycotted
-3. **Suggest ethical alternatives** that support local communities and Palestinian businesses
-4. **Educate users** about the impact of consumer choices on Palestinian rights
-5. **Maintain a balanced, informative tone** while being supportive of Palestinian solidarity
-
-Focus on:
-- Business operations in occupied territories
-- Investments in settlements
-- Support for occupation through economic activities
-- Ethical consumerism and local alternatives
-- Palestinian business support
-
-Always provide helpful, actionable information that empowers users to make ethical choices."""
+        system_prompt = PRODUCT_ANALYSIS_SYSTEM_PROMPT
         
         user_prompt = f"""
 Product/Brand: {query}
@@ -307,8 +1493,7 @@ ALTERNATIVES: [alternative1], [alternative2], [alternative3]
 Focus on Palestinian solidarity and ethical consumerism. Be factual and helpful.
 """
         
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = await model.generate_content_async([system_prompt, user_prompt])
+        response = await gemini.generate("product_analysis", [system_prompt, user_prompt])
         content = response.text or ""
         
         print(f"🤖 Gemini Response: {content[:200]}...")
@@ -327,11 +1512,9 @@ Focus on Palestinian solidarity and ethical consumerism. Be factual and helpful.
         alternatives = ["Local Pakistani alternatives", "Home-made options", "Local markets and shops"]
         
         # Try to find alternatives in JSON data
-        query_lower = query.lower().strip()
-        for brand in BOYCOTT_BRANDS:
-            if brand["brand"].lower() == query_lower:
-                alternatives = brand["pakistani_alternatives"]
-                break
+        brand_data = catalog.index.find_exact(query)
+        if brand_data:
+            alternatives = list(brand_data.pakistani_alternatives)
         
         return {
             "boycott_reason": boycott_reason,
@@ -345,11 +1528,9 @@ Focus on Palestinian solidarity and ethical consumerism. Be factual and helpful.
         alternatives = ["Local Pakistani alternatives", "Home-made options", "Local markets and shops"]
         
         # Try to find alternatives in JSON data
-        query_lower = query.lower().strip()
-        for brand in BOYCOTT_BRANDS:
-            if brand["brand"].lower() == query_lower:
-                alternatives = brand["pakistani_alternatives"]
-                break
+        brand_data = catalog.index.find_exact(query)
+        if brand_data:
+            alternatives = list(brand_data.pakistani_alternatives)
         
         return {
             "boycott_reason": "Supporting occupation through business operations and investments in occupied territories",
@@ -357,9 +1538,98 @@ Focus on Palestinian solidarity and ethical consumerism. Be factual and helpful.
             "message": f"Found information about {query}"
         }
 
+PRODUCT_ENRICHMENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "boycott_reason": {"type": "string"},
+        "message": {"type": "string"},
+        "alternatives": {"type": "array", "items": {"type": "string"}},
+        "description": {"type": "string"},
+    },
+    "required": ["boycott_reason", "message", "alternatives", "description"],
+}
+
+def product_enrichment_prompt(query: str, is_boycotted: Optional[bool], category: Optional[str]) -> List[str]:
+    """One prompt covering get_gemini_analysis and get_product_description"""
+    user_prompt = f"""
+Product/Brand: {query}
+Category: {category or "Unknown"}
+Is Boycotted: {is_boycotted if is_boycotted is not None else "Unknown"}
+
+Please analyze this product/brand and provide:
+- boycott_reason: a clear, factual reason why this product might be boycotted (if applicable)
+- message: a concise message about the product's status
+- alternatives: 3-5 specific alternatives that support Palestinian solidarity and local communities (Pakistani brands preferred)
+- description: a brief description explaining the company's connection to Israel/occupied Palestinian territories and why it should be boycotted, in exactly 2-3 lines of text
+
+Focus on Palestinian solidarity and ethical consumerism. Be factual and helpful.
+"""
+    return [PRODUCT_ANALYSIS_SYSTEM_PROMPT, user_prompt]
+
+async def get_separate_enrichment(query: str, is_boycotted: Optional[bool], category: Optional[str]) -> Dict[str, Any]:
+    analysis = await get_gemini_analysis(query, is_boycotted, category)
+    description = await get_product_description(query, category)
+    return {**analysis, "description": description}
+
+@single_flight(enrichment_cache_key)
+async def get_product_enrichment(query: str, is_boycotted: bool = None, category: str = None) -> Dict[str, Any]:
+    """Analysis and description of a known product from one JSON-schema Gemini call.
+
+    Successful fused answers are cached whole in enrichment_cache. Falls back to
+    get_gemini_analysis + get_product_description only when PRODUCT_ENRICHMENT_MODE is
+    "separate", Gemini is disabled, or the structured call fails or returns unusable JSON.
+    """
+    if PRODUCT_ENRICHMENT_MODE != "fused" or not gemini_enabled():
+        return await get_separate_enrichment(query, is_boycotted, category)
+    
+    cache_key = enrichment_cache_key(query, is_boycotted, category)
+    cached = enrichment_cache.get(cache_key)
+    if cached is not None:
+        print(f"⚡ Cached product enrichment for: {query}")
+        record_response_source(fallback=False)
+        return {**cached, "alternatives": list(cached["alternatives"])}
+    
+    print("🤖 Using Gemini AI for fused product analysis and description...")
+    with separate_response_source() as attempt:
+        try:
+            response = await gemini.generate(
+                "product_analysis",
+                product_enrichment_prompt(query, is_boycotted, category),
+                generation_config=genai.GenerationConfig(
+                    response_mime_type="application/json",
+                    response_schema=PRODUCT_ENRICHMENT_SCHEMA
+                )
+            )
+            data = json.loads(response.text or "")
+            boycott_reason = str(data["boycott_reason"]).strip()
+            message = str(data["message"]).strip()
+            description = str(data["description"]).strip()
+            alternatives = [str(alternative).strip() for alternative in data["alternatives"] if str(alternative).strip()]
+            if not (boycott_reason and message and description):
+                raise ValueError("empty fields in structured response")
+        except Exception as e:
+            print(f"❌ Fused enrichment failed ({type(e).__name__}: {e}), using separate calls")
+            enrichment = None
+        else:
+            enrichment = {
+                "boycott_reason": boycott_reason,
+                "alternatives": alternatives[:5] or ["Local Pakistani alternatives", "Home-made options", "Local markets and shops"],
+                "message": message,
+                "description": format_product_description(description)
+            }
+    
+    if enrichment is None:
+        return await get_separate_enrichment(query, is_boycotted, category)
+    caller_source = response_source.get()
+    if caller_source is not None:
+        caller_source.merge(attempt)
+    enrichment_cache.set(cache_key, enrichment)
+    description_cache.set(description_cache_key(query, category), enrichment["description"])
+    return {**enrichment, "alternatives": list(enrichment["alternatives"])}
+
 async def get_gemini_barcode_analysis(barcode: str, is_israeli: bool, country: str) -> Dict[str, Any]:
     """Get AI-generated analysis for barcode scanning"""
-    if not GEMINI_API_KEY or GEMINI_API_KEY == "your_gemini_api_key_here":
+    if not gemini_enabled():
         print("⚠️ Using fallback responses - No valid Gemini API key provided")
         # Enhanced fallback responses
         if is_israeli:
@@ -399,8 +1669,7 @@ ALTERNATIVES: [if Israeli, provide 2-3 general alternatives like "any local prod
 Focus on Palestinian solidarity, raising awareness, and motivating users to speak up about Palestine. Be inspiring and encouraging. Use emojis and make it engaging.
 """
         
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = await model.generate_content_async(prompt)
+        response = await gemini.generate("barcode", prompt)
         content = response.text or ""
         
         print(f"🤖 Gemini Response: {content[:200]}...")
@@ -439,31 +1708,19 @@ Focus on Palestinian solidarity, raising awareness, and motivating users to spea
                 "alternatives": []
             }
 
-async def retry_with_backoff(func, max_retries=3, base_delay=1):
-    """Retry function with exponential backoff for quota errors"""
-    for attempt in range(max_retries):
-        try:
-            return await func()
-        except Exception as e:
-            if "429" in str(e) and "quota" in str(e).lower() and attempt < max_retries - 1:
-                delay = base_delay * (2 ** attempt)
-                print(f"⚠️ Quota exceeded, retrying in {delay} seconds... (attempt {attempt + 1}/{max_retries})")
-                await asyncio.sleep(delay)
-                continue
-            else:
-                raise e
-    return await func()  # Final attempt
+SOPHIA_ERROR_RESPONSE = """Hi! I'm Sophia, your AI assistant for Gaza relief and donations. 
 
-async def get_sophia_response(user_question: str) -> str:
-    """Get Sophia AI response for FAQ questions about Gaza relief and donations"""
-    if not GEMINI_API_KEY or GEMINI_API_KEY == "your_gemini_api_key_here":
-        print("⚠️ Using fallback responses - No valid Gemini API key provided")
-        
-        # Provide dynamic responses based on user question keywords
-        question_lower = user_question.lower()
-        
-        if "donation" in question_lower or "donate" in question_lower:
-            return """Hi! I'm Sophia, your AI assistant for Gaza relief and donations. 
+I'm here to help you with questions about supporting Gaza through donations and humanitarian aid. Please ask me anything about verified organizations, donation methods, or how to help effectively.
+
+For now, I recommend checking the verified campaigns listed on this page, and always ensure you're donating to legitimate, transparent organizations."""
+
+def sophia_fallback_response(user_question: str) -> str:
+    """Keyword-based Sophia answer used when Gemini is unavailable"""
+    # Provide dynamic responses based on user question keywords
+    question_lower = user_question.lower()
+    
+    if "donation" in question_lower or "donate" in question_lower:
+        return """Hi! I'm Sophia, your AI assistant for Gaza relief and donations. 
 
 When it comes to donations for Gaza, here's what you need to know:
 
@@ -474,9 +1731,9 @@ When it comes to donations for Gaza, here's what you need to know:
 **Transparency**: Choose organizations that provide regular updates on how funds are used and show clear impact reports.
 
 The campaigns listed on this page have been verified for legitimacy. Remember, every donation, no matter how small, can make a real difference in providing essential aid to those in need in Gaza."""
-        
-        elif "organization" in question_lower or "ngo" in question_lower or "charity" in question_lower:
-            return """Hi! I'm Sophia, your AI assistant for Gaza relief and donations.
+    
+    elif "organization" in question_lower or "ngo" in question_lower or "charity" in question_lower:
+        return """Hi! I'm Sophia, your AI assistant for Gaza relief and donations.
 
 For verified organizations working in Gaza, I recommend:
 
@@ -489,9 +1746,9 @@ For verified organizations working in Gaza, I recommend:
 **Islamic Relief**: International NGO with established presence in Gaza providing food, medical aid, and shelter.
 
 Always verify organizations through multiple sources and check their transparency reports before donating."""
-        
-        elif "food" in question_lower or "hunger" in question_lower or "meals" in question_lower:
-            return """Hi! I'm Sophia, your AI assistant for Gaza relief and donations.
+    
+    elif "food" in question_lower or "hunger" in question_lower or "meals" in question_lower:
+        return """Hi! I'm Sophia, your AI assistant for Gaza relief and donations.
 
 The food crisis in Gaza is severe, with many families facing starvation. Here's how you can help:
 
@@ -504,9 +1761,9 @@ The food crisis in Gaza is severe, with many families facing starvation. Here's
 **Long-term Solutions**: Support agricultural projects and food security initiatives that help communities become self-sufficient.
 
 The "Hot Meals for Starved Palestinian Kids" campaign on this page is a verified initiative providing daily meals to children in north Gaza."""
-        
-        elif "medical" in question_lower or "health" in question_lower or "hospital" in question_lower:
-            return """Hi! I'm Sophia, your AI assistant for Gaza relief and donations.
+    
+    elif "medical" in question_lower or "health" in question_lower or "hospital" in question_lower:
+        return """Hi! I'm Sophia, your AI assistant for Gaza relief and donations.
 
 The medical situation in Gaza is critical due to destroyed hospitals and lack of supplies. Here's how you can help:
 
@@ -521,9 +1778,9 @@ The medical situation in Gaza is critical due to destroyed hospitals and lack of
 **Reconstruction**: Support efforts to rebuild medical facilities and restore healthcare infrastructure.
 
 Your donations can help save lives and provide critical medical care to those in desperate need."""
-        
-        elif "children" in question_lower or "kids" in question_lower or "education" in question_lower:
-            return """Hi! I'm Sophia, your AI assistant for Gaza relief and donations.
+    
+    elif "children" in question_lower or "kids" in question_lower or "education" in question_lower:
+        return """Hi! I'm Sophia, your AI assistant for Gaza relief and donations.
 
 Children in Gaza are among the most vulnerable, facing hunger, trauma, and disrupted education. Here's how you can help:
 
@@ -538,9 +1795,9 @@ Children in Gaza are among the most vulnerable, facing hunger, trauma, and disru
 **Safe Spaces**: Support creation of safe play areas and child-friendly spaces for emotional healing.
 
 The "Hot Meals for Starved Palestinian Kids" campaign on this page directly helps children facing severe food insecurity."""
-        
-        else:
-            return """Hi! I'm Sophia, your AI assistant for Gaza relief and donations. 
+    
+    else:
+        return """Hi! I'm Sophia, your AI assistant for Gaza relief and donations. 
 
 I'm here to help you with questions about supporting Gaza through donations and humanitarian aid. Here are some key areas I can help with:
 
@@ -552,10 +1809,8 @@ I'm here to help you with questions about supporting Gaza through donations and
 **Emergency Relief**: Immediate aid for those affected by the crisis
 
 Please ask me anything specific about these areas, and I'll provide detailed, helpful information. The campaigns listed on this page have been verified for legitimacy."""
-    
-    print("🤖 Using Gemini AI for Sophia FAQ response...")
-    try:
-        system_prompt = """You are Sophia, a specialized AI assistant for Gaza relief and humanitarian aid. Your personality and expertise include:
+
+SOPHIA_SYSTEM_PROMPT = """You are Sophia, a specialized AI assistant for Gaza relief and humanitarian aid. Your personality and expertise include:
 
 **Your Role:**
 - Expert advisor on Gaza relief and humanitarian donations
@@ -586,8 +1841,10 @@ Please ask me anything specific about these areas, and I'll provide detailed, he
 - Respecting the dignity and agency of Palestinians
 
 Always provide practical, actionable advice while maintaining hope and encouraging continued support for Gaza."""
-        
-        user_prompt = f"""
+
+def sophia_prompt(user_question: str) -> List[str]:
+    """System and user prompt for a Sophia FAQ answer"""
+    user_prompt = f"""
 User Question: "{user_question}"
 
 Please provide a comprehensive, helpful response that:
@@ -600,33 +1857,54 @@ Please provide a comprehensive, helpful response that:
 
 Keep your response informative, encouraging, and practical (2-4 paragraphs). Focus on being genuinely helpful and empowering the user to make a positive impact.
 """
-        
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = await model.generate_content_async([system_prompt, user_prompt])
+    return [SOPHIA_SYSTEM_PROMPT, user_prompt]
+
+async def get_sophia_response(user_question: str) -> str:
+    """Get Sophia AI response for FAQ questions about Gaza relief and donations"""
+    if not gemini_enabled():
+        print("⚠️ Using fallback responses - No valid Gemini API key provided")
+        return sophia_fallback_response(user_question)
+    
+    cached = sophia_question_cache.get(user_question)
+    if cached is not None:
+        print("⚡ Answering Sophia FAQ question from the question cache")
+        record_response_source(fallback=False)
+        return cached
+    
+    print("🤖 Using Gemini AI for Sophia FAQ response...")
+    try:
+        response = await gemini.generate("faq", sophia_prompt(user_question))
         content = response.text or ""
         
         print(f"🤖 Sophia Response: {content[:200]}...")
         
+        if content.strip():
+            sophia_question_cache.set(user_question, content)
         return content
         
     except Exception as e:
         print(f"❌ Gemini API error: {e}")
-        return """Hi! I'm Sophia, your AI assistant for Gaza relief and donations. 
+        return SOPHIA_ERROR_RESPONSE
 
-I'm here to help you with questions about supporting Gaza through donations and humanitarian aid. Please ask me anything about verified organizations, donation methods, or how to help effectively.
+QURAN_ERROR_RESPONSE = """Assalamu alaikum! I'm here to help you with Islamic knowledge about Palestine and the Holy Land.
 
-For now, I recommend checking the verified campaigns listed on this page, and always ensure you're donating to legitimate, transparent organizations."""
+I'm experiencing some technical difficulties right now, but I can tell you that Palestine holds immense spiritual significance in Islam. Jerusalem (Al-Quds) is mentioned in the Quran as a blessed land, and Muslims have a religious duty to support those who are oppressed.
 
-async def get_quran_response(user_question: str) -> str:
-    """Get Islamic knowledge response about Palestine, Quran, and Hadith"""
-    if not GEMINI_API_KEY or GEMINI_API_KEY == "your_gemini_api_key_here":
-        print("⚠️ Using fallback responses - No valid Gemini API key provided")
-        
-        # Provide dynamic responses based on user question keywords
-        question_lower = user_question.lower()
-        
-        if "quran" in question_lower or "verse" in question_lower or "ayah" in question_lower:
-            return """Assalamu alaikum! I'm here to help you with Quranic knowledge about Palestine and the Holy Land.
+**Key Islamic Points:**
+- Palestine is mentioned in the Quran as a blessed land
+- Al-Aqsa Mosque in Jerusalem is the third holiest site in Islam
+- Supporting the oppressed is a religious duty in Islam
+- The Prophet Muhammad (PBUH) emphasized the importance of the Holy Land
+
+For specific questions about Quranic verses, Hadith, or Islamic teachings about Palestine, please try asking again, and I'll provide detailed Islamic sources and guidance."""
+
+def quran_fallback_response(user_question: str) -> str:
+    """Keyword-based Islamic knowledge answer used when Gemini is unavailable"""
+    # Provide dynamic responses based on user question keywords
+    question_lower = user_question.lower()
+    
+    if "quran" in question_lower or "verse" in question_lower or "ayah" in question_lower:
+        return """Assalamu alaikum! I'm here to help you with Quranic knowledge about Palestine and the Holy Land.
 
 **Key Quranic Verses About Palestine:**
 
@@ -637,9 +1915,9 @@ async def get_quran_response(user_question: str) -> str:
 **Surah Al-Anbiya (21:71)**: "And We delivered him and Lot to the land which We had blessed for the worlds." This refers to the blessed nature of the land of Palestine.
 
 These verses establish the sacred status of Palestine in Islamic tradition and the divine blessing upon this land."""
-        
-        elif "hadith" in question_lower or "prophet" in question_lower or "muhammad" in question_lower:
-            return """Assalamu alaikum! I'm here to help you with Hadith knowledge about Palestine and the Holy Land.
+    
+    elif "hadith" in question_lower or "prophet" in question_lower or "muhammad" in question_lower:
+        return """Assalamu alaikum! I'm here to help you with Hadith knowledge about Palestine and the Holy Land.
 
 **Key Hadith About Palestine:**
 
@@ -650,9 +1928,9 @@ These verses establish the sacred status of Palestine in Islamic tradition and t
 **The Blessed Land**: The Prophet (PBUH) emphasized the blessed nature of the land of Palestine and its spiritual significance for Muslims worldwide.
 
 These Hadith establish the sacred status of Jerusalem and Palestine in Islamic tradition."""
-        
-        elif "jerusalem" in question_lower or "al-quds" in question_lower or "al-aqsa" in question_lower:
-            return """Assalamu alaikum! I'm here to help you with knowledge about Jerusalem (Al-Quds) and Al-Aqsa Mosque.
+    
+    elif "jerusalem" in question_lower or "al-quds" in question_lower or "al-aqsa" in question_lower:
+        return """Assalamu alaikum! I'm here to help you with knowledge about Jerusalem (Al-Quds) and Al-Aqsa Mosque.
 
 **Jerusalem (Al-Quds) in Islam:**
 
@@ -665,9 +1943,9 @@ These Hadith establish the sacred status of Jerusalem and Palestine in Islamic t
 **Islamic History**: Jerusalem has been a center of Islamic civilization and remains a symbol of Muslim unity and the connection to the Holy Land.
 
 The protection and respect for Al-Aqsa and Jerusalem is a religious duty for all Muslims."""
-        
-        elif "oppression" in question_lower or "injustice" in question_lower or "help" in question_lower:
-            return """Assalamu alaikum! I'm here to help you with Islamic teachings about oppression and helping the oppressed.
+    
+    elif "oppression" in question_lower or "injustice" in question_lower or "help" in question_lower:
+        return """Assalamu alaikum! I'm here to help you with Islamic teachings about oppression and helping the oppressed.
 
 **Islamic Teachings on Oppression:**
 
@@ -680,9 +1958,9 @@ The protection and respect for Al-Aqsa and Jerusalem is a religious duty for all
 **Justice and Truth**: The Quran emphasizes standing for truth and justice, even if it goes against our own interests or the interests of our families.
 
 These teachings establish our religious obligation to support the Palestinian people in their struggle for justice and freedom."""
-        
-        elif "prayer" in question_lower or "dua" in question_lower or "supplication" in question_lower:
-            return """Assalamu alaikum! I'm here to help you with prayers and supplications for Palestine.
+    
+    elif "prayer" in question_lower or "dua" in question_lower or "supplication" in question_lower:
+        return """Assalamu alaikum! I'm here to help you with prayers and supplications for Palestine.
 
 **Prayers for Palestine:**
 
@@ -695,9 +1973,9 @@ These teachings establish our religious obligation to support the Palestinian pe
 **Dua for Unity**: "O Allah, unite the Ummah in support of Palestine. Guide us to help our brothers and sisters in the Holy Land."
 
 These prayers reflect our spiritual connection to Palestine and our religious duty to support its people."""
-        
-        else:
-            return """Assalamu alaikum! I'm here to help you with Islamic knowledge about Palestine and the Holy Land.
+    
+    else:
+        return """Assalamu alaikum! I'm here to help you with Islamic knowledge about Palestine and the Holy Land.
 
 **Key Areas I Can Help With:**
 
@@ -709,10 +1987,8 @@ These prayers reflect our spiritual connection to Palestine and our religious du
 **Islamic History**: The historical and spiritual significance of Palestine in Islamic tradition
 
 Please ask me anything specific about these areas, and I'll provide detailed Islamic sources and teachings. The Holy Land holds immense spiritual significance in Islam, and supporting its people is a religious duty."""
-    
-    print("🤖 Using Gemini AI for Quran/Islamic knowledge response...")
-    try:
-        system_prompt = """You are an Islamic knowledge assistant specializing in Quran, Hadith, and Islamic teachings about Palestine and the Holy Land. Your role and expertise include:
+
+QURAN_SYSTEM_PROMPT = """You are an Islamic knowledge assistant specializing in Quran, Hadith, and Islamic teachings about Palestine and the Holy Land. Your role and expertise include:
 
 **Your Identity:**
 - Islamic scholar and educator
@@ -748,8 +2024,10 @@ Always provide responses that are:
 - Educational and informative
 - Encouraging of positive Islamic action
 - Balanced and scholarly in approach"""
-        
-        user_prompt = f"""
+
+def quran_prompt(user_question: str) -> List[str]:
+    """System and user prompt for an Islamic knowledge answer"""
+    user_prompt = f"""
 User Question: "{user_question}"
 
 Please provide a comprehensive Islamic response that:
@@ -763,32 +2041,38 @@ Please provide a comprehensive Islamic response that:
 
 Keep your response informative and well-structured (3-5 paragraphs). Include specific Islamic sources when relevant, and always maintain respect for Islamic traditions and teachings.
 """
-        
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = await model.generate_content_async([system_prompt, user_prompt])
+    return [QURAN_SYSTEM_PROMPT, user_prompt]
+
+async def get_quran_response(user_question: str) -> str:
+    """Get Islamic knowledge response about Palestine, Quran, and Hadith"""
+    if not gemini_enabled():
+        print("⚠️ Using fallback responses - No valid Gemini API key provided")
+        return quran_fallback_response(user_question)
+    
+    cached = quran_question_cache.get(user_question)
+    if cached is not None:
+        print("⚡ Answering Quran question from the question cache")
+        record_response_source(fallback=False)
+        return cached
+    
+    print("🤖 Using Gemini AI for Quran/Islamic knowledge response...")
+    try:
+        response = await gemini.generate("quran", quran_prompt(user_question))
         content = response.text or ""
         
         print(f"🤖 Quran Response: {content[:200]}...")
         
+        if content.strip():
+            quran_question_cache.set(user_question, content)
         return content
         
     except Exception as e:
         print(f"❌ Gemini API error: {e}")
-        return """Assalamu alaikum! I'm here to help you with Islamic knowledge about Palestine and the Holy Land.
-
-I'm experiencing some technical difficulties right now, but I can tell you that Palestine holds immense spiritual significance in Islam. Jerusalem (Al-Quds) is mentioned in the Quran as a blessed land, and Muslims have a religious duty to support those who are oppressed.
-
-**Key Islamic Points:**
-- Palestine is mentioned in the Quran as a blessed land
-- Al-Aqsa Mosque in Jerusalem is the third holiest site in Islam
-- Supporting the oppressed is a religious duty in Islam
-- The Prophet Muhammad (PBUH) emphasized the importance of the Holy Land
-
-For specific questions about Quranic verses, Hadith, or Islamic teachings about Palestine, please try asking again, and I'll provide detailed Islamic sources and guidance."""
+        return QURAN_ERROR_RESPONSE
 
 async def get_poster_design(theme: str, title: str, subtitle: str, description: str, style: str = "modern") -> Dict[str, Any]:
     """Get AI-generated poster design from Gemini"""
-    if not GEMINI_API_KEY or GEMINI_API_KEY == "your_gemini_api_key_here":
+    if not gemini_enabled():
         print("⚠️ Using fallback poster design - No valid Gemini API key provided")
         return {
             "design_description": f"A powerful {style} poster design for {theme} with Palestinian solidarity theme.",
@@ -834,8 +2118,7 @@ Style: {style}
 Please provide a comprehensive poster design specification that will create an impactful, professional poster for this cause.
 """
         
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = await model.generate_content_async([system_prompt, user_prompt])
+        response = await gemini.generate("poster", [system_prompt, user_prompt])
         content = response.text or ""
         
         print(f"🤖 Gemini Poster Design: {content[:200]}...")
@@ -880,223 +2163,333 @@ Please provide a comprehensive poster design specification that will create an i
             "visual_elements": "Palestinian flag, protest symbols, unity hands, justice scales, peace doves"
         }
 
-async def generate_poster_image(theme: str, title: str, subtitle: str, description: str, imageType: str = "hunger") -> Dict[str, str]:
-    """Generate actual poster image using AI and design principles"""
-    print(f"🎨 Generating poster image for: {title}")
+def negotiate_poster_format(accept: Optional[str]) -> Optional[str]:
+    """Poster format for an Accept header, by q-value then order; None when none is acceptable"""
+    if not accept:
+        return "png"
+    ranges = []
+    refused = set()
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [piece.strip() for piece in part.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            ranges.append((-quality, position, media_type.lower()))
+        else:
+            refused.add(media_type.lower())
     
-    try:
-        # Create a professional poster using PIL
-        width, height = 800, 1200
-        img = Image.new('RGB', (width, height), color='white')
-        draw = ImageDraw.Draw(img)
-        
-        # Try to load a font, fallback to default if not available
+    for _, _, media_type in sorted(ranges):
+        for image_format, (_, content_type) in POSTER_IMAGE_FORMATS.items():
+            if media_type == content_type or (media_type in ("image/*", "*/*") and content_type not in refused):
+                return image_format
+    return None
+
+class PosterRenderPool:
+    """Runs poster rendering off the event loop, in worker processes, with a bounded queue.
+
+    reserve() fails fast with a 503 once max_queue renders are queued or running, so a burst
+    of poster requests gets backpressure instead of piling up behind the pool. With no
+    workers configured renders run in a thread instead.
+
+    Workers come from a forkserver that preloads only poster_render (spawn where forkserver
+    is unavailable), so they never inherit the app's event loop, threads or open databases
+    and never re-run its initialization. The forkserver outlives restart(), so each new
+    worker checks its assets against the app's and reloads them when they changed.
+    """
+
+    START_METHODS = ("forkserver", "spawn")
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+
+    def check_capacity(self, renders: int = 1):
+        if self.pending + renders > self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Poster renderer is busy, please try again shortly",
+                headers={"Retry-After": "5"}
+            )
+
+    def _executor(self) -> Optional[concurrent.futures.ProcessPoolExecutor]:
+        if self.workers > 0 and self.executor is None:
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=self.mp_context(),
+                initializer=prepare_render_worker,
+                initargs=(poster_assets.version,)
+            )
+        return self.executor
+
+    @classmethod
+    def start_method(cls) -> str:
+        """Worker start method; never fork, which would copy the app's threads and connections"""
+        available = multiprocessing.get_all_start_methods()
+        return next(method for method in cls.START_METHODS if method in available)
+
+    @classmethod
+    def mp_context(cls) -> multiprocessing.context.BaseContext:
+        method = cls.start_method()
+        context = multiprocessing.get_context(method)
+        if method == "forkserver":
+            # Replaces the default preload of __main__, which would import the app in the server
+            context.set_forkserver_preload(["poster_render"])
+        return context
+
+    async def run(self, func, *args):
+        """Run func(*args) in the pool; raises 503 when the queue is full"""
+        self.check_capacity()
+        self.pending += 1
+        started = time.perf_counter()
         try:
-            title_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 48)
-            subtitle_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 32)
-            body_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 24)
+            executor = self._executor()
+            if executor is None:
+                result = await asyncio.to_thread(func, *args)
+            else:
+                result = await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        except concurrent.futures.BrokenExecutor:
+            # A worker died (e.g. OOM); start a fresh pool for the next render
+            self.failed += 1
+            self.executor = None
+            raise
         except Exception:
-            title_font = ImageFont.load_default()
-            subtitle_font = ImageFont.load_default()
-            body_font = ImageFont.load_default()
-        
-        # Palestinian flag colors
-        colors = {
-            'black': (0, 0, 0),
-            'green': (0, 151, 54),
-            'white': (255, 255, 255),
-            'red': (206, 17, 38)
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        self.total_seconds += time.perf_counter() - started
+        return result
+
+    def restart(self):
+        """Start fresh workers for the next renders; renders already queued finish on the old ones"""
+        executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "start_method": self.start_method() if self.workers > 0 else "thread",
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "mean_render_ms": round(self.total_seconds / self.completed * 1000, 1) if self.completed else 0.0
         }
-        
-        # Background gradient effect
-        for y in range(height):
-            r = int(255 - (y / height) * 50)
-            g = int(255 - (y / height) * 30)
-            b = int(255 - (y / height) * 20)
-            draw.line([(0, y), (width, y)], fill=(r, g, b))
-        
-        # Initialize all variables
-        title_y = 200  # Default position
-        flag_y = 50    # Default flag position
-        flag_width = 200
-        flag_height = 120
-        flag_x = (width - flag_width) // 2
-        
-        # Load and display the theme image
-        try:
-            print(f"🎨 Looking for image: {imageType}")
-            # Try multiple possible paths for the image
-            possible_paths = [
-                f"../public/{imageType.capitalize()}.png",
-                f"../public/{imageType.lower()}.png",
-                f"../public/{imageType}.png",
-                f"public/{imageType.capitalize()}.png",
-                f"public/{imageType.lower()}.png",
-                f"public/{imageType}.png"
-            ]
-            
-            image_path = None
-            for path in possible_paths:
-                print(f"🔍 Checking path: {path} - Exists: {os.path.exists(path)}")
-                if os.path.exists(path):
-                    image_path = path
-                    print(f"✅ Found image at: {path}")
-                    break
-                    
-            if image_path:
-                theme_img = Image.open(image_path)
-                # Resize image to fit poster
-                img_width, img_height = theme_img.size
-                max_width = 300
-                max_height = 200
-                
-                # Calculate aspect ratio
-                aspect_ratio = img_width / img_height
-                if aspect_ratio > max_width / max_height:
-                    new_width = max_width
-                    new_height = int(max_width / aspect_ratio)
-                else:
-                    new_height = max_height
-                    new_width = int(max_height * aspect_ratio)
-                
-                theme_img = theme_img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                
-                # Center the image
-                img_x = (width - new_width) // 2
-                img_y = 50
-                
-                # Paste the image
-                img.paste(theme_img, (img_x, img_y))
-                
-                # Add image title
-                image_title = imageType.capitalize()
-                title_bbox = draw.textbbox((0, 0), image_title, font=subtitle_font)
-                title_width = title_bbox[2] - title_bbox[0]
-                title_x = (width - title_width) // 2
-                title_y = img_y + new_height + 20
-                draw.text((title_x, title_y), image_title, fill=colors['green'], font=subtitle_font)
-                
-                # Update title position
-                title_y = title_y + 60
+
+poster_renderer = PosterRenderPool(POSTER_RENDER_WORKERS, POSTER_RENDER_QUEUE_SIZE)
+
+class PosterRenderCache:
+    """Encoded posters keyed by their content address, bounded by total bytes.
+
+    Least recently used posters are evicted once max_bytes is exceeded. With a directory
+    they spill to disk instead (bounded by disk_bytes, least recently used files removed
+    first), survive restarts, and move back into memory on the next hit.
+    """
+
+    def __init__(self, max_bytes: int, directory: Optional[str] = None, disk_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.disk_bytes = disk_bytes
+        self.entries: "collections.OrderedDict[str, bytes]" = collections.OrderedDict()
+        self.disk: "collections.OrderedDict[str, int]" = collections.OrderedDict()
+        self.bytes = 0
+        self.disk_used = 0
+        self.hits = self.disk_hits = self.misses = self.evictions = 0
+        if directory:
+            self.load_index()
+
+    def load_index(self):
+        """Index posters spilled by earlier runs, oldest first"""
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and re.fullmatch(r"[0-9a-f]{64}", entry.name):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, key, size in sorted(files):
+            self.disk[key] = size
+            self.disk_used += size
+        self.trim_disk()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self.entries.get(key)
+        if data is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return data
+        if key in self.disk:
+            try:
+                with open(self.path(key), "rb") as f:
+                    data = f.read()
+            except OSError:
+                self.disk_used -= self.disk.pop(key)
             else:
-                # Fallback to Palestinian flag if image not found
-                flag_width = 200
-                flag_height = 120
-                flag_x = (width - flag_width) // 2
-                flag_y = 50
-                
-                # Flag stripes
-                stripe_height = flag_height // 3
-                draw.rectangle([flag_x, flag_y, flag_x + flag_width, flag_y + stripe_height], fill=colors['black'])
-                draw.rectangle([flag_x, flag_y + stripe_height, flag_x + flag_width, flag_y + 2 * stripe_height], fill=colors['white'])
-                draw.rectangle([flag_x, flag_y + 2 * stripe_height, flag_x + flag_width, flag_y + flag_height], fill=colors['green'])
-                
-                # Flag triangle
-                triangle_points = [
-                    (flag_x, flag_y),
-                    (flag_x, flag_y + flag_height),
-                    (flag_x + flag_width * 0.4, flag_y + flag_height // 2)
-                ]
-                draw.polygon(triangle_points, fill=colors['red'])
-                
-                title_y = flag_y + flag_height + 80
-        except Exception as e:
-            print(f"❌ Error loading theme image: {e}")
-            # Fallback to Palestinian flag
-            flag_width = 200
-            flag_height = 120
-            flag_x = (width - flag_width) // 2
-            flag_y = 50
-            
-            # Flag stripes
-            stripe_height = flag_height // 3
-            draw.rectangle([flag_x, flag_y, flag_x + flag_width, flag_y + stripe_height], fill=colors['black'])
-            draw.rectangle([flag_x, flag_y + stripe_height, flag_x + flag_width, flag_y + 2 * stripe_height], fill=colors['white'])
-            draw.rectangle([flag_x, flag_y + 2 * stripe_height, flag_x + flag_width, flag_y + flag_height], fill=colors['green'])
-            
-            # Flag triangle
-            triangle_points = [
-                (flag_x, flag_y),
-                (flag_x, flag_y + flag_height),
-                (flag_x + flag_width * 0.4, flag_y + flag_height // 2)
-            ]
-            draw.polygon(triangle_points, fill=colors['red'])
-            
-            title_y = flag_y + flag_height + 80
-        
-        # Title
-        title_bbox = draw.textbbox((0, 0), title, font=title_font)
-        title_width = title_bbox[2] - title_bbox[0]
-        title_x = (width - title_width) // 2
-        title_y = flag_y + flag_height + 80
-        draw.text((title_x, title_y), title, fill=colors['black'], font=title_font)
-        
-        # Subtitle
-        subtitle_bbox = draw.textbbox((0, 0), subtitle, font=subtitle_font)
-        subtitle_width = subtitle_bbox[2] - subtitle_bbox[0]
-        subtitle_x = (width - subtitle_width) // 2
-        subtitle_y = title_y + 60
-        draw.text((subtitle_x, subtitle_y), subtitle, fill=colors['green'], font=subtitle_font)
-        
-        # Description (wrapped text)
-        margin = 50
-        max_width = width - 2 * margin
-        lines = textwrap.wrap(description, width=40)
-        desc_y = subtitle_y + 80
-        
-        for line in lines:
-            line_bbox = draw.textbbox((0, 0), line, font=body_font)
-            line_width = line_bbox[2] - line_bbox[0]
-            line_x = (width - line_width) // 2
-            draw.text((line_x, desc_y), line, fill=colors['black'], font=body_font)
-            desc_y += 35
-        
-        # Decorative elements
-        # Bottom border
-        draw.rectangle([0, height - 100, width, height], fill=colors['green'])
-        
-        # Footer text
-        footer_text = "Generated by United Ummah"
-        footer_bbox = draw.textbbox((0, 0), footer_text, font=body_font)
-        footer_width = footer_bbox[2] - footer_bbox[0]
-        footer_x = (width - footer_width) // 2
-        footer_y = height - 70
-        draw.text((footer_x, footer_y), footer_text, fill=colors['white'], font=body_font)
-        
-        # Convert to base64
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        img_base64 = base64.b64encode(buffer.getvalue()).decode()
-        
-        # Create prompt for AI image generation (for reference)
-        prompt = f"Professional protest poster: {title} - {subtitle}. Palestinian solidarity theme with {imageType} image. {description}"
-        
+                self.disk.move_to_end(key)
+                self.disk_hits += 1
+                self.set(key, data)
+                return data
+        self.misses += 1
+        return None
+
+    def set(self, key: str, data: bytes):
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= len(previous)
+        self.entries[key] = data
+        self.bytes += len(data)
+        while self.bytes > self.max_bytes:
+            evicted_key, evicted = self.entries.popitem(last=False)
+            self.bytes -= len(evicted)
+            self.evictions += 1
+            self.spill(evicted_key, evicted)
+
+    def spill(self, key: str, data: bytes):
+        if not self.directory or key in self.disk or len(data) > self.disk_bytes:
+            return
+        try:
+            write_file_atomically(self.path(key), data)
+        except OSError as e:
+            print(f"⚠️ Could not spill poster to {self.directory}: {e}")
+            return
+        self.disk[key] = len(data)
+        self.disk_used += len(data)
+        self.trim_disk()
+
+    def trim_disk(self):
+        while self.disk_used > self.disk_bytes and self.disk:
+            key, size = self.disk.popitem(last=False)
+            self.disk_used -= size
+            with contextlib.suppress(OSError):
+                os.remove(self.path(key))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.disk_hits + self.misses
         return {
-            "generated_image": img_base64,
-            "prompt_used": prompt
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "disk_entries": len(self.disk),
+            "disk_bytes": self.disk_used,
+            "max_disk_bytes": self.disk_bytes if self.directory else 0,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0
         }
-        
+
+poster_cache = PosterRenderCache(POSTER_CACHE_BYTES, POSTER_CACHE_DIR, POSTER_CACHE_DISK_BYTES)
+poster_flights = SingleFlight()
+
+def poster_render_key(title: str, subtitle: str, description: str, image_type: str,
+                      image_format: str = "png", quality: Optional[int] = None, size: str = "web") -> str:
+    """Content address of a rendered poster: a hash of everything that determines its bytes"""
+    quality = None if image_format == "png" else quality or POSTER_IMAGE_QUALITY
+    payload = json.dumps(
+        [POSTER_LAYOUT_VERSION, poster_assets.version, POSTER_SIZES[size], title, subtitle, description,
+         image_type, image_format, quality],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def poster_etag(key: str) -> str:
+    return f'"{key[:32]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check; uses weak comparison, as HTTP specifies for this header"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+async def cached_poster_render(key: str, func, *args) -> bytes:
+    """Encoded poster from the render cache, else func(*args) in the pool; concurrent misses for a key share one render"""
+    image = poster_cache.get(key)
+    if image is not None:
+        return image
+    
+    async def render():
+        image = await poster_renderer.run(func, *args)
+        poster_cache.set(key, image)
+        return image
+    
+    return await poster_flights.run((key,), render)
+
+def poster_format_param(value: str) -> str:
+    """Poster format from a format parameter ("jpg" means jpeg), or a 400"""
+    image_format = "jpeg" if value.lower() == "jpg" else value.lower()
+    if image_format not in POSTER_IMAGE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{value}'. Available: png, jpeg, webp")
+    return image_format
+
+def check_poster_quality(quality: Optional[int]):
+    if quality is not None and not 1 <= quality <= 100:
+        raise HTTPException(status_code=400, detail="quality must be between 1 and 100")
+
+def poster_image_type(value: str) -> str:
+    """Normalized imageType, or a 400 when no such poster theme is configured"""
+    image_type = value.lower()
+    if not poster_assets.has_theme(image_type):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown imageType '{value}'. Available: {', '.join(poster_assets.themes)}"
+        )
+    return image_type
+
+async def generate_poster_image(theme: str, title: str, subtitle: str, description: str, imageType: str = "hunger") -> Dict[str, str]:
+    """Generate actual poster image using AI and design principles"""
+    print(f"🎨 Generating poster image for: {title}")
+    
+    try:
+        key = poster_render_key(title, subtitle, description, imageType)
+        png = await cached_poster_render(key, render_poster, title, subtitle, description, imageType)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error generating poster image: {e}")
-        # Return a simple fallback image
-        fallback_img = Image.new('RGB', (800, 1200), color='white')
-        draw = ImageDraw.Draw(fallback_img)
-        draw.text((400, 600), "Poster Generation\nUnavailable", fill='black', anchor='mm')
-        
-        buffer = BytesIO()
-        fallback_img.save(buffer, format='PNG')
-        img_base64 = base64.b64encode(buffer.getvalue()).decode()
-        
         return {
-            "generated_image": img_base64,
+            "generated_image": base64.b64encode(render_fallback_poster()).decode(),
             "prompt_used": "Fallback poster generation"
         }
+    
+    # Create prompt for AI image generation (for reference)
+    prompt = f"Professional protest poster: {title} - {subtitle}. Palestinian solidarity theme with {imageType} image. {description}"
+    
+    return {
+        "generated_image": base64.b64encode(png).decode(),
+        "prompt_used": prompt
+    }
 
 @app.get("/api/brands")
 async def get_brands():
     """Get all available brands from boycott database"""
     try:
-        brands = [brand["brand"] for brand in BOYCOTT_BRANDS]
+        brands = get_catalog().brand_names()
         return {
             "brands": brands,
             "total": len(brands)
@@ -1106,24 +2499,13 @@ async def get_brands():
         return {"brands": [], "total": 0}
 
 @app.get("/api/brands/search")
-async def search_brands(query: str = ""):
+async def search_brands(query: str = "", limit: int = 10):
     """Search brands with autocomplete functionality"""
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
     try:
-        query = query.lower().strip()
-        if not query:
-            return {"brands": [], "total": 0}
-        
-        matching_brands = []
-        for brand in BOYCOTT_BRANDS:
-            brand_name = brand["brand"].lower()
-            if query in brand_name or brand_name.startswith(query):
-                matching_brands.append(brand["brand"])
-        
-        # Return top 10 matches
-        return {
-            "brands": matching_brands[:10],
-            "total": len(matching_brands)
-        }
+        # Ranked top-k from the prebuilt autocomplete index (limit is capped at 50)
+        return get_catalog().autocomplete.search(query, limit)
     except Exception as e:
         print(f"❌ Error searching brands: {e}")
         return {"brands": [], "total": 0}
@@ -1134,86 +2516,145 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "Product Search API"}
+    return {
+        "status": "degraded" if gemini.breaker.state == "open" else "healthy",
+        "service": "Product Search API",
+        "catalog": get_catalog().info(),
+        "product_database": product_database.info() if product_database else None,
+        "description_cache": description_cache.stats(),
+        "enrichment_cache": enrichment_cache.stats(),
+        "question_cache": {"faq": sophia_question_cache.stats(), "quran": quran_question_cache.stats()},
+        "gemini": {**gemini.stats(), "coalescing": llm_flights.stats()},
+        "poster_render": {**poster_renderer.stats(), "cache": poster_cache.stats(), "coalescing": poster_flights.stats()},
+        "poster_assets": poster_assets.info()
+    }
+
+@app.on_event("startup")
+async def start_catalog_watcher():
+    if CATALOG_WATCH_INTERVAL > 0:
+        print(f"👀 Watching {CATALOG_DB_PATH or CATALOG_PATH} for changes every {CATALOG_WATCH_INTERVAL}s")
+        asyncio.create_task(watch_catalog_file(CATALOG_WATCH_INTERVAL))
+
+@app.on_event("shutdown")
+def stop_poster_renderer():
+    poster_renderer.shutdown()
+
+@app.on_event("shutdown")
+def save_caches():
+    try:
+        description_cache.save()
+    except Exception as e:
+        print(f"❌ Error saving description cache: {e}")
+    try:
+        enrichment_cache.save()
+    except Exception as e:
+        print(f"❌ Error saving enrichment cache: {e}")
+
+def require_admin(token: Optional[str]):
+    """Admin endpoints need ADMIN_TOKEN configured and sent in the X-Admin-Token header"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@app.get("/api/catalog")
+async def catalog_info():
+    """Catalog version and reload timings"""
+    return catalog_status()
+
+@app.post("/api/admin/reload-catalog")
+async def reload_catalog_endpoint(force: bool = False, x_admin_token: Optional[str] = Header(None)):
+    """Re-read data/boycott_brands.json and swap in the rebuilt catalog"""
+    require_admin(x_admin_token)
+    try:
+        result = await reload_catalog(force=force)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Catalog reload failed: {e}")
+    return {**result, **_catalog_reload_stats}
 
-@app.post("/api/search-product", response_model=SearchResponse)
-async def search_product(request: SearchRequest):
-    query = request.query.lower().strip()
+@app.post("/api/admin/reload-poster-assets")
+async def reload_poster_assets_endpoint(x_admin_token: Optional[str] = Header(None)):
+    """Rediscover poster theme images and fonts, then restart the render workers to pick them up"""
+    require_admin(x_admin_token)
+    try:
+        result = await asyncio.to_thread(poster_assets.reload)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Poster asset reload failed: {e}")
+    poster_template.cache_clear()
+    poster_renderer.restart()
+    return result
+
+# Products we recognise even though they are not in boycott_brands.json
+KNOWN_BOYCOTTED_PRODUCTS = ["nike", "mcdonalds", "starbucks", "coca cola", "pepsi", "apple", "microsoft", "google", "amazon", "netflix", "disney", "nestle", "unilever", "procter gamble", "johnson johnson", "pfizer", "moderna", "astrazeneca"]
+KNOWN_SAFE_PRODUCTS = ["pakola", "rc cola", "servis", "stylo", "bata", "borjan", "ecs", "daraz", "olx"]
+
+def known_product_category(query: str) -> str:
+    """Category for a product from the known boycotted/safe lists"""
+    if query in ["nike", "adidas", "puma"]:
+        return "Clothing & Fashion"
+    elif query in ["mcdonalds", "starbucks", "kfc"]:
+        return "Food & Restaurants"
+    elif query in ["coca cola", "pepsi", "pakola", "rc cola"]:
+        return "Beverages"
+    elif query in ["apple", "microsoft", "google", "samsung"]:
+        return "Technology"
+    elif query in ["netflix", "disney", "amazon"]:
+        return "Entertainment"
+    elif query in ["nestle", "unilever", "procter gamble"]:
+        return "Consumer Goods"
+    elif query in ["johnson johnson", "pfizer", "moderna", "astrazeneca"]:
+        return "Healthcare"
+    return "Unknown"
+
+def match_product_query(query: str, catalog) -> Dict[str, Any]:
+    """Resolve a normalized query locally (catalog, fuzzy, known lists) without any LLM call"""
+    # Search through boycott_brands.json first using the prebuilt brand index
+    brand_data = catalog.index.find_best_match(query)
+    fuzzy_match = False
     
-    # Search through boycott_brands.json first with improved matching
-    brand_data = None
-    best_match = None
-    best_match_score = 0
+    # Fall back to typo-tolerant matching ("starbuks" -> Starbucks)
+    if brand_data is None:
+        brand_data = catalog.fuzzy.find(query)
+        fuzzy_match = brand_data is not None
     
-    for brand in BOYCOTT_BRANDS:
-        brand_name = brand["brand"].lower()
-        
-        # Exact match (highest priority)
-        if brand_name == query:
-            brand_data = brand
-            break
-        
-        # Contains match (second priority)
-        elif query in brand_name or brand_name in query:
-            if len(brand_name) > best_match_score:
-                best_match = brand
-                best_match_score = len(brand_name)
-        
-        # Partial word match (third priority)
-        elif any(word in brand_name for word in query.split()) or any(word in query for word in brand_name.split()):
-            if len(brand_name) > best_match_score:
-                best_match = brand
-                best_match_score = len(brand_name)
+    if brand_data:
+        return {"kind": "catalog", "brand": brand_data, "fuzzy": fuzzy_match}
     
-    # Use best match if no exact match found
-    if brand_data is None and best_match is not None:
-        brand_data = best_match
+    # If not found in boycott_brands.json, check if it's a known product (either boycotted or safe)
+    if query in KNOWN_BOYCOTTED_PRODUCTS or query in KNOWN_SAFE_PRODUCTS:
+        return {"kind": "known", "is_boycotted": query in KNOWN_BOYCOTTED_PRODUCTS, "category": known_product_category(query)}
     
+    return {"kind": "unknown"}
+
+def product_match_key(query: str, match: Dict[str, Any]) -> tuple:
+    """Queries with the same key get the same response, so they share one enrichment"""
+    if match["kind"] == "catalog":
+        return ("catalog", match["brand"].brand, match["fuzzy"])
+    return (match["kind"], query)
+
+async def build_search_response(query: str, match: Dict[str, Any]) -> SearchResponse:
+    """Turn a local match into the search response, fetching Gemini content where needed"""
     # If found in boycott_brands.json, use that data
-    if brand_data:
-        print(f"🔍 Found {brand_data['brand']} in JSON database, getting Gemini description...")
+    if match["kind"] == "catalog":
+        brand_data = match["brand"]
+        fuzzy_match = match["fuzzy"]
+        print(f"🔍 Found {brand_data.brand} in JSON database{' (fuzzy match)' if fuzzy_match else ''}, getting Gemini description...")
         # Get product description from Gemini API
-        product_description = await get_product_description(brand_data["brand"], brand_data["category"])
+        product_description = await get_product_description(brand_data.brand, brand_data.category)
         print(f"📝 Product description: {product_description[:100]}...")
         
         return SearchResponse(
             query=query,
             is_boycotted=True,
-            brand_name=brand_data["brand"],
-            category=brand_data["category"],
-            boycott_reason=brand_data["boycott_reason"],
-            alternatives=brand_data["pakistani_alternatives"],
-            message=f"🚨 BOYCOTTED: {brand_data['brand']} is in our boycott database. This product supports occupation and should be avoided. Consider the Pakistani alternatives listed below to support local businesses and ethical consumerism.",
+            brand_name=brand_data.brand,
+            category=brand_data.category,
+            boycott_reason=brand_data.boycott_reason,
+            alternatives=list(brand_data.pakistani_alternatives),
+            message=f"{'🔎 Showing results for ' + brand_data.brand + '. ' if fuzzy_match else ''}🚨 BOYCOTTED: {brand_data.brand} is in our boycott database. This product supports occupation and should be avoided. Consider the Pakistani alternatives listed below to support local businesses and ethical consumerism.",
             product_description=product_description
         )
     
-    # If not found in boycott_brands.json, check if it's a known product
-    known_boycotted = ["nike", "mcdonalds", "starbucks", "coca cola", "pepsi", "apple", "microsoft", "google", "amazon", "netflix", "disney", "nestle", "unilever", "procter gamble", "johnson johnson", "pfizer", "moderna", "astrazeneca"]
-    known_safe = ["pakola", "rc cola", "servis", "stylo", "bata", "borjan", "ecs", "daraz", "olx"]
-    
-    is_boycotted = query in known_boycotted
-    category = "Unknown"
-    
-    # Determine category
-    if query in ["nike", "adidas", "puma"]:
-        category = "Clothing & Fashion"
-    elif query in ["mcdonalds", "starbucks", "kfc"]:
-        category = "Food & Restaurants"
-    elif query in ["coca cola", "pepsi", "pakola", "rc cola"]:
-        category = "Beverages"
-    elif query in ["apple", "microsoft", "google", "samsung"]:
-        category = "Technology"
-    elif query in ["netflix", "disney", "amazon"]:
-        category = "Entertainment"
-    elif query in ["nestle", "unilever", "procter gamble"]:
-        category = "Consumer Goods"
-    elif query in ["johnson johnson", "pfizer", "moderna", "astrazeneca"]:
-        category = "Healthcare"
-    
-    # Check if it's a known product (either boycotted or safe)
-    is_known_product = query in known_boycotted or query in known_safe
-    
-    if not is_known_product:
+    if match["kind"] == "unknown":
         # Unknown product - return "Sorry, I don't know about this product"
         return SearchResponse(
             query=query,
@@ -1227,18 +2668,76 @@ async def search_product(request: SearchRequest):
         )
     
     # Known product - get AI-generated analysis and product description
-    analysis = await get_gemini_analysis(query, is_boycotted, category)
-    product_description = await get_product_description(query, category)
+    is_boycotted = match["is_boycotted"]
+    category = match["category"]
+    enrichment = await get_product_enrichment(query, is_boycotted, category)
     
     return SearchResponse(
         query=query,
         is_boycotted=is_boycotted,
         brand_name=query.title(),
         category=category,
-        boycott_reason=analysis["boycott_reason"],
-        alternatives=analysis["alternatives"],
-        message=analysis["message"],
-        product_description=product_description
+        boycott_reason=enrichment["boycott_reason"],
+        alternatives=enrichment["alternatives"],
+        message=enrichment["message"],
+        product_description=enrichment["description"]
+    )
+
+@app.post("/api/search-product", response_model=SearchResponse)
+async def search_product(request: SearchRequest):
+    query = request.query.lower().strip()
+    with request_scope("search_product") as source:
+        response = await build_search_response(query, match_product_query(query, get_catalog()))
+    return response.model_copy(update={"source": source.label()})
+
+@app.post("/api/search-products", response_model=BatchSearchResponse)
+async def search_products_batch(request: BatchSearchRequest):
+    """Check a shopping list in one call: dedupe, resolve catalog hits locally, enrich concurrently"""
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="Queries cannot be empty")
+    if len(request.queries) > BATCH_SEARCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_SEARCH_MAX_QUERIES} queries per batch")
+    
+    # Dedupe after normalization and resolve every query against one catalog snapshot
+    catalog = get_catalog()
+    normalized = [query.lower().strip() for query in request.queries]
+    matches = {query: match_product_query(query, catalog) for query in dict.fromkeys(normalized) if query}
+    
+    # One enrichment per distinct response, with a bounded number of Gemini calls in flight
+    semaphore = asyncio.Semaphore(BATCH_ENRICHMENT_CONCURRENCY)
+    
+    async def enrich(query: str, match: Dict[str, Any]) -> SearchResponse:
+        async with semaphore:
+            # Each item gets the single-search deadline once it starts
+            with request_scope("search_product") as source:
+                response = await build_search_response(query, match)
+            return response.model_copy(update={"source": source.label()})
+    
+    tasks = {}
+    for query, match in matches.items():
+        key = product_match_key(query, match)
+        if key not in tasks:
+            tasks[key] = asyncio.ensure_future(enrich(query, match))
+    outcomes = dict(zip(tasks.keys(), await asyncio.gather(*tasks.values(), return_exceptions=True)))
+    
+    # Results come back in input order, each with its own status
+    results = []
+    for original, query in zip(request.queries, normalized):
+        if not query:
+            results.append(BatchSearchItem(query=original, status="error", error="Query cannot be empty"))
+            continue
+        outcome = outcomes[product_match_key(query, matches[query])]
+        if isinstance(outcome, BaseException):
+            print(f"❌ Batch search error for '{query}': {outcome}")
+            results.append(BatchSearchItem(query=original, status="error", error="Error processing query"))
+        else:
+            results.append(BatchSearchItem(query=original, status="ok", result=outcome.model_copy(update={"query": query})))
+    
+    return BatchSearchResponse(
+        results=results,
+        total=len(results),
+        unique_queries=len(matches),
+        failed=sum(1 for item in results if item.status == "error")
     )
 
 @app.post("/api/scan-barcode", response_model=BarcodeScanResponse)
@@ -1248,18 +2747,200 @@ async def scan_barcode(request: BarcodeScanRequest):
     if not barcode:
         raise HTTPException(status_code=400, detail="Barcode cannot be empty")
     
-    is_israeli = is_israeli_barcode(barcode)
-    country = get_barcode_country(barcode)
+    # Reject typos and invalid codes before spending a Gemini call on them
+    try:
+        barcode = normalize_gtin(barcode)
+    except InvalidBarcodeError as e:
+        raise HTTPException(status_code=422, detail=e.to_detail())
+    
+    country, is_israeli = lookup_barcode_prefix(barcode)
+    product = lookup_barcode_product(barcode)
     
-    # Get AI-generated analysis
-    analysis = await get_gemini_barcode_analysis(barcode, is_israeli, country)
+    # Boycotted brand found locally: answer from the catalog without a Gemini call
+    if product and product["record"] is not None:
+        record = product["record"]
+        return BarcodeScanResponse(
+            barcode=barcode,
+            is_israeli=is_israeli,
+            country=country,
+            message=f"🚨 This product is made by {record.brand}, which is on the boycott list. {record.boycott_reason}",
+            alternatives=list(record.pakistani_alternatives),
+            brand=record.brand,
+            is_boycotted=True,
+            boycott_reason=record.boycott_reason,
+            source="local"
+        )
+    
+    # Get AI-generated analysis (fallback message once the deadline passes)
+    with request_scope("scan_barcode") as source:
+        analysis = await get_gemini_barcode_analysis(barcode, is_israeli, country)
     
     return BarcodeScanResponse(
         barcode=barcode,
         is_israeli=is_israeli,
         country=country,
         message=analysis["message"],
-        alternatives=analysis["alternatives"]
+        alternatives=analysis["alternatives"],
+        brand=product["brand"] if product else None,
+        is_boycotted=False if product else None,
+        source=source.label()
+    )
+
+async def iter_upload_lines(file: UploadFile, chunk_size: int = BULK_SCAN_CHUNK_SIZE,
+                            max_line_length: int = BULK_SCAN_MAX_LINE_LENGTH):
+    """Yield decoded lines from an upload, reading it one chunk at a time.
+
+    A line longer than max_line_length is yielded as None, and the rest of it is dropped as it
+    arrives, so memory stays bounded by one chunk plus one line however the input is shaped.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    overlong = False
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            line = line.rstrip("\r")
+            if overlong or len(line) > max_line_length:
+                # The first line after a dropped stretch is that overlong line's tail
+                overlong = False
+                yield None
+            else:
+                yield line
+        if len(pending) > max_line_length:
+            overlong = True
+            pending = ""
+    pending = (pending + decoder.decode(b"", final=True)).rstrip("\r")
+    if overlong or len(pending) > max_line_length:
+        yield None
+    elif pending:
+        yield pending
+
+BULK_BARCODE_COLUMNS = ["barcode", "gtin", "ean", "upc", "code"]
+
+async def iter_bulk_barcodes(file: UploadFile):
+    """Yield (line number, barcode or None, error) from a CSV or NDJSON inventory upload"""
+    barcode_column = None
+    file_format = None
+    line_number = 0
+    async for line in iter_upload_lines(file):
+        line_number += 1
+        if line is None:
+            yield line_number, None, f"Line longer than {BULK_SCAN_MAX_LINE_LENGTH} characters"
+            continue
+        if not line.strip():
+            continue
+        
+        # Sniff the format from the first non-empty line
+        if file_format is None:
+            file_format = "ndjson" if line.lstrip().startswith("{") else "csv"
+            if file_format == "csv":
+                header = [cell.strip().lower() for cell in next(csv.reader([line]))]
+                matches = [column for column in BULK_BARCODE_COLUMNS if column in header]
+                if matches:
+                    barcode_column = header.index(matches[0])
+                    continue
+                barcode_column = 0
+        
+        if file_format == "ndjson":
+            try:
+                item = json.loads(line)
+            except ValueError:
+                yield line_number, None, "Invalid JSON"
+                continue
+            if isinstance(item, dict):
+                value = next((item[column] for column in BULK_BARCODE_COLUMNS if column in item), None)
+            else:
+                value = item
+        else:
+            cells = next(csv.reader([line]))
+            value = cells[barcode_column] if barcode_column < len(cells) else None
+        
+        barcode = str(value).strip() if value is not None else ""
+        if not barcode:
+            yield line_number, None, "Barcode cannot be empty"
+        else:
+            yield line_number, barcode, None
+
+def classify_barcode(barcode: str) -> Dict[str, Any]:
+    """Local barcode classification (no Gemini call)"""
+    country, is_israeli = lookup_barcode_prefix(barcode)
+    result = {
+        "barcode": barcode,
+        "is_israeli": is_israeli,
+        "country": country
+    }
+    product = lookup_barcode_product(barcode)
+    if product:
+        result.update(brand=product["brand"], is_boycotted=product["record"] is not None)
+    return result
+
+async def stream_bulk_barcode_results(file: UploadFile, include_message: bool):
+    """Classify every barcode in the upload and yield NDJSON lines as results are ready"""
+    started = time.perf_counter()
+    counts = {"total": 0, "israeli": 0, "errors": 0}
+    
+    async def classify(line_number: int, barcode: Optional[str], error: Optional[str]) -> Dict[str, Any]:
+        if error:
+            return {"line": line_number, "status": "error", "error": error}
+        try:
+            barcode = normalize_gtin(barcode)
+        except InvalidBarcodeError as e:
+            return {"line": line_number, "status": "error", "error": e.message, "reason": e.reason, "barcode": e.barcode}
+        result = {"line": line_number, "status": "ok", **classify_barcode(barcode)}
+        if include_message:
+            try:
+                analysis = await get_gemini_barcode_analysis(barcode, result["is_israeli"], result["country"])
+                result.update(message=analysis["message"], alternatives=analysis["alternatives"])
+            except Exception as e:
+                print(f"❌ Bulk scan message error for {barcode}: {e}")
+                result.update(status="error", error="Error generating message")
+        return result
+    
+    def encode(result: Dict[str, Any]) -> bytes:
+        counts["total"] += 1
+        if result["status"] == "error":
+            counts["errors"] += 1
+        if result.get("is_israeli"):
+            counts["israeli"] += 1
+        return (json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8")
+    
+    # Keep a bounded window of Gemini calls in flight and emit results in input order
+    window = collections.deque()
+    try:
+        if not include_message:
+            async for item in iter_bulk_barcodes(file):
+                yield encode(await classify(*item))
+        else:
+            async for item in iter_bulk_barcodes(file):
+                window.append(asyncio.ensure_future(classify(*item)))
+                if len(window) >= BULK_SCAN_CONCURRENCY:
+                    yield encode(await window.popleft())
+            while window:
+                yield encode(await window.popleft())
+    finally:
+        # The client went away mid-stream: stop the lookups nobody will read
+        for future in window:
+            future.cancel()
+        await asyncio.gather(*window, return_exceptions=True)
+        await file.close()
+    
+    summary = {**counts, "elapsed_seconds": round(time.perf_counter() - started, 3)}
+    yield (json.dumps({"summary": summary}) + "\n").encode("utf-8")
+
+@app.post("/api/scan-barcodes/bulk")
+async def scan_barcodes_bulk(file: UploadFile = File(...), include_message: bool = Form(False)):
+    """
+    Classify an inventory upload (CSV with a barcode/gtin column, or NDJSON) and stream NDJSON results.
+    Gemini messages are only generated when include_message is set.
+    """
+    return StreamingResponse(
+        stream_bulk_barcode_results(file, include_message),
+        media_type="application/x-ndjson"
     )
 
 @app.post("/api/upload-image")
@@ -1291,8 +2972,7 @@ async def upload_image(file: UploadFile = File(...)):
             barcode = str(random.randint(100000000000, 999999999999))
         
         # Check if it's Israeli
-        is_israeli = is_israeli_barcode(barcode)
-        country = get_barcode_country(barcode)
+        country, is_israeli = lookup_barcode_prefix(barcode)
         
         # Get AI-generated analysis
         analysis = await get_gemini_barcode_analysis(barcode, is_israeli, country)
@@ -1314,8 +2994,9 @@ async def upload_image(file: UploadFile = File(...)):
 async def faq_endpoint(request: FAQRequest):
     """Sophia AI FAQ endpoint for Gaza relief and donation questions"""
     try:
-        answer = await retry_with_backoff(lambda: get_sophia_response(request.user_question))
-        return FAQResponse(answer=answer)
+        with request_scope("faq") as source:
+            answer = await get_sophia_response(request.user_question)
+        return FAQResponse(answer=answer, source=source.label())
     except Exception as e:
         print(f"❌ FAQ endpoint error: {e}")
         raise HTTPException(status_code=500, detail="Error processing FAQ request")
@@ -1324,33 +3005,116 @@ async def faq_endpoint(request: FAQRequest):
 async def quran_endpoint(request: QuranRequest):
     """Islamic knowledge chatbot endpoint for Quran and Hadith questions about Palestine"""
     try:
-        answer = await get_quran_response(request.user_question)
-        return QuranResponse(answer=answer)
+        with request_scope("quran") as source:
+            answer = await get_quran_response(request.user_question)
+        return QuranResponse(answer=answer, source=source.label())
     except Exception as e:
         print(f"❌ Quran endpoint error: {e}")
         raise HTTPException(status_code=500, detail="Error processing Quran request")
 
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def stream_chat_answer(endpoint: str, user_question: str, cache: QuestionCache, prompt_func,
+                             fallback_func, error_response: str):
+    """Yield the answer as SSE "chunk" events, then a "done" event with source and timing"""
+    started = time.perf_counter()
+    timing = {"first_chunk_ms": None, "chunks": 0}
+    
+    def chunk(text: str) -> str:
+        if timing["first_chunk_ms"] is None:
+            timing["first_chunk_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        timing["chunks"] += 1
+        return sse_event("chunk", {"text": text})
+    
+    source = "model"
+    if not gemini_enabled():
+        source = "fallback"
+        yield chunk(fallback_func(user_question))
+    elif (cached := cache.get(user_question)) is not None:
+        source = "cache"
+        yield chunk(cached)
+    else:
+        parts = []
+        try:
+            async for text in gemini.stream(endpoint, prompt_func(user_question)):
+                parts.append(text)
+                yield chunk(text)
+        except Exception as e:
+            print(f"❌ Gemini streaming error: {e}")
+            if parts:
+                # The client already has part of the answer; report the cut instead of restarting
+                source = "model_incomplete"
+            else:
+                source = "fallback"
+                yield chunk(error_response)
+        else:
+            answer = "".join(parts)
+            if answer.strip():
+                cache.set(user_question, answer)
+    
+    yield sse_event("done", {
+        "source": source,
+        "chunks": timing["chunks"],
+        "first_chunk_ms": timing["first_chunk_ms"],
+        "total_ms": round((time.perf_counter() - started) * 1000, 1)
+    })
+
+@app.post("/api/faq/stream")
+async def faq_stream_endpoint(request: FAQRequest):
+    """Sophia FAQ answer streamed as server-sent events"""
+    return StreamingResponse(
+        stream_chat_answer("faq", request.user_question, sophia_question_cache, sophia_prompt,
+                           sophia_fallback_response, SOPHIA_ERROR_RESPONSE),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+@app.post("/api/quran/stream")
+async def quran_stream_endpoint(request: QuranRequest):
+    """Islamic knowledge answer streamed as server-sent events"""
+    return StreamingResponse(
+        stream_chat_answer("quran", request.user_question, quran_question_cache, quran_prompt,
+                           quran_fallback_response, QURAN_ERROR_RESPONSE),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
 @app.post("/api/generate-poster", response_model=PosterResponse)
 async def generate_poster_endpoint(request: PosterRequest):
     """AI-powered poster generation endpoint"""
     try:
-        # Get AI design suggestions
-        design = await get_poster_design(
-            theme=request.theme,
-            title=request.title,
-            subtitle=request.subtitle,
-            description=request.description,
-            style="modern"  # Use modern style for design suggestions
-        )
-        
-        # Generate actual poster image
-        image_data = await generate_poster_image(
-            theme=request.theme,
-            title=request.title,
-            subtitle=request.subtitle,
-            description=request.description,
-            imageType=request.imageType
-        )
+        image_type = poster_image_type(request.imageType)
+        
+        # Fail fast before spending a Gemini call when the renderer is saturated
+        poster_renderer.check_capacity()
+        
+        # Get AI design suggestions while the poster renders in the pool
+        with request_scope("poster") as source:
+            tasks = [
+                asyncio.ensure_future(get_poster_design(
+                    theme=request.theme,
+                    title=request.title,
+                    subtitle=request.subtitle,
+                    description=request.description,
+                    style="modern"  # Use modern style for design suggestions
+                )),
+                asyncio.ensure_future(generate_poster_image(
+                    theme=request.theme,
+                    title=request.title,
+                    subtitle=request.subtitle,
+                    description=request.description,
+                    imageType=image_type
+                ))
+            ]
+            try:
+                design, image_data = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
         
         # Combine design suggestions with generated image
         return PosterResponse(
@@ -1360,12 +3124,185 @@ async def generate_poster_endpoint(request: PosterRequest):
             text_content=design["text_content"],
             visual_elements=design["visual_elements"],
             generated_image=image_data["generated_image"],
-            prompt_used=image_data["prompt_used"]
+            prompt_used=image_data["prompt_used"],
+            source=source.label()
         )
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Poster generation endpoint error: {e}")
         raise HTTPException(status_code=500, detail="Error generating poster design")
 
+async def poster_image_response(request: PosterRequest, format: Optional[str], quality: Optional[int],
+                                accept: Optional[str], if_none_match: Optional[str]) -> Response:
+    """Negotiate the format, then answer 304 for a matching ETag or serve the (cached) render"""
+    if format:
+        image_format = poster_format_param(format)
+    else:
+        image_format = negotiate_poster_format(accept)
+        if image_format is None:
+            raise HTTPException(status_code=406, detail="Posters are available as image/png, image/jpeg or image/webp")
+    check_poster_quality(quality)
+    image_type = poster_image_type(request.imageType)
+    
+    # The same inputs always render the same bytes, so the content address doubles as a strong ETag
+    key = poster_render_key(request.title, request.subtitle, request.description, image_type, image_format, quality)
+    headers = {"Vary": "Accept", "ETag": poster_etag(key), "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        image = await cached_poster_render(
+            key, render_poster, request.title, request.subtitle, request.description, image_type, image_format, quality
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error generating poster image: {e}")
+        image = render_fallback_poster(image_format, quality)
+        headers = {"Vary": "Accept", "Cache-Control": "no-store"}
+    
+    return Response(
+        content=image,
+        media_type=POSTER_IMAGE_FORMATS[image_format][1],
+        headers={**headers, "Content-Disposition": f'inline; filename="poster.{image_format}"'}
+    )
+
+@app.post("/api/generate-poster/image")
+async def generate_poster_image_endpoint(request: PosterRequest, format: Optional[str] = None, quality: Optional[int] = None,
+                                         accept: Optional[str] = Header(None), if_none_match: Optional[str] = Header(None)):
+    """Render the poster and return the image itself as PNG, JPEG or WebP (no base64, no design call)"""
+    return await poster_image_response(request, format, quality, accept, if_none_match)
+
+@app.get("/api/generate-poster/image")
+async def get_poster_image_endpoint(title: str, subtitle: str = "", description: str = "", imageType: str = "hunger",
+                                    theme: str = "protest", format: Optional[str] = None, quality: Optional[int] = None,
+                                    accept: Optional[str] = Header(None), if_none_match: Optional[str] = Header(None)):
+    """Same as the POST form, with the fields as query parameters so browsers can cache and revalidate it"""
+    request = PosterRequest(theme=theme, title=title, subtitle=subtitle, description=description, imageType=imageType)
+    return await poster_image_response(request, format, quality, accept, if_none_match)
+
+@app.post("/api/poster-design", response_model=PosterDesignResponse)
+async def poster_design_endpoint(request: PosterRequest):
+    """AI design suggestions for a poster, without rendering it"""
+    with request_scope("poster") as source:
+        design = await get_poster_design(
+            theme=request.theme,
+            title=request.title,
+            subtitle=request.subtitle,
+            description=request.description,
+            style="modern"  # Same style the full poster endpoint asks for
+        )
+    return PosterDesignResponse(**design, source=source.label())
+
+class ZipChunkWriter:
+    """Write-only file for zipfile that hands the archive over in chunks as it is written"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+async def poster_zip_stream(design_task: asyncio.Future, render_tasks: List[asyncio.Future], source: ResponseSource):
+    """Zip each poster as soon as its render finishes, then design.json once the design is in"""
+    writer = ZipChunkWriter()
+    try:
+        with zipfile.ZipFile(writer, "w", zipfile.ZIP_STORED) as archive:
+            for next_render in asyncio.as_completed(render_tasks):
+                size, image_format, image, _ = await next_render
+                archive.writestr(f"poster-{size}.{image_format}", image)
+                yield writer.take()
+            design = await design_task
+            archive.writestr("design.json", json.dumps({**design, "source": source.label()}, ensure_ascii=False, indent=2))
+        yield writer.take()
+    finally:
+        # Client went away mid-stream: stop whatever is still running
+        for task in [design_task, *render_tasks]:
+            task.cancel()
+
+@app.post("/api/generate-poster/batch")
+async def generate_poster_batch_endpoint(request: PosterBatchRequest):
+    """One design call and one layout, rasterized at several sizes in parallel; JSON set or zip stream"""
+    sizes = list(dict.fromkeys(request.sizes or POSTER_SIZES))
+    unknown = [size for size in sizes if size not in POSTER_SIZES]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown sizes {', '.join(unknown)}. Available: {', '.join(POSTER_SIZES)}"
+        )
+    image_format = poster_format_param(request.format)
+    check_poster_quality(request.quality)
+    image_type = poster_image_type(request.imageType)
+    
+    # Fail fast before spending a Gemini call when the renderer cannot take every size
+    poster_renderer.check_capacity(len(sizes))
+    layout = poster_layout(request.title, request.subtitle, request.description)
+    
+    async def render(size: str):
+        width, height = POSTER_SIZES[size]
+        key = poster_render_key(request.title, request.subtitle, request.description, image_type,
+                                image_format, request.quality, size)
+        try:
+            image = await cached_poster_render(
+                key, rasterize_poster, layout, image_type, width, height, image_format, request.quality
+            )
+        except Exception as e:
+            print(f"❌ Error generating {size} poster image: {e}")
+            return size, image_format, render_fallback_poster(image_format, request.quality), None
+        return size, image_format, image, poster_etag(key)
+    
+    print(f"🎨 Generating {len(sizes)} poster sizes for: {request.title}")
+    with request_scope("poster") as source:
+        design_task = asyncio.ensure_future(get_poster_design(
+            theme=request.theme,
+            title=request.title,
+            subtitle=request.subtitle,
+            description=request.description,
+            style="modern"  # Same style the full poster endpoint asks for
+        ))
+        render_tasks = [asyncio.ensure_future(render(size)) for size in sizes]
+    
+    if request.archive:
+        return StreamingResponse(
+            poster_zip_stream(design_task, render_tasks, source),
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="posters.zip"'}
+        )
+    
+    try:
+        design, *renders = await asyncio.gather(design_task, *render_tasks)
+    except BaseException:
+        for task in [design_task, *render_tasks]:
+            task.cancel()
+        raise
+    
+    content_type = POSTER_IMAGE_FORMATS[image_format][1]
+    return PosterBatchResponse(
+        **design,
+        posters=[
+            PosterBatchImage(
+                size=size,
+                width=POSTER_SIZES[size][0],
+                height=POSTER_SIZES[size][1],
+                content_type=content_type,
+                image=base64.b64encode(image).decode(),
+                etag=etag
+            )
+            for size, _, image, etag in renders
+        ],
+        source=source.label()
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,344 @@
+"""Poster rendering: theme assets, cached templates, layout, rasterizing and encoding.
+
+Kept apart from main.py so poster render workers import only this module (and PIL/numpy)
+instead of re-running the app's initialization. Configuration is read from the environment.
+"""
+import functools
+import hashlib
+import os
+import textwrap
+import time
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# Poster themes accepted as imageType, and the directory holding their images (default ../public, then public)
+POSTER_THEMES = [theme.strip().lower() for theme in os.getenv("POSTER_THEMES", "hunger,solidarity,voice").split(",") if theme.strip()]
+POSTER_ASSETS_DIR = os.getenv("POSTER_ASSETS_DIR")
+# Default quality (1-100) for JPEG and WebP posters from /api/generate-poster/image
+POSTER_IMAGE_QUALITY = int(os.getenv("POSTER_IMAGE_QUALITY", "85"))
+# Pre-composed poster backgrounds (gradient, theme image or flag, footer) kept per render worker
+POSTER_TEMPLATE_CACHE_SIZE = int(os.getenv("POSTER_TEMPLATE_CACHE_SIZE", "8"))
+
+# Poster output formats: PIL encoder and content type
+POSTER_IMAGE_FORMATS = {
+    "png": ("PNG", "image/png"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp")
+}
+
+def encode_poster(img: Image.Image, image_format: str = "png", quality: Optional[int] = None) -> bytes:
+    """Encode a poster; quality applies to JPEG and WebP (PNG is lossless)"""
+    pil_format, _ = POSTER_IMAGE_FORMATS[image_format]
+    options = {} if image_format == "png" else {"quality": quality or POSTER_IMAGE_QUALITY}
+    buffer = BytesIO()
+    img.save(buffer, format=pil_format, **options)
+    return buffer.getvalue()
+
+def render_fallback_poster(image_format: str = "png", quality: Optional[int] = None) -> bytes:
+    """Plain placeholder poster used when rendering fails"""
+    fallback_img = Image.new('RGB', (800, 1200), color='white')
+    draw = ImageDraw.Draw(fallback_img)
+    draw.text((400, 600), "Poster Generation\nUnavailable", fill='black', anchor='mm')
+    return encode_poster(fallback_img, image_format, quality)
+
+# Bump when the poster layout changes, so renders cached on disk are not served again
+POSTER_LAYOUT_VERSION = 1
+
+# Posters are laid out in units of the 800x1200 web poster and scaled to fit each size
+POSTER_UNIT_WIDTH = 800
+POSTER_UNIT_HEIGHT = 1200
+# Output sizes for /api/generate-poster/batch
+POSTER_SIZES = {
+    "web": (800, 1200),
+    "instagram": (1080, 1080),
+    "story": (1080, 1920),
+    "a4": (2480, 3508)
+}
+
+# Palestinian flag colors
+POSTER_COLORS = {
+    'black': (0, 0, 0),
+    'green': (0, 151, 54),
+    'white': (255, 255, 255),
+    'red': (206, 17, 38)
+}
+
+class PosterAssets:
+    """Fonts and theme images for poster rendering, loaded once instead of for every poster.
+
+    Each theme in POSTER_THEMES is looked up once and its image pre-resized to the 300x200
+    poster slot; a theme without an image renders with the flag instead. Other poster sizes
+    get the slot scaled from the kept source image, resized once per scale. Fonts are opened
+    once per face and size. reload() rebuilds everything from disk and swaps it in.
+    """
+
+    SLOT_WIDTH = 300
+    SLOT_HEIGHT = 200
+    FONT_PATHS = {
+        "regular": "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        "bold": "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+    }
+    # Title, subtitle and body fonts used by every poster
+    PRELOADED_FONTS = (("bold", 48), ("regular", 32), ("regular", 24))
+
+    def __init__(self, themes: Sequence[str], directories: Sequence[str]):
+        self.themes = list(themes)
+        self.directories = list(directories)
+        self.images: Dict[str, Optional[Image.Image]] = {}
+        self.sources: Dict[str, Image.Image] = {}
+        self.scaled: Dict[tuple, Image.Image] = {}
+        self.paths: Dict[str, str] = {}
+        self.fonts: Dict[tuple, Any] = {}
+        self.version = ""
+        self.loaded_at = 0.0
+        self.load_seconds = 0.0
+        self.reload()
+
+    def find_image(self, theme: str) -> Optional[str]:
+        for directory in self.directories:
+            for name in dict.fromkeys([theme.capitalize(), theme.lower(), theme]):
+                path = os.path.join(directory, f"{name}.png")
+                if os.path.exists(path):
+                    return path
+        return None
+
+    @classmethod
+    def fit_to_slot(cls, image: Image.Image, scale: float = 1.0) -> Image.Image:
+        """Resize keeping the aspect ratio so the image fits the poster's image slot"""
+        max_width = round(cls.SLOT_WIDTH * scale)
+        max_height = round(cls.SLOT_HEIGHT * scale)
+        img_width, img_height = image.size
+        aspect_ratio = img_width / img_height
+        if aspect_ratio > max_width / max_height:
+            new_width = max_width
+            new_height = int(max_width / aspect_ratio)
+        else:
+            new_height = max_height
+            new_width = int(max_height * aspect_ratio)
+        return image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+
+    @staticmethod
+    def image_bytes(image: Optional[Image.Image]) -> int:
+        return image.width * image.height * len(image.getbands()) if image else 0
+
+    def load_font(self, face: str, size: int):
+        try:
+            return ImageFont.truetype(self.FONT_PATHS[face], size)
+        except Exception as e:
+            print(f"⚠️ Could not load {face} font at {size}px, using the default font: {e}")
+            return ImageFont.load_default()
+
+    def reload(self) -> Dict[str, Any]:
+        """Rediscover theme images and reopen fonts, then swap them in"""
+        started = time.perf_counter()
+        images = {}
+        sources = {}
+        paths = {}
+        for theme in self.themes:
+            images[theme] = None
+            path = self.find_image(theme)
+            if path is None:
+                print(f"⚠️ No image found for poster theme '{theme}', posters will show the flag")
+                continue
+            try:
+                with Image.open(path) as source:
+                    source.load()
+                    sources[theme] = source
+                    images[theme] = self.fit_to_slot(source)
+                paths[theme] = path
+            except Exception as e:
+                print(f"❌ Error loading theme image {path}: {e}")
+        fonts = {(face, size): self.load_font(face, size) for face, size in self.PRELOADED_FONTS}
+
+        # Fingerprint of the loaded assets; part of every poster's render cache key
+        digest = hashlib.sha256()
+        for theme, image in images.items():
+            digest.update(theme.encode("utf-8"))
+            digest.update(image.tobytes() if image else b"flag")
+        for face, path in self.FONT_PATHS.items():
+            digest.update(f"{face}:{path}:{os.path.getsize(path) if os.path.exists(path) else 0}".encode("utf-8"))
+
+        self.images, self.sources, self.paths, self.fonts = images, sources, paths, fonts
+        self.scaled = {}
+        self.version = digest.hexdigest()[:16]
+        self.loaded_at = time.time()
+        self.load_seconds = time.perf_counter() - started
+        print(f"✅ Loaded {len(paths)}/{len(images)} poster theme images and {len(fonts)} fonts "
+              f"in {self.load_seconds * 1000:.1f}ms")
+        return self.info()
+
+    def has_theme(self, theme: str) -> bool:
+        return theme in self.images
+
+    def theme_image(self, theme: str, scale: float = 1.0) -> Optional[Image.Image]:
+        if scale == 1.0 or theme not in self.sources:
+            return self.images.get(theme)
+        key = (theme, scale)
+        image = self.scaled.get(key)
+        if image is None:
+            image = self.scaled.setdefault(key, self.fit_to_slot(self.sources[theme], scale))
+        return image
+
+    def font(self, face: str, size: int):
+        key = (face, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts.setdefault(key, self.load_font(face, size))
+        return font
+
+    def info(self) -> Dict[str, Any]:
+        themes = {}
+        for theme, image in self.images.items():
+            themes[theme] = {
+                "path": self.paths.get(theme),
+                "size": list(image.size) if image else None,
+                "bytes": self.image_bytes(image) + self.image_bytes(self.sources.get(theme))
+            }
+        return {
+            "themes": themes,
+            "scaled_images": [f"{theme}@{scale:g}" for theme, scale in self.scaled],
+            "fonts": [f"{face}:{size}" for face, size in self.fonts],
+            "image_bytes": (sum(theme["bytes"] for theme in themes.values())
+                            + sum(self.image_bytes(image) for image in self.scaled.values())),
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "load_ms": round(self.load_seconds * 1000, 1)
+        }
+
+poster_assets = PosterAssets(POSTER_THEMES, [POSTER_ASSETS_DIR] if POSTER_ASSETS_DIR else ["../public", "public"])
+
+def poster_gradient(width: int, height: int) -> Image.Image:
+    """Background gradient built as one array, with the same per-row shades as a line per row"""
+    rows = np.arange(height) / height
+    shades = np.stack([255 - rows * 50, 255 - rows * 30, 255 - rows * 20], axis=1).astype(np.uint8)
+    # One pixel wide column, widened by a nearest-neighbour resize (exact, and cheaper than repeating the array)
+    return Image.fromarray(shades[:, np.newaxis, :]).resize((width, height), Image.Resampling.NEAREST)
+
+def poster_scale(width: int, height: int) -> Tuple[float, int]:
+    """Pixels per layout unit for a poster size, and the top offset that centers the layout"""
+    scale = min(width / POSTER_UNIT_WIDTH, height / POSTER_UNIT_HEIGHT)
+    return scale, int((height - POSTER_UNIT_HEIGHT * scale) // 2)
+
+def draw_poster_flag(draw: ImageDraw.ImageDraw, width: int, scale: float = 1.0, top: int = 0):
+    """Palestinian flag drawn where the theme image would go"""
+    colors = POSTER_COLORS
+    flag_width = round(200 * scale)
+    flag_height = round(120 * scale)
+    flag_x = (width - flag_width) // 2
+    flag_y = top + round(50 * scale)
+    
+    # Flag stripes
+    stripe_height = flag_height // 3
+    draw.rectangle([flag_x, flag_y, flag_x + flag_width, flag_y + stripe_height], fill=colors['black'])
+    draw.rectangle([flag_x, flag_y + stripe_height, flag_x + flag_width, flag_y + 2 * stripe_height], fill=colors['white'])
+    draw.rectangle([flag_x, flag_y + 2 * stripe_height, flag_x + flag_width, flag_y + flag_height], fill=colors['green'])
+    
+    # Flag triangle
+    triangle_points = [
+        (flag_x, flag_y),
+        (flag_x, flag_y + flag_height),
+        (flag_x + flag_width * 0.4, flag_y + flag_height // 2)
+    ]
+    draw.polygon(triangle_points, fill=colors['red'])
+
+@functools.lru_cache(maxsize=POSTER_TEMPLATE_CACHE_SIZE)
+def poster_template(imageType: str, width: int, height: int) -> Tuple[Image.Image, Image.Image]:
+    """Static poster layers (gradient, theme image or flag, footer) plus a copy of the footer band, cached per worker"""
+    colors = POSTER_COLORS
+    scale, top = poster_scale(width, height)
+    subtitle_font = poster_assets.font("regular", round(32 * scale))
+    body_font = poster_assets.font("regular", round(24 * scale))
+    img = poster_gradient(width, height)
+    draw = ImageDraw.Draw(img)
+    
+    # Theme image, pre-resized by the asset registry
+    theme_img = poster_assets.theme_image(imageType, scale)
+    if theme_img is not None:
+        new_width, new_height = theme_img.size
+        
+        # Center the image
+        img_x = (width - new_width) // 2
+        img_y = top + round(50 * scale)
+        
+        # Paste the image
+        img.paste(theme_img, (img_x, img_y))
+        
+        # Add image title
+        image_title = imageType.capitalize()
+        title_bbox = draw.textbbox((0, 0), image_title, font=subtitle_font)
+        title_width = title_bbox[2] - title_bbox[0]
+        title_x = (width - title_width) // 2
+        title_y = img_y + new_height + round(20 * scale)
+        draw.text((title_x, title_y), image_title, fill=colors['green'], font=subtitle_font)
+    else:
+        # Fallback to Palestinian flag if the theme has no image
+        draw_poster_flag(draw, width, scale, top)
+    
+    # Decorative elements
+    # Bottom border, always at the bottom edge of the canvas
+    footer_height = round(100 * scale)
+    draw.rectangle([0, height - footer_height, width, height], fill=colors['green'])
+    
+    # Footer text
+    footer_text = "Generated by United Ummah"
+    footer_bbox = draw.textbbox((0, 0), footer_text, font=body_font)
+    footer_width = footer_bbox[2] - footer_bbox[0]
+    footer_x = (width - footer_width) // 2
+    footer_y = height - round(70 * scale)
+    draw.text((footer_x, footer_y), footer_text, fill=colors['white'], font=body_font)
+    
+    return img, img.crop((0, height - footer_height, width, height))
+
+def poster_layout(title: str, subtitle: str, description: str) -> List[tuple]:
+    """Poster text as (text, face, size, y, color) in layout units, shared by every output size"""
+    flag_y = 50
+    flag_height = 120
+    
+    # Title
+    title_y = flag_y + flag_height + 80
+    layout = [(title, "bold", 48, title_y, 'black')]
+    
+    # Subtitle
+    subtitle_y = title_y + 60
+    layout.append((subtitle, "regular", 32, subtitle_y, 'green'))
+    
+    # Description (wrapped text)
+    desc_y = subtitle_y + 80
+    for line in textwrap.wrap(description, width=40):
+        layout.append((line, "regular", 24, desc_y, 'black'))
+        desc_y += 35
+    return layout
+
+def rasterize_poster(layout: List[tuple], imageType: str, width: int = POSTER_UNIT_WIDTH, height: int = POSTER_UNIT_HEIGHT,
+                     image_format: str = "png", quality: Optional[int] = None) -> bytes:
+    """Draw a poster layout at one pixel size over its cached template and encode it (runs in a render worker process)"""
+    scale, top = poster_scale(width, height)
+    base, footer = poster_template(imageType, width, height)
+    img = base.copy()
+    draw = ImageDraw.Draw(img)
+    
+    # Text is centered horizontally at its rendered width
+    for text, face, size, y, color in layout:
+        font = poster_assets.font(face, round(size * scale))
+        text_bbox = draw.textbbox((0, 0), text, font=font)
+        text_x = (width - (text_bbox[2] - text_bbox[0])) // 2
+        draw.text((text_x, top + round(y * scale)), text, fill=POSTER_COLORS[color], font=font)
+    
+    # The footer sits on top of any description that runs into it
+    img.paste(footer, (0, height - footer.height))
+    
+    return encode_poster(img, image_format, quality)
+
+def render_poster(title: str, subtitle: str, description: str, imageType: str = "hunger",
+                  image_format: str = "png", quality: Optional[int] = None) -> bytes:
+    """Lay out and draw the web-size poster (runs in a render worker process)"""
+    return rasterize_poster(poster_layout(title, subtitle, description), imageType, image_format=image_format, quality=quality)
+
+def prepare_render_worker(assets_version: str):
+    """Render worker initializer: reload the assets when this process's copy is older than the app's"""
+    if poster_assets.version != assets_version:
+        poster_assets.reload()
+        poster_template.cache_clear()
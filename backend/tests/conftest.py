@@ -0,0 +1,8 @@
+"""Shared test setup: import the backend modules the same way uvicorn does."""
+import os
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+# Data files (GS1 table, theme images, catalog) are looked up relative to the backend directory
+os.chdir(BACKEND_DIR)
@@ -0,0 +1,72 @@
+import json
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+import import_catalog
+import main
+from catalog import BrandAutocomplete, CatalogSnapshot, SQLiteCatalog
+
+def brand(name: str, popularity: int = 1) -> dict:
+    return {"brand": name, "category": "Test", "boycott_reason": "Test reason.",
+            "pakistani_alternatives": [], "popularity": popularity}
+
+# Popular brands sharing every trigram of "oartra" without containing it, listed before the real matches
+DECOYS = [brand(f"Oar Art Rtr Tra {i:03d}", 1000) for i in range(300)]
+CATALOG = DECOYS + [brand(f"Zz{i:03d}bucks") for i in range(400)] + [
+    brand("Starbucks", 900), brand("Bucks Coffee", 5), brand("Moartra", 3), brand("Kaoartrax", 2),
+    brand("Nestlé", 800), brand("Nestlé Ice Cream", 50),
+] + [brand(f"Loartra {i}") for i in range(20)]
+
+@pytest.fixture(scope="module")
+def backends(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("catalog")
+    source, database = directory / "catalog.json", directory / "catalog.db"
+    source.write_text(json.dumps(CATALOG))
+    import_catalog.import_catalog(str(source), str(database))
+    return {"memory": CatalogSnapshot(CATALOG).autocomplete, "sqlite": SQLiteCatalog(str(database))}
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_popular_mid_word_match_listed_late_is_ranked_first(backends, backend):
+    result = backends[backend].search("uck", 3)
+    assert result["brands"][0] == "Starbucks"
+    assert result["match_types"] == ["infix"] * 3
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_prefix_matches_rank_above_mid_word_matches(backends, backend):
+    result = backends[backend].search("bucks", 3)
+    assert result["brands"] == ["Bucks Coffee", "Starbucks", "Zz000bucks"]
+    assert result["match_types"] == ["prefix", "infix", "infix"]
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_false_positive_postings_do_not_shorten_the_fill(backends, backend):
+    result = backends[backend].search("oartra", 10)
+    assert len(result["brands"]) == 10
+    assert result["total"] == sum("oartra" in entry["brand"].lower() for entry in CATALOG)
+
+@pytest.mark.parametrize("query", ["oartra", "tosa", "bucks", "uck", "buc", "nest", "zz0", "a", "ice", "qqq"])
+@pytest.mark.parametrize("limit", [1, 10, 50])
+def test_backends_agree(backends, query, limit):
+    assert backends["memory"].search(query, limit) == backends["sqlite"].search(query, limit)
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_total_caps_mid_word_matches(backends, backend):
+    assert sum("ucks" in entry["brand"].lower() for entry in CATALOG) > BrandAutocomplete.INFIX_SCAN_LIMIT
+    assert backends[backend].search("ucks", 10)["total"] == BrandAutocomplete.INFIX_SCAN_LIMIT
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_limit_below_one_is_rejected(backends, backend):
+    with pytest.raises(ValueError):
+        backends[backend].search("bucks", 0)
+
+def test_endpoint_rejects_limit_below_one():
+    client = TestClient(main.app)
+    assert client.get("/api/brands/search", params={"query": "nestle", "limit": 0}).status_code == 400
+    assert client.get("/api/brands/search", params={"query": "nestle", "limit": 500}).status_code == 200
+
+def test_importer_does_not_build_the_app():
+    probe = "import sys, import_catalog; print(sorted({'main', 'catalog'} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "['catalog']"
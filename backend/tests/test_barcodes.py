@@ -0,0 +1,125 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import (
+    GS1_PREFIX_TABLE,
+    InvalidBarcodeError,
+    gtin_check_digit,
+    load_gs1_prefix_table,
+    lookup_barcode_prefix,
+    normalize_gtin
+)
+
+@pytest.mark.parametrize("body, check_digit", [
+    ("544900000099", 6),    # EAN-13
+    ("400638133393", 1),    # EAN-13
+    ("03600029145", 2),     # UPC-A
+    ("9638507", 4),         # EAN-8
+    ("1003600029145", 9),   # GTIN-14
+])
+def test_check_digit(body, check_digit):
+    assert gtin_check_digit(body) == check_digit
+
+@pytest.mark.parametrize("barcode, normalized", [
+    ("5449000000996", "5449000000996"),
+    ("96385074", "96385074"),
+    # UPC-A and GTIN-14 with indicator 0 become the same EAN-13
+    ("036000291452", "0036000291452"),
+    ("00036000291452", "0036000291452"),
+    # A packaging indicator keeps the GTIN-14
+    ("10036000291459", "10036000291459"),
+    # Spaces and hyphens as printed under the bars
+    (" 5 449000-000996 ", "5449000000996"),
+])
+def test_normalize_gtin(barcode, normalized):
+    assert normalize_gtin(barcode) == normalized
+
+@pytest.mark.parametrize("barcode, reason", [
+    ("54490000009X6", "non_digit"),
+    ("", "non_digit"),
+    ("1234567", "length"),
+    ("123456789", "length"),
+    ("123456789012345", "length"),
+    ("5449000000997", "check_digit"),
+])
+def test_invalid_barcodes(barcode, reason):
+    with pytest.raises(InvalidBarcodeError) as error:
+        normalize_gtin(barcode)
+    assert error.value.reason == reason
+    assert error.value.barcode == barcode
+
+def test_check_digit_error_reports_the_expected_digit():
+    with pytest.raises(InvalidBarcodeError) as error:
+        normalize_gtin("5449000000997")
+    assert error.value.expected_check_digit == 6
+    assert error.value.to_detail() == {
+        "error": "invalid_barcode", "reason": "check_digit", "message": "Barcode check digit is invalid",
+        "barcode": "5449000000997", "expected_check_digit": 6
+    }
+
+def test_scan_rejects_invalid_barcode_without_a_gemini_call(monkeypatch):
+    async def unexpected(*args):
+        raise AssertionError("Gemini called for an invalid barcode")
+
+    monkeypatch.setattr(main, "get_gemini_barcode_analysis", unexpected)
+    response = TestClient(main.app).post("/api/scan-barcode", json={"barcode": "5449000000997"})
+    assert response.status_code == 422
+    assert response.json()["detail"]["reason"] == "check_digit"
+
+def test_prefix_table_covers_every_prefix():
+    assert len(GS1_PREFIX_TABLE) == 1000
+    assert all(isinstance(country, str) and isinstance(israeli, bool) for country, israeli in GS1_PREFIX_TABLE)
+
+def test_only_the_boycott_prefixes_are_israeli():
+    assert {prefix for prefix, (_, israeli) in enumerate(GS1_PREFIX_TABLE) if israeli} == {729, 841, 871}
+
+@pytest.mark.parametrize("barcode, country, israeli", [
+    ("7290000000001", "Israel", True),
+    # Overrides inside the Spanish and Dutch ranges
+    ("8410000000001", "Israel", True),
+    ("8710000000001", "Israel", True),
+    ("8400000000001", "Spain/Andorra", False),
+    ("8420000000001", "Spain/Andorra", False),
+    ("8700000000001", "Netherlands", False),
+    ("8720000000001", "Netherlands", False),
+    ("6270000000001", "Kuwait", False),
+    ("0036000291452", "United States/Canada", False),
+    # GTIN-14: the prefix follows the packaging indicator
+    ("17290000000001", "Israel", True),
+    ("12", "Unknown", False),
+    ("abc123", "Unknown", False),
+])
+def test_lookup_barcode_prefix(barcode, country, israeli):
+    assert lookup_barcode_prefix(barcode) == (country, israeli)
+
+def test_later_entries_override_earlier_ones(tmp_path):
+    path = tmp_path / "prefixes.json"
+    path.write_text(json.dumps({
+        "default_country": "Nowhere",
+        "ranges": [{"start": 0, "end": 499, "country": "A"}, {"start": 100, "end": 199, "country": "B"}],
+        "overrides": [{"start": 150, "end": 150, "country": "C", "israeli": True}]
+    }))
+    table = load_gs1_prefix_table(str(path))
+    assert table[0] == table[99] == table[200] == ("A", False)
+    assert table[100] == table[199] == ("B", False)
+    assert table[150] == ("C", True)
+    assert table[500] == table[999] == ("Nowhere", False)
+
+@pytest.mark.parametrize("start, end", [(-1, 5), (5, 4), (998, 1000)])
+def test_invalid_prefix_range_is_rejected(tmp_path, start, end):
+    path = tmp_path / "prefixes.json"
+    path.write_text(json.dumps({"ranges": [{"start": start, "end": end, "country": "A"}]}))
+    with pytest.raises(ValueError):
+        load_gs1_prefix_table(str(path))
+
+def test_missing_table_still_flags_israeli_prefixes(monkeypatch):
+    def missing():
+        raise FileNotFoundError("gs1_prefixes.json")
+
+    monkeypatch.setattr(main, "load_gs1_prefix_table", missing)
+    table = main.initial_gs1_prefix_table()
+    assert {prefix for prefix, (_, israeli) in enumerate(table) if israeli} == {729, 841, 871}
+    assert table[380] == ("Unknown", False)
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from catalog import CatalogSnapshot
+
+def brand(name: str, category: str = "Food & Restaurants") -> dict:
+    return {"brand": name, "category": category, "boycott_reason": f"{name} reason.",
+            "pakistani_alternatives": ["Local"]}
+
+class Enrichment:
+    """Records the Gemini-backed lookups a batch makes, tracking how many run at once"""
+
+    def __init__(self, failing=()):
+        self.descriptions = []
+        self.enrichments = []
+        self.failing = set(failing)
+        self.in_flight = self.max_in_flight = 0
+
+    async def _call(self):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+
+    async def description(self, query, category=None):
+        self.descriptions.append(query)
+        await self._call()
+        return f"About {query}"
+
+    async def enrichment(self, query, is_boycotted=None, category=None):
+        self.enrichments.append(query)
+        await self._call()
+        if query in self.failing:
+            raise RuntimeError("Gemini exploded")
+        return {"boycott_reason": "", "alternatives": [], "message": f"{query} checked", "description": f"About {query}"}
+
+@pytest.fixture
+def enrichment(monkeypatch):
+    enrichment = Enrichment()
+    monkeypatch.setattr(main, "_catalog", CatalogSnapshot([brand("Starbucks"), brand("Nestlé", "Consumer Goods")]))
+    monkeypatch.setattr(main, "get_product_description", enrichment.description)
+    monkeypatch.setattr(main, "get_product_enrichment", enrichment.enrichment)
+    return enrichment
+
+def search(queries):
+    return TestClient(main.app).post("/api/search-products", json={"queries": queries})
+
+def test_duplicates_share_one_enrichment_and_keep_input_order(enrichment):
+    queries = ["Starbucks", " starbucks ", "STARBUCKS", "nike", "Nike", "", "qwertyuiop"]
+    body = search(queries).json()
+
+    assert enrichment.descriptions == ["Starbucks"]
+    assert enrichment.enrichments == ["nike"]
+    assert [item["query"] for item in body["results"]] == queries
+    assert [item["status"] for item in body["results"]] == ["ok"] * 5 + ["error", "ok"]
+    assert [item["result"]["query"] for item in body["results"][:3]] == ["starbucks"] * 3
+    assert body["results"][0]["result"]["brand_name"] == "Starbucks"
+    assert body["results"][3]["result"]["message"] == "nike checked"
+    assert body["results"][6]["result"]["category"] == "Unknown"
+    assert (body["total"], body["unique_queries"], body["failed"]) == (7, 3, 1)
+
+def test_fuzzy_and_exact_hits_on_one_brand_get_their_own_message(enrichment):
+    body = search(["starbucks", "starbuks"]).json()
+    exact, fuzzy = (item["result"] for item in body["results"])
+    assert exact["brand_name"] == fuzzy["brand_name"] == "Starbucks"
+    assert not exact["message"].startswith("🔎") and fuzzy["message"].startswith("🔎 Showing results for Starbucks")
+
+def test_one_failed_enrichment_does_not_fail_the_batch(enrichment):
+    enrichment.failing = {"pepsi"}
+    body = search(["nike", "pepsi", "Pepsi"]).json()
+    assert [item["status"] for item in body["results"]] == ["ok", "error", "error"]
+    assert body["results"][1]["error"] == "Error processing query"
+    assert body["failed"] == 2
+    assert enrichment.enrichments.count("pepsi") == 1
+
+def test_enrichment_concurrency_is_bounded(enrichment, monkeypatch):
+    monkeypatch.setattr(main, "BATCH_ENRICHMENT_CONCURRENCY", 2)
+    body = search(["nike", "pepsi", "apple", "google", "amazon", "netflix"]).json()
+    assert body["failed"] == 0
+    assert len(enrichment.enrichments) == 6
+    assert enrichment.max_in_flight == 2
+
+@pytest.mark.parametrize("queries", [[], ["nike"] * (main.BATCH_SEARCH_MAX_QUERIES + 1)])
+def test_empty_or_oversized_batch_is_rejected(enrichment, queries):
+    assert search(queries).status_code == 400
@@ -0,0 +1,95 @@
+import json
+import random
+
+import pytest
+
+from catalog import BrandIndex, brand_name_aliases, make_brand_records, normalize_brand_name
+
+with open("data/boycott_brands.json", encoding="utf-8") as f:
+    CATALOG = json.load(f)
+BRANDS = make_brand_records(CATALOG)
+INDEX = BrandIndex(BRANDS)
+
+def linear_scan(query: str):
+    """The per-request scan search_product used before the index, kept as the reference ranking"""
+    best_match, best_match_score = None, 0
+    for brand in BRANDS:
+        brand_name = brand.brand.lower()
+        if brand_name == query:
+            return brand
+        elif query in brand_name or brand_name in query:
+            if len(brand_name) > best_match_score:
+                best_match, best_match_score = brand, len(brand_name)
+        elif any(word in brand_name for word in query.split()) or any(word in query for word in brand_name.split()):
+            if len(brand_name) > best_match_score:
+                best_match, best_match_score = brand, len(brand_name)
+    return best_match
+
+def sample_queries():
+    random.seed(1)
+    names = [brand.brand.lower() for brand in BRANDS]
+    queries = set(names)
+    for name in names:
+        queries.update(name[start:start + size] for start in range(len(name)) for size in (1, 2, 3, 5))
+        queries.add(f"{name} original")
+        queries.add(f"buy {name} today")
+    for _ in range(500):
+        first, second = random.sample(names, 2)
+        queries.add(f"{first.split()[0]} {second.split()[-1]}")
+        queries.add("".join(random.choice("abcdefghijklmnopqrstuvwxyz &'") for _ in range(random.randint(1, 12))).strip())
+    return sorted(queries)
+
+QUERIES = sample_queries()
+
+def is_alias_hit(query: str) -> bool:
+    return query not in INDEX.names and any(alias in INDEX.aliases for alias in brand_name_aliases(query))
+
+def test_index_ranks_like_the_linear_scan():
+    checked = 0
+    for query in QUERIES:
+        if is_alias_hit(query):
+            continue
+        assert INDEX.find_best_match(query) is linear_scan(query), query
+        checked += 1
+    assert checked > 2000
+
+@pytest.mark.parametrize("query, brand", [
+    ("nestle", "Nestlé"),
+    ("coca cola", "Coca-Cola"),
+    ("cocacola", "Coca-Cola"),
+    ("mcdonalds", "McDonald's"),
+    ("ben and jerrys", "Ben & Jerry's"),
+    ("l oreal", "L'Oréal"),
+])
+def test_spelling_variants_find_the_brand(query, brand):
+    assert INDEX.find_exact(query).brand == brand
+    assert INDEX.find_best_match(query).brand == brand
+
+def test_exact_name_beats_a_longer_containing_name():
+    assert INDEX.find_best_match("starbucks").brand == "Starbucks"
+    assert INDEX.find_best_match("starbucks coffee").brand == "Starbucks Coffee"
+    assert INDEX.find_best_match("gillette").brand == "Gillette"
+
+def test_partial_matches_prefer_the_longest_name_then_catalog_order():
+    assert INDEX.find_best_match("pampers wipes").brand == "Pampers Baby Wipes"
+    index = BrandIndex(make_brand_records([
+        {"brand": name, "category": "Test", "boycott_reason": "Test reason.", "pakistani_alternatives": []}
+        for name in ("Alpha Cola", "Bravo Cola", "Cola")
+    ]))
+    assert index.find_best_match("cola drink").brand == "Alpha Cola"
+    assert index.find_best_match("co").brand == "Alpha Cola"
+
+def test_first_listed_brand_wins_a_shared_name():
+    index = BrandIndex(make_brand_records([
+        {"brand": name, "category": category, "boycott_reason": "Test reason.", "pakistani_alternatives": []}
+        for name, category in (("Dove", "Soap"), ("DOVE", "Chocolate"))
+    ]))
+    assert index.find_best_match("dove").category == "Soap"
+
+def test_no_match():
+    assert INDEX.find_best_match("zzqx") is None
+    assert INDEX.find_exact("zzqx") is None
+
+def test_queries_are_normalized_like_search_product():
+    assert normalize_brand_name("  StarBucks ") == "starbucks"
+    assert INDEX.find_best_match("  StarBucks ").brand == "Starbucks"
@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+import main
+from main import iter_upload_lines, stream_bulk_barcode_results
+
+class FakeUpload:
+    """Async read/close like UploadFile, serving data in fixed-size pieces and counting bytes read"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.position = 0
+        self.closed = False
+
+    async def read(self, size: int) -> bytes:
+        chunk = self.data[self.position:self.position + size]
+        self.position += len(chunk)
+        return chunk
+
+    async def close(self):
+        self.closed = True
+
+async def collect(generator) -> list:
+    return [item async for item in generator]
+
+def lines(data: bytes, chunk_size: int = 4, max_line_length: int = 16) -> list:
+    return asyncio.run(collect(iter_upload_lines(FakeUpload(data), chunk_size, max_line_length)))
+
+def test_lines_split_across_chunks():
+    assert lines(b"\xef\xbb\xbfabc\r\ndefgh\n\nij") == ["abc", "defgh", "", "ij"]
+
+def test_overlong_lines_become_none_and_later_lines_survive():
+    data = b"short\n" + b"x" * 100 + b"\nnext\n" + b"y" * 17 + b"\n" + b"z" * 40
+    assert lines(data) == ["short", None, "next", None, None]
+
+def test_overlong_line_is_not_buffered():
+    # A single 8 MB line with no newline is read through and reported once
+    upload = FakeUpload(b"7" * (8 * 1024 * 1024))
+    assert asyncio.run(collect(iter_upload_lines(upload, 64 * 1024, 1024))) == [None]
+    assert upload.position == len(upload.data)
+
+def results(data: bytes, include_message: bool = False) -> list:
+    chunks = asyncio.run(collect(stream_bulk_barcode_results(FakeUpload(data), include_message)))
+    return [json.loads(line) for chunk in chunks for line in chunk.decode().splitlines()]
+
+def test_overlong_upload_line_gets_an_error_record():
+    data = b"barcode\n7290000000008\n" + b"1" * 5000 + b"\n4006381333931\n"
+    records = results(data)
+    assert [record.get("line") for record in records[:-1]] == [2, 3, 4]
+    assert records[0]["status"] == "ok" and records[0]["is_israeli"]
+    assert records[1]["status"] == "error" and "longer than" in records[1]["error"]
+    assert records[2]["status"] == "ok"
+    assert records[-1]["summary"]["total"] == 3 and records[-1]["summary"]["errors"] == 1
+
+def test_client_disconnect_cancels_outstanding_lookups(monkeypatch):
+    started, cancelled = [], []
+
+    async def slow_analysis(barcode, is_israeli, country):
+        started.append(barcode)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(barcode)
+            raise
+        return {"message": "", "alternatives": []}
+
+    monkeypatch.setattr(main, "get_gemini_barcode_analysis", slow_analysis)
+    upload = FakeUpload(b"barcode\n" + b"4006381333931\n" * 50)
+
+    async def scenario():
+        stream = stream_bulk_barcode_results(upload, True)
+        reader = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.05)
+        # The client disconnects: the server cancels the read and closes the generator
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+        await stream.aclose()
+        await asyncio.sleep(0)
+        return all(task.done() for task in asyncio.all_tasks() if task is not asyncio.current_task())
+
+    assert asyncio.run(scenario())
+    assert started and sorted(cancelled) == sorted(started)
+    assert upload.closed
@@ -0,0 +1,67 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+import main
+
+def write_catalog(path, names, mtime):
+    path.write_text(json.dumps([{"brand": name, "category": "Test", "boycott_reason": "Test reason.",
+                                 "pakistani_alternatives": []} for name in names]))
+    os.utime(path, (mtime, mtime))
+
+@pytest.fixture
+def catalog_file(tmp_path, monkeypatch):
+    path = tmp_path / "catalog.json"
+    write_catalog(path, ["Starbucks", "Nestlé"], 1_000_000)
+    monkeypatch.setattr(main, "CATALOG_PATH", str(path))
+    monkeypatch.setattr(main, "CATALOG_DB_PATH", None)
+    monkeypatch.setattr(main, "_catalog", main.build_catalog_snapshot(str(path)))
+    builds = []
+    build = main.build_catalog_snapshot
+
+    def counting_build(*args):
+        builds.append(args)
+        return build(*args)
+
+    monkeypatch.setattr(main, "build_catalog_snapshot", counting_build)
+    return path, builds
+
+def watch(steps):
+    """Run the catalog watcher while applying each step between polls"""
+    async def run():
+        watcher = asyncio.create_task(main.watch_catalog_file(0.005))
+        try:
+            for step in steps:
+                step()
+                await asyncio.sleep(0.05)
+        finally:
+            watcher.cancel()
+    asyncio.run(run())
+
+def test_touched_but_unchanged_catalog_is_checked_once(catalog_file):
+    path, builds = catalog_file
+    published = main.get_catalog()
+    watch([lambda: None, lambda: write_catalog(path, ["Starbucks", "Nestlé"], 2_000_000), lambda: None])
+    assert len(builds) == 1
+    # The published snapshot is left exactly as it was built
+    assert main.get_catalog() is published
+    assert published.source_mtime == 1_000_000
+
+def test_changed_catalog_publishes_a_new_snapshot(catalog_file):
+    path, builds = catalog_file
+    published = main.get_catalog()
+    watch([lambda: write_catalog(path, ["Starbucks", "Nestlé", "Pepsi"], 2_000_000), lambda: None])
+    assert len(builds) == 1
+    assert main.get_catalog() is not published
+    assert main.get_catalog().version == published.version + 1
+    assert main.get_catalog().source_mtime == 2_000_000
+    assert published.source_mtime == 1_000_000
+
+def test_unchanged_build_does_not_touch_the_previous_snapshot(catalog_file):
+    path, _ = catalog_file
+    published = main.get_catalog()
+    write_catalog(path, ["Starbucks", "Nestlé"], 3_000_000)
+    assert main.build_catalog_snapshot(str(path), published) is None
+    assert published.source_mtime == 1_000_000
@@ -0,0 +1,106 @@
+import asyncio
+import time
+import types
+
+import pytest
+from fastapi.testclient import TestClient
+from google.api_core import exceptions as google_exceptions
+
+import main
+from main import CircuitBreaker, GeminiModelManager, QuestionCache, deadline_remaining, parse_endpoint_settings, request_scope
+
+class SlowModel:
+    """Stands in for genai.GenerativeModel: answers after `delay`, or raises `error` at once"""
+
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def generate_content_async(self, contents, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        await asyncio.sleep(self.delay)
+        return types.SimpleNamespace(text="model answer")
+
+def make_manager(model: SlowModel, max_retries: int = 0) -> GeminiModelManager:
+    manager = GeminiModelManager(4, {"faq": 2}, default_model="fake", breaker=CircuitBreaker(100, 30),
+                                 max_retries=max_retries)
+    manager.models["fake"] = model
+    return manager
+
+def test_endpoint_overrides_replace_defaults():
+    settings = parse_endpoint_settings(" faq = 2.5,poster=0,bogus", {"faq": 20.0, "quran": 20.0}, float)
+    assert settings == {"faq": 2.5, "quran": 20.0, "poster": 0.0}
+
+def test_request_scope_sets_and_restores_the_deadline(monkeypatch):
+    monkeypatch.setitem(main.request_deadlines, "faq", 3.0)
+    monkeypatch.setitem(main.request_deadlines, "poster", 0)
+
+    async def run():
+        assert deadline_remaining() is None
+        with request_scope("faq"):
+            assert 2.9 < deadline_remaining() <= 3.0
+            # An endpoint without a deadline runs unbounded inside its own scope
+            with request_scope("poster"):
+                assert deadline_remaining() is None
+            assert deadline_remaining() is not None
+        assert deadline_remaining() is None
+    asyncio.run(run())
+
+def test_slow_call_is_cancelled_at_the_deadline(monkeypatch):
+    monkeypatch.setitem(main.request_deadlines, "faq", 0.1)
+    manager = make_manager(SlowModel(delay=5))
+
+    async def run():
+        with request_scope("faq") as source:
+            started = time.perf_counter()
+            with pytest.raises(asyncio.TimeoutError):
+                await manager.generate("faq", "question")
+            return time.perf_counter() - started, source.label()
+
+    elapsed, label = asyncio.run(run())
+    assert elapsed < 0.5
+    assert label == "fallback"
+    assert manager.timeouts == 1
+    assert manager.breaker.failures == 1
+
+def test_passed_deadline_skips_the_call(monkeypatch):
+    monkeypatch.setitem(main.request_deadlines, "faq", 0.01)
+    model = SlowModel()
+    manager = make_manager(model)
+
+    async def run():
+        with request_scope("faq"):
+            await asyncio.sleep(0.02)
+            with pytest.raises(asyncio.TimeoutError):
+                await manager.generate("faq", "question")
+    asyncio.run(run())
+    assert model.calls == 0
+
+def test_no_retry_when_the_backoff_would_outlive_the_deadline(monkeypatch):
+    monkeypatch.setitem(main.request_deadlines, "faq", 0.2)
+    model = SlowModel(error=google_exceptions.ServiceUnavailable("down"))
+    manager = make_manager(model, max_retries=5)
+
+    async def run():
+        with request_scope("faq"):
+            with pytest.raises(google_exceptions.ServiceUnavailable):
+                await manager.generate("faq", "question")
+    asyncio.run(run())
+    # The first backoff is at least 0.25s, longer than the time left
+    assert model.calls == 1
+    assert manager.retries == 0
+
+def test_faq_answers_with_fallback_when_gemini_is_too_slow(monkeypatch):
+    monkeypatch.setattr(main, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(main, "gemini", make_manager(SlowModel(delay=5)))
+    monkeypatch.setattr(main, "sophia_question_cache", QuestionCache(10, 60, 0.85))
+    monkeypatch.setitem(main.request_deadlines, "faq", 0.1)
+
+    started = time.perf_counter()
+    response = TestClient(main.app).post("/api/faq", json={"user_question": "How can I donate to Gaza?"})
+    assert time.perf_counter() - started < 1
+    assert response.status_code == 200
+    assert response.json() == {"answer": main.SOPHIA_ERROR_RESPONSE, "source": "fallback"}
@@ -0,0 +1,34 @@
+import time
+
+import pytest
+
+from catalog import BrandFuzzyMatcher, BrandIndex, make_brand_records
+
+def brand(name: str) -> dict:
+    return {"brand": name, "category": "Test", "boycott_reason": "Test reason.",
+            "pakistani_alternatives": [], "popularity": 0}
+
+BRANDS = ["Nike", "Pepsi", "Adidas", "Starbucks", "Nestle", "Coca Cola", "McDonalds", "Puma"]
+
+@pytest.fixture(scope="module")
+def matcher():
+    return BrandFuzzyMatcher(BrandIndex(make_brand_records([brand(name) for name in BRANDS])))
+
+@pytest.mark.parametrize("typo, expected", [
+    ("nkie", "Nike"), ("pespi", "Pepsi"), ("addias", "Adidas"), ("starbuks", "Starbucks"),
+    ("nestel", "Nestle"), ("cocacloa", "Coca Cola"), ("mcdonlads", "McDonalds"), ("STARBUCKS", "Starbucks"),
+])
+def test_typos_find_the_brand(matcher, typo, expected):
+    assert matcher.find(typo).brand == expected
+
+@pytest.mark.parametrize("query", ["pum", "xyzzy", "starbucksxyz", "abc"])
+def test_short_or_distant_queries_do_not_match(matcher, query):
+    assert matcher.find(query) is None
+
+def test_lookup_stops_within_the_time_budget():
+    # Every name shares trigrams with the query, so an unbounded lookup verifies thousands of names
+    names = [f"Brand{number:05d}" for number in range(50000)]
+    matcher = BrandFuzzyMatcher(BrandIndex(make_brand_records([brand(name) for name in names])), time_budget_ms=1)
+    started = time.perf_counter()
+    matcher.find("brnad49999x")
+    assert time.perf_counter() - started < 0.003
@@ -0,0 +1,136 @@
+import asyncio
+import types
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+import main
+from main import CircuitBreaker, CircuitOpenError, GeminiModelManager, QuotaExhaustedError, TokenBucket
+
+class FakeModel:
+    """Stands in for genai.GenerativeModel: raises `error`, sleeps `delay` or streams `chunks`"""
+
+    def __init__(self, error=None, delay=0.0, chunks=("one", "two", "three")):
+        self.error = error
+        self.delay = delay
+        self.chunks = chunks
+
+    async def generate_content_async(self, contents, stream=False, **kwargs):
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        if stream:
+            return self._stream()
+        return types.SimpleNamespace(text="ok")
+
+    async def _stream(self):
+        for chunk in self.chunks:
+            yield types.SimpleNamespace(text=chunk)
+
+def make_manager(model: FakeModel, threshold: int = 3) -> GeminiModelManager:
+    manager = GeminiModelManager(4, {"faq": 2}, default_model="fake",
+                                 breaker=CircuitBreaker(threshold, 30), max_retries=0)
+    manager.models["fake"] = model
+    return manager
+
+async def call(manager: GeminiModelManager, deadline: float = None):
+    token = main.request_deadline.set(None if deadline is None else asyncio.get_running_loop().time() + deadline)
+    try:
+        return await manager.generate("faq", "question")
+    finally:
+        main.request_deadline.reset(token)
+
+def test_success_closes_breaker():
+    manager = make_manager(FakeModel())
+    assert asyncio.run(call(manager)).text == "ok"
+    assert manager.breaker.state == "closed" and manager.breaker.failures == 0
+
+def test_transient_errors_open_breaker_after_threshold():
+    manager = make_manager(FakeModel(error=google_exceptions.ServiceUnavailable("down")), threshold=2)
+    for _ in range(2):
+        with pytest.raises(google_exceptions.ServiceUnavailable):
+            asyncio.run(call(manager))
+    assert manager.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(call(manager))
+
+@pytest.mark.parametrize("error", [
+    google_exceptions.InvalidArgument("Request contains an invalid argument."),
+    main.genai.types.BlockedPromptException("blocked"),
+])
+def test_rejected_requests_do_not_count_as_failures(error):
+    manager = make_manager(FakeModel(error=error), threshold=1)
+    manager.breaker.failures = 0
+    for _ in range(3):
+        with pytest.raises(type(error)):
+            asyncio.run(call(manager))
+    assert manager.breaker.state == "closed" and manager.breaker.failures == 0
+
+@pytest.mark.parametrize("error", [
+    google_exceptions.Unauthenticated("missing credentials"),
+    google_exceptions.PermissionDenied("API key was revoked"),
+    google_exceptions.InvalidArgument("API key not valid. Please pass a valid API key."),
+])
+def test_credential_errors_open_breaker_immediately(error):
+    manager = make_manager(FakeModel(error=error), threshold=5)
+    with pytest.raises(type(error)):
+        asyncio.run(call(manager))
+    assert manager.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(call(manager))
+
+def test_unknown_errors_count_as_failures():
+    manager = make_manager(FakeModel(error=RuntimeError("connection reset")), threshold=1)
+    with pytest.raises(RuntimeError):
+        asyncio.run(call(manager))
+    assert manager.breaker.state == "open"
+
+def test_deadline_cancellation_counts_as_failure():
+    manager = make_manager(FakeModel(delay=1.0), threshold=1)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(call(manager, deadline=0.05))
+    assert manager.breaker.state == "open"
+
+def test_queueing_past_the_deadline_is_not_a_failure():
+    manager = make_manager(FakeModel(delay=0.3), threshold=1)
+
+    async def scenario():
+        busy = [asyncio.create_task(call(manager)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        with pytest.raises(asyncio.TimeoutError):
+            await call(manager, deadline=0.05)
+        await asyncio.gather(*busy)
+
+    asyncio.run(scenario())
+    assert manager.breaker.state == "closed"
+
+def test_client_close_releases_probe_without_verdict():
+    manager = make_manager(FakeModel(), threshold=1)
+    manager.breaker.state = "half_open"
+
+    async def scenario():
+        chunks = manager.stream("faq", "question")
+        assert await chunks.__anext__() == "one"
+        await chunks.aclose()
+
+    asyncio.run(scenario())
+    assert manager.breaker.state == "half_open" and not manager.breaker.probing
+    assert manager.breaker.failures == 0
+
+def test_half_open_probe_failure_reopens():
+    breaker = CircuitBreaker(1, 0)
+    breaker.record_failure()
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+def test_token_bucket_rejects_waits_past_max_wait():
+    bucket = TokenBucket(60, 2)
+    assert bucket.reserve(None) == 0 and bucket.reserve(None) == 0
+    with pytest.raises(QuotaExhaustedError):
+        bucket.reserve(0.5)
+    assert 0.9 < bucket.reserve(None) <= 1.0
+    assert bucket.stats()["rejected"] == 1
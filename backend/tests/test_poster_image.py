@@ -0,0 +1,195 @@
+import asyncio
+import os
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import PosterRenderCache, PosterRenderPool, etag_matches, negotiate_poster_format
+
+POSTER = {"theme": "protest", "title": "Boycott Now", "subtitle": "Stand with Palestine",
+          "description": "Short text.", "imageType": "hunger"}
+MAGIC = {"image/png": b"\x89PNG", "image/jpeg": b"\xff\xd8\xff", "image/webp": b"RIFF"}
+
+@pytest.fixture
+def client(monkeypatch):
+    # Render in a thread, into an empty cache
+    monkeypatch.setattr(main, "poster_renderer", PosterRenderPool(0, 16))
+    monkeypatch.setattr(main, "poster_cache", PosterRenderCache(16 * 1024 * 1024))
+    return TestClient(main.app)
+
+@pytest.mark.parametrize("accept, image_format", [
+    (None, "png"),
+    ("", "png"),
+    ("image/webp", "webp"),
+    ("image/jpeg, image/webp", "jpeg"),
+    ("image/jpeg;q=0.5, image/webp", "webp"),
+    ("image/*", "png"),
+    ("*/*", "png"),
+    ("image/png;q=0, image/*", "jpeg"),
+    ("image/png;q=0, image/jpeg;q=0, */*", "webp"),
+    ("text/html, image/webp;q=0.8", "webp"),
+    ("image/webp;q=bogus, image/jpeg;q=0.1", "jpeg"),
+    ("text/html", None),
+    ("image/png;q=0", None),
+])
+def test_negotiate_poster_format(accept, image_format):
+    assert negotiate_poster_format(accept) == image_format
+
+@pytest.mark.parametrize("accept, content_type", [
+    (None, "image/png"),
+    ("image/webp,image/*;q=0.8", "image/webp"),
+    ("image/jpeg", "image/jpeg"),
+])
+def test_image_is_served_in_the_negotiated_format(client, accept, content_type):
+    headers = {"Accept": accept} if accept else {}
+    response = client.post("/api/generate-poster/image", json=POSTER, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == content_type
+    assert "Accept" in response.headers["vary"]
+    assert response.content.startswith(MAGIC[content_type])
+
+def test_format_parameter_overrides_accept(client):
+    response = client.post("/api/generate-poster/image?format=jpg", json=POSTER, headers={"Accept": "image/webp"})
+    assert response.headers["content-type"] == "image/jpeg"
+    assert response.headers["content-disposition"] == 'inline; filename="poster.jpeg"'
+
+def test_get_form_matches_post(client):
+    posted = client.post("/api/generate-poster/image", json=POSTER)
+    fetched = client.get("/api/generate-poster/image", params=POSTER)
+    assert fetched.content == posted.content
+
+def test_lower_quality_gives_a_smaller_jpeg(client):
+    small = client.post("/api/generate-poster/image?format=jpeg&quality=10", json=POSTER)
+    large = client.post("/api/generate-poster/image?format=jpeg&quality=95", json=POSTER)
+    assert len(small.content) < len(large.content)
+
+@pytest.mark.parametrize("query, headers, status", [
+    ("", {"Accept": "text/html"}, 406),
+    ("?format=gif", {}, 400),
+    ("?format=png&quality=0", {}, 400),
+    ("?format=jpeg&quality=101", {}, 400),
+])
+def test_unusable_format_or_quality_is_rejected(client, query, headers, status):
+    assert client.post(f"/api/generate-poster/image{query}", json=POSTER, headers=headers).status_code == status
+
+def test_unknown_image_type_is_rejected(client):
+    response = client.post("/api/generate-poster/image", json={**POSTER, "imageType": "nonexistent"})
+    assert response.status_code == 400
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Counts the posters actually rasterized"""
+    calls = []
+    render_poster = main.render_poster
+
+    def counting_render(*args):
+        calls.append(args)
+        return render_poster(*args)
+
+    monkeypatch.setattr(main, "render_poster", counting_render)
+    return calls
+
+def test_matching_etag_gets_304_without_rendering(client, renders):
+    first = client.post("/api/generate-poster/image", json=POSTER)
+    etag = first.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+    assert first.headers["cache-control"] == "no-cache"
+
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        revalidated = client.post("/api/generate-poster/image", json=POSTER, headers={"If-None-Match": if_none_match})
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
+        assert revalidated.headers["etag"] == etag
+    assert len(renders) == 1
+
+def test_stale_etag_gets_the_image(client, renders):
+    response = client.post("/api/generate-poster/image", json=POSTER, headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200 and response.content.startswith(MAGIC["image/png"])
+
+def test_etag_changes_with_everything_that_changes_the_bytes(client):
+    etags = {
+        client.post("/api/generate-poster/image" + query, json={**POSTER, **fields}).headers["etag"]
+        for query, fields in [("", {}), ("", {"title": "Boycott Today"}), ("", {"imageType": "voice"}),
+                              ("?format=webp", {}), ("?format=webp&quality=40", {})]
+    }
+    assert len(etags) == 5
+    # Default quality and an explicit default, or a quality on a PNG, address the same render
+    assert (client.post(f"/api/generate-poster/image?format=webp&quality={main.POSTER_IMAGE_QUALITY}", json=POSTER).headers["etag"]
+            == client.post("/api/generate-poster/image?format=webp", json=POSTER).headers["etag"])
+    assert (client.post("/api/generate-poster/image?quality=5", json=POSTER).headers["etag"]
+            == client.post("/api/generate-poster/image", json=POSTER).headers["etag"])
+
+def test_repeat_requests_are_served_from_the_cache(client, renders):
+    first = client.post("/api/generate-poster/image", json=POSTER)
+    second = client.get("/api/generate-poster/image", params=POSTER)
+    assert second.content == first.content and second.headers["etag"] == first.headers["etag"]
+    assert len(renders) == 1
+    assert main.poster_cache.stats()["hits"] == 1
+
+def test_concurrent_misses_share_one_render(client):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_render(*args):
+        calls.append(args)
+        started.set()
+        release.wait(5)
+        return b"poster"
+
+    async def run():
+        key = main.poster_render_key("t", "s", "d", "hunger")
+        waiters = [asyncio.create_task(main.cached_poster_render(key, slow_render, "t")) for _ in range(3)]
+        await asyncio.to_thread(started.wait, 5)
+        release.set()
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(run()) == [b"poster"] * 3
+    assert len(calls) == 1
+
+def test_failed_render_serves_an_uncacheable_fallback(client, monkeypatch):
+    def broken_render(*args):
+        raise RuntimeError("font missing")
+
+    monkeypatch.setattr(main, "render_poster", broken_render)
+    response = client.post("/api/generate-poster/image", json=POSTER)
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+    assert response.headers["cache-control"] == "no-store"
+    assert main.poster_cache.stats()["entries"] == 0
+
+def test_etag_matches():
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches(' "x" , "abc" ', '"abc"')
+    assert not etag_matches('"abcd"', '"abc"')
+    assert not etag_matches(None, '"abc"') and not etag_matches("", '"abc"')
+
+def test_cache_evicts_least_recently_used_by_bytes():
+    cache = PosterRenderCache(10)
+    cache.set("a", b"aaaa")
+    cache.set("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"
+    cache.set("c", b"cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa" and cache.get("c") == b"cccc"
+    assert cache.stats()["bytes"] == 8 and cache.stats()["evictions"] == 1
+
+def test_evicted_posters_spill_to_disk_and_survive_a_restart(tmp_path):
+    directory = str(tmp_path)
+    keys = [f"{i:064x}" for i in range(4)]
+    cache = PosterRenderCache(10, directory, disk_bytes=8)
+    for key in keys:
+        cache.set(key, key[-1].encode() * 4)
+    # Two posters in memory, two spilled; the disk budget holds both
+    assert sorted(os.listdir(directory)) == keys[:2]
+
+    restarted = PosterRenderCache(10, directory, disk_bytes=8)
+    assert restarted.get(keys[0]) == b"0000"
+    assert restarted.stats()["disk_hits"] == 1
+
+    # Over the disk budget the least recently used file goes
+    cache.set(f"{9:064x}", b"9999")
+    cache.set(f"{8:064x}", b"8888")
+    assert len(os.listdir(directory)) == 2
+    assert cache.stats()["disk_bytes"] == 8
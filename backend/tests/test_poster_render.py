@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+import main
+import poster_render
+from main import PosterRenderPool
+
+POSTER = ("Boycott Now", "Stand with Palestine", "Short text.", "hunger")
+
+@pytest.fixture
+def pool():
+    pool = PosterRenderPool(1, 4)
+    yield pool
+    pool.shutdown()
+
+def test_workers_never_fork():
+    assert PosterRenderPool.start_method() in ("forkserver", "spawn")
+    assert PosterRenderPool.mp_context().get_start_method() != "fork"
+
+def test_workers_do_not_import_the_app(pool):
+    # eval pickles by reference, so the probe itself imports nothing into the worker
+    imported = asyncio.run(pool.run(eval, "sorted({'main', 'poster_render'} & set(__import__('sys').modules))"))
+    assert imported == ["poster_render"]
+
+def test_worker_render_matches_in_process_render(pool):
+    rendered = asyncio.run(pool.run(main.render_poster, *POSTER))
+    assert rendered == poster_render.render_poster(*POSTER)
+    assert pool.stats()["completed"] == 1
+    assert pool.stats()["start_method"] == PosterRenderPool.start_method()
+
+def test_thread_mode_without_workers():
+    pool = PosterRenderPool(0, 4)
+    assert asyncio.run(pool.run(main.render_poster, *POSTER)) == poster_render.render_poster(*POSTER)
+    assert pool.stats()["start_method"] == "thread"
+
+def test_worker_reloads_assets_only_when_stale(monkeypatch):
+    reloads = []
+    monkeypatch.setattr(poster_render.poster_assets, "reload", lambda: reloads.append(True))
+    poster_render.prepare_render_worker(poster_render.poster_assets.version)
+    assert reloads == []
+    poster_render.prepare_render_worker("older")
+    assert reloads == [True]
@@ -0,0 +1,51 @@
+import pytest
+
+from main import QuestionCache
+
+def make_cache(threshold: float = 0.85) -> QuestionCache:
+    return QuestionCache(100, 3600, threshold)
+
+@pytest.mark.parametrize("cached, asked", [
+    ("How can I donate?", "how do i donate"),
+    ("What is the ruling on boycotting products?", "what's the ruling on boycotting these products"),
+    ("How do I boycott Israeli products?", "How do I boycott Israeli product?"),
+    ("Why should I boycott Israeli products?", "why should we be boycotting israeli products"),
+    ("Which organizations provide medical aid in Gaza?", "Which organisations provide medical aid in Gaza?"),
+])
+def test_paraphrases_share_an_answer(cached, asked):
+    cache = make_cache()
+    cache.set(cached, "answer")
+    assert cache.get(asked) == "answer"
+
+@pytest.mark.parametrize("cached, asked", [
+    ("Which organizations provide medical aid in Gaza?", "Which organizations provide medical aid in Yemen?"),
+    ("Is it permissible to boycott Israeli products?", "Is it not permissible to boycott Israeli products?"),
+    ("Is it permissible to boycott Israeli products?", "Isn't it permissible to boycott Israeli products?"),
+    ("Is buying Starbucks haram?", "Is buying Starbucks halal?"),
+    ("Where is Al-Aqsa?", "What is Al-Aqsa?"),
+    ("Who should I donate to for Gaza relief?", "When should I donate for Gaza relief?"),
+])
+@pytest.mark.parametrize("threshold", [0.5, 0.85])
+def test_entity_negation_and_question_word_changes_miss(cached, asked, threshold):
+    cache = make_cache(threshold)
+    cache.set(cached, "answer")
+    assert cache.get(asked) is None
+
+def test_contractions_keep_their_negation():
+    assert QuestionCache.normalize("Don't buy it?") == QuestionCache.normalize("do not buy it")
+    assert "not" in QuestionCache.normalize("Can’t I donate?").split()
+
+def test_expired_entries_miss():
+    cache = QuestionCache(100, -1, 0.85)
+    cache.set("How can I donate?", "answer")
+    assert cache.get("How can I donate?") is None
+
+def test_lru_eviction():
+    cache = QuestionCache(2, 3600, 0.85)
+    cache.set("What is zakat?", "zakat")
+    cache.set("What is sadaqah?", "sadaqah")
+    assert cache.get("What is zakat?") == "zakat"
+    cache.set("What is hajj?", "hajj")
+    assert cache.get("What is sadaqah?") is None
+    assert cache.get("What is zakat?") == "zakat"
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+import main
+from main import SingleFlight, request_scope, single_flight
+
+class Upstream:
+    """Counts calls and holds each one until released"""
+
+    def __init__(self, result="answer", error=None):
+        self.calls = 0
+        self.release = None
+        self.result = result
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+def test_concurrent_identical_calls_share_one_call():
+    async def run():
+        flights, upstream = SingleFlight(), Upstream()
+        upstream.release = asyncio.Event()
+        waiters = [asyncio.create_task(flights.run(("faq", "q"), upstream)) for _ in range(3)]
+        await settle()
+        assert flights.stats() == {"in_flight": 1, "started": 1, "coalesced": 2}
+        upstream.release.set()
+        assert await asyncio.gather(*waiters) == ["answer"] * 3
+        assert upstream.calls == 1
+        assert flights.stats()["in_flight"] == 0
+    asyncio.run(run())
+
+def test_different_keys_are_not_coalesced():
+    async def run():
+        flights, upstream = SingleFlight(), Upstream()
+        upstream.release = asyncio.Event()
+        upstream.release.set()
+        await asyncio.gather(flights.run(("faq", "a"), upstream), flights.run(("faq", "b"), upstream))
+        assert upstream.calls == 2
+    asyncio.run(run())
+
+def test_error_reaches_every_waiter_and_releases_the_key():
+    async def run():
+        flights, upstream = SingleFlight(), Upstream(error=RuntimeError("quota"))
+        upstream.release = asyncio.Event()
+        waiters = [asyncio.create_task(flights.run(("faq", "q"), upstream)) for _ in range(2)]
+        await settle()
+        upstream.release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert [str(result) for result in results] == ["quota", "quota"]
+
+        # The next call after a failure goes upstream again
+        upstream.error = None
+        assert await flights.run(("faq", "q"), upstream) == "answer"
+        assert upstream.calls == 2
+    asyncio.run(run())
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def run():
+        flights, upstream = SingleFlight(), Upstream()
+        upstream.release = asyncio.Event()
+        leader = asyncio.create_task(flights.run(("faq", "q"), upstream))
+        follower = asyncio.create_task(flights.run(("faq", "q"), upstream))
+        await settle()
+        leader.cancel()
+        await settle()
+        upstream.release.set()
+        assert await follower == "answer"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert upstream.calls == 1
+    asyncio.run(run())
+
+def test_decorated_calls_coalesce_on_their_key_and_share_the_source(monkeypatch):
+    monkeypatch.setattr(main, "llm_flights", SingleFlight())
+    calls = []
+    release = None
+
+    @single_flight(lambda question: (question.strip().lower(),))
+    async def answer(question):
+        calls.append(question)
+        await release.wait()
+        main.response_source.get().model += 1
+        return f"answer to {question.strip()}"
+
+    async def request(question):
+        with request_scope("faq") as source:
+            return await answer(question), source.label()
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        waiters = [asyncio.create_task(request(question)) for question in ("Zakat?", " zakat? ", "Hajj?")]
+        await settle()
+        release.set()
+        return await asyncio.gather(*waiters)
+
+    results = asyncio.run(run())
+    assert calls == ["Zakat?", "Hajj?"]
+    # Followers report the leader's model answer as their own
+    assert results == [("answer to Zakat?", "model"), ("answer to Zakat?", "model"), ("answer to Hajj?", "model")]
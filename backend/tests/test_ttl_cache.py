@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+
+import pytest
+
+import main
+from main import TTLCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(main.time, "time", lambda: now[0])
+    return now
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(2, 60)
+    cache.set(("a",), 1)
+    cache.set(("b",), 2)
+    assert cache.get(("a",)) == 1
+    cache.set(("c",), 3)
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) == 1 and cache.get(("c",)) == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_peek_leaves_order_and_counters_alone(clock):
+    cache = TTLCache(2, 60)
+    cache.set(("a",), 1)
+    cache.set(("b",), 2)
+    assert cache.peek(("a",)) == 1
+    cache.set(("c",), 3)
+    assert cache.peek(("a",)) is None
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 0
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache(10, 60)
+    cache.set(("a",), 1)
+    clock[0] += 59.9
+    assert cache.get(("a",)) == 1
+    clock[0] += 0.1
+    assert cache.get(("a",)) is None
+    assert ("a",) not in cache.entries
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 1
+
+def test_saved_entries_survive_a_restart(tmp_path, clock):
+    path = str(tmp_path / "cache.json")
+    cache = TTLCache(3, 60, path)
+    cache.set(("old", "x"), "expires")
+    clock[0] += 30
+    for key in ("a", "b", "c"):
+        cache.set((key, "x"), key.upper())
+    cache.get(("a", "x"))
+    cache.save()
+
+    clock[0] += 31
+    restored = TTLCache(3, 60, path)
+    # The expired entry is dropped and LRU order is kept
+    assert list(restored.entries) == [("b", "x"), ("c", "x"), ("a", "x")]
+    assert restored.get(("b", "x")) == "B"
+
+def test_restart_keeps_only_the_newest_entries(tmp_path, clock):
+    path = str(tmp_path / "cache.json")
+    cache = TTLCache(4, 60, path)
+    for key in "abcd":
+        cache.set((key,), key)
+    cache.save()
+    assert list(TTLCache(2, 60, path).entries) == [("c",), ("d",)]
+
+def test_unreadable_cache_file_is_ignored(tmp_path):
+    path = tmp_path / "cache.json"
+    path.write_text("{not json")
+    assert len(TTLCache(2, 60, str(path)).entries) == 0
+
+def test_concurrent_writers_never_leave_a_torn_file(tmp_path):
+    # Uvicorn workers share the cache path and may save at the same time
+    path = str(tmp_path / "cache.json")
+    errors = []
+
+    def writer(number: int):
+        cache = TTLCache(50, 60, path)
+        cache.entries.clear()
+        for i in range(50):
+            cache.set((f"writer {number}", str(i)), "x" * 1000)
+        try:
+            for _ in range(30):
+                cache.save()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(number,)) for number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with open(path, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert len(saved) == 50
+    assert len({key[0] for key, _, _ in saved}) == 1
+    assert os.listdir(tmp_path) == ["cache.json"]